@@ -11,10 +11,11 @@ heights = [0.5, 0.8, 1.0, 1.2]
 fig, axes = plt.subplots(2, 2, figsize=(14, 14))
 axes = axes.flatten()
 
-for i, z in enumerate(heights):
-    slice_2d = mesh.section(plane_origin=[0, 0, z], plane_normal=[0, 0, 1])
-    if slice_2d:
-        slice_planar, _ = slice_2d.to_planar()
+# 모든 높이를 한 번의 메쉬 순회로 단면화 (결과는 이미 Path2D)
+slices = mesh.section_multiplane(plane_origin=[0, 0, 0], plane_normal=[0, 0, 1], heights=heights)
+
+for i, (z, slice_planar) in enumerate(zip(heights, slices)):
+    if slice_planar:
         for entity in slice_planar.entities:
             points = slice_planar.vertices[entity.points]
             axes[i].plot(points[:, 0], points[:, 1], 'k-', linewidth=1.5)
@@ -1,135 +1,161 @@
 import sqlite3
 import numpy as np
-import struct
+import matplotlib
+matplotlib.use('Agg')  # batch rendering only, never shown interactively
 import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection
 from mpl_toolkits.mplot3d import Axes3D
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+import os
 import sys
-
-def extract_pose(pose_blob):
-    """Extract 3x4 transformation matrix from blob (48 bytes = 12 floats)"""
-    if pose_blob is None or len(pose_blob) == 0:
-        return None
-    # 12 floats = 3x4 matrix (row-major)
-    values = struct.unpack('12f', pose_blob)
-    matrix = np.array(values).reshape(3, 4)
-    return matrix
-
-def get_position(matrix):
-    """Extract position (x, y, z) from transformation matrix"""
-    if matrix is None:
-        return None
-    return matrix[:, 3]  # Last column is translation
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# Let Agg drop sub-pixel vertices when stroking long trajectories
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+
+# Upper bound on vertices drawn per panel (positions are decimated above this)
+MAX_PLOT_POINTS = 5000
+
+def open_ro(db_path):
+    """Open an RTAB-Map DB read-only; immutable=1 skips journal/locking since inputs never change"""
+    uri = Path(db_path).resolve().as_uri() + '?mode=ro&immutable=1'
+    conn = sqlite3.connect(uri, uri=True)
+    # Read-only scan: memory-map the file and give the page cache room
+    conn.execute('PRAGMA mmap_size=268435456')
+    conn.execute('PRAGMA cache_size=-65536')
+    conn.execute('PRAGMA query_only=1')
+    return conn
+
+def extract_poses(rows):
+    """Decode all (id, pose) rows at once into (N, 3, 4) matrices and node ids"""
+    ids = [node_id for node_id, _ in rows]
+    blobs = b''.join(pose_blob for _, pose_blob in rows)
+    # One buffer parse instead of N struct.unpack calls (copy for writability/alignment)
+    matrices = np.frombuffer(blobs, dtype='<f4').reshape(-1, 3, 4).copy()
+    return matrices, np.array(ids)
+
+AXIS_LABELS = ('X (m)', 'Y (m)', 'Z (m)')
+
+# Shared start/end marker styles (ms=14 matches the former scatter s=200)
+_START_KW = dict(marker='o', ms=14, mfc='lime', mec='black', mew=2, ls='', label='Start', zorder=10)
+_END_KW = dict(marker='X', ms=14, mfc='red', mec='black', mew=2, ls='', label='End', zorder=10)
+
+def draw_panel(ax, positions, segs, colors, cols, title):
+    """Draw one trajectory view; cols selects the projected axes (3 columns = 3D view)"""
+    cols = list(cols)
+    is3d = len(cols) == 3
+    collection_cls = Line3DCollection if is3d else LineCollection
+    lc = collection_cls(segs[:, :, cols], cmap='viridis', array=colors, linewidth=1.5, rasterized=True)
+
+    start, end = positions[0, cols], positions[-1, cols]
+    if is3d:
+        ax.add_collection3d(lc)
+        ax.auto_scale_xyz(*positions.T)
+    else:
+        ax.add_collection(lc)
+        ax.autoscale_view()
+    ax.plot(*start[:, None], **_START_KW)
+    ax.plot(*end[:, None], **_END_KW)
+
+    ax.set_xlabel(AXIS_LABELS[cols[0]])
+    ax.set_ylabel(AXIS_LABELS[cols[1]])
+    if is3d:
+        ax.set_zlabel(AXIS_LABELS[cols[2]])
+    ax.set_title(title, fontsize=14, fontweight='bold')
+    ax.legend()
+    if not is3d:
+        ax.grid(True, alpha=0.3)
+        ax.axis('equal')
+
+# One figure per process, reused for every DB (see get_figure)
+_figure = None
+
+def get_figure():
+    """Return the cached 2x2 figure with cleared axes, creating it on first use"""
+    global _figure
+    if _figure is None:
+        fig = plt.figure(figsize=(16, 12))
+        axes = [fig.add_subplot(221, projection='3d'), fig.add_subplot(222),
+                fig.add_subplot(223), fig.add_subplot(224)]
+        _figure = (fig, axes)
+    else:
+        for ax in _figure[1]:
+            ax.cla()
+    return _figure
 
 def visualize_trajectory(db_path, output_prefix):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Get all poses
-    cursor.execute('SELECT id, pose FROM Node ORDER BY id')
-    rows = cursor.fetchall()
+    name = os.path.basename(db_path)
+    conn = open_ro(db_path)
 
-    positions = []
-    node_ids = []
+    # Get all poses (only well-formed 48-byte blobs, filtered inside SQLite)
+    rows = conn.execute(
+        'SELECT id, pose FROM Node WHERE pose IS NOT NULL AND length(pose) = 48 ORDER BY id'
+    ).fetchall()
+    conn.close()
 
-    for node_id, pose_blob in rows:
-        matrix = extract_pose(pose_blob)
-        if matrix is not None:
-            pos = get_position(matrix)
-            # Check if pose is valid (not identity or zero)
-            if not np.allclose(pos, [0, 0, 0]):
-                positions.append(pos)
-                node_ids.append(node_id)
+    matrices, node_ids = extract_poses(rows)
+    positions = matrices[:, :, 3]  # Last column is translation
 
-    conn.close()
+    # Check if pose is valid (not identity or zero) - same tolerance as np.allclose
+    valid = (np.abs(positions) > 1e-8).any(axis=1)
+    positions = np.ascontiguousarray(positions[valid])
+    node_ids = node_ids[valid]
 
     if len(positions) == 0:
         print("No valid poses found!")
         return
 
-    positions = np.array(positions)
     x, y, z = positions[:, 0], positions[:, 1], positions[:, 2]
 
-    print(f"=== {db_path.split('/')[-1]} ===")
+    print(f"=== {name} ===")
     print(f"Total nodes: {len(positions)}")
     print(f"X range: {x.min():.3f} ~ {x.max():.3f} m")
     print(f"Y range: {y.min():.3f} ~ {y.max():.3f} m")
     print(f"Z range: {z.min():.3f} ~ {z.max():.3f} m")
 
     # Calculate total distance
-    dist = np.sqrt(np.diff(x)**2 + np.diff(y)**2 + np.diff(z)**2)
-    total_dist = np.sum(dist)
+    total_dist = float(np.linalg.norm(np.diff(positions, axis=0), axis=1).sum())
     print(f"Total distance: {total_dist:.2f} m")
 
+    # Decimate once and share the same segment buffer across all four panels
+    stride = max(1, len(positions) // MAX_PLOT_POINTS)
+    pts = positions[::stride].astype(np.float32)
+    segs = np.stack([pts[:-1], pts[1:]], axis=1)
+    colors = np.linspace(0, 1, len(segs))
+
     # Create 3D visualization
-    fig = plt.figure(figsize=(16, 12))
-
-    # 1. 3D view
-    ax1 = fig.add_subplot(221, projection='3d')
-    colors = np.linspace(0, 1, len(x))
-    scatter = ax1.scatter(x, y, z, c=colors, cmap='viridis', s=30, alpha=0.8)
-    ax1.plot(x, y, z, 'k-', linewidth=0.5, alpha=0.3)
-    ax1.scatter(x[0], y[0], z[0], c='lime', s=200, marker='o', label='Start', edgecolors='black', linewidths=2, zorder=10)
-    ax1.scatter(x[-1], y[-1], z[-1], c='red', s=200, marker='X', label='End', edgecolors='black', linewidths=2, zorder=10)
-    ax1.set_xlabel('X (m)')
-    ax1.set_ylabel('Y (m)')
-    ax1.set_zlabel('Z (m)')
-    ax1.set_title('3D Camera Trajectory', fontsize=14, fontweight='bold')
-    ax1.legend()
-
-    # 2. Top view (X-Y)
-    ax2 = fig.add_subplot(222)
-    ax2.scatter(x, y, c=colors, cmap='viridis', s=30, alpha=0.8)
-    ax2.plot(x, y, 'k-', linewidth=0.5, alpha=0.3)
-    ax2.scatter(x[0], y[0], c='lime', s=200, marker='o', label='Start', edgecolors='black', linewidths=2, zorder=10)
-    ax2.scatter(x[-1], y[-1], c='red', s=200, marker='X', label='End', edgecolors='black', linewidths=2, zorder=10)
-    ax2.set_xlabel('X (m)')
-    ax2.set_ylabel('Y (m)')
-    ax2.set_title('Top View (X-Y)', fontsize=14, fontweight='bold')
-    ax2.legend()
-    ax2.grid(True, alpha=0.3)
-    ax2.axis('equal')
-
-    # 3. Side view (X-Z)
-    ax3 = fig.add_subplot(223)
-    ax3.scatter(x, z, c=colors, cmap='viridis', s=30, alpha=0.8)
-    ax3.plot(x, z, 'k-', linewidth=0.5, alpha=0.3)
-    ax3.scatter(x[0], z[0], c='lime', s=200, marker='o', label='Start', edgecolors='black', linewidths=2, zorder=10)
-    ax3.scatter(x[-1], z[-1], c='red', s=200, marker='X', label='End', edgecolors='black', linewidths=2, zorder=10)
-    ax3.set_xlabel('X (m)')
-    ax3.set_ylabel('Z (m)')
-    ax3.set_title('Side View (X-Z)', fontsize=14, fontweight='bold')
-    ax3.legend()
-    ax3.grid(True, alpha=0.3)
-    ax3.axis('equal')
-
-    # 4. Front view (Y-Z)
-    ax4 = fig.add_subplot(224)
-    ax4.scatter(y, z, c=colors, cmap='viridis', s=30, alpha=0.8)
-    ax4.plot(y, z, 'k-', linewidth=0.5, alpha=0.3)
-    ax4.scatter(y[0], z[0], c='lime', s=200, marker='o', label='Start', edgecolors='black', linewidths=2, zorder=10)
-    ax4.scatter(y[-1], z[-1], c='red', s=200, marker='X', label='End', edgecolors='black', linewidths=2, zorder=10)
-    ax4.set_xlabel('Y (m)')
-    ax4.set_ylabel('Z (m)')
-    ax4.set_title('Front View (Y-Z)', fontsize=14, fontweight='bold')
-    ax4.legend()
-    ax4.grid(True, alpha=0.3)
-    ax4.axis('equal')
-
-    plt.suptitle(f'RTAB-Map Camera Trajectory\n{db_path.split("/")[-1]} | Distance: {total_dist:.1f}m | Nodes: {len(positions)}',
+    fig, (ax1, ax2, ax3, ax4) = get_figure()
+
+    # 1. 3D view, 2. Top view (X-Y), 3. Side view (X-Z), 4. Front view (Y-Z)
+    draw_panel(ax1, positions, segs, colors, (0, 1, 2), '3D Camera Trajectory')
+    draw_panel(ax2, positions, segs, colors, (0, 1), 'Top View (X-Y)')
+    draw_panel(ax3, positions, segs, colors, (0, 2), 'Side View (X-Z)')
+    draw_panel(ax4, positions, segs, colors, (1, 2), 'Front View (Y-Z)')
+
+    fig.suptitle(f'RTAB-Map Camera Trajectory\n{name} | Distance: {total_dist:.1f}m | Nodes: {len(positions)}',
                  fontsize=16, fontweight='bold')
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.savefig(f'{output_prefix}_trajectory_3d.png', dpi=150, bbox_inches='tight')
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+    fig.savefig(f'{output_prefix}_trajectory_3d.png', dpi=150, bbox_inches='tight',
+                pil_kwargs={'compress_level': 1})  # fast zlib level over small files
     print(f'\nSaved {output_prefix}_trajectory_3d.png')
 
 if __name__ == '__main__':
     db_files = ['scan1.db', 'scan2.db', 'test.db']
 
-    for db_file in db_files:
-        db_path = f'/Users/leehyeonsu/home/koreatech/graduate_project/indoor-backend/rtab/db/{db_file}'
-        output_prefix = db_file.replace('.db', '')
-        try:
-            visualize_trajectory(db_path, output_prefix)
-            print()
-        except Exception as e:
-            print(f"Error processing {db_file}: {e}")
-            print()
+    # Each DB is independent, so process them on separate cores
+    with ProcessPoolExecutor() as pool:
+        futures = {}
+        for db_file in db_files:
+            db_path = f'/Users/leehyeonsu/home/koreatech/graduate_project/indoor-backend/rtab/db/{db_file}'
+            output_prefix = db_file.replace('.db', '')
+            futures[db_file] = pool.submit(visualize_trajectory, db_path, output_prefix)
+
+        for db_file, future in futures.items():
+            try:
+                future.result()
+                print()
+            except Exception as e:
+                print(f"Error processing {db_file}: {e}")
+                print()
@@ -1,27 +1,38 @@
-import sqlite3
 import numpy as np
-import struct
 import matplotlib.pyplot as plt
 from mpl_toolkits.mplot3d import Axes3D
+from scipy.spatial import cKDTree
+
+from extract_trajectory import open_ro
+
+# Let Agg drop sub-pixel vertices when stroking long trajectories
+plt.rcParams['path.simplify'] = True
+plt.rcParams['path.simplify_threshold'] = 1.0
+
+# Upper bound on vertices drawn per line (trajectories are decimated above this)
+MAX_PLOT_POINTS = 5000
+
+# XY distance (m) within which a scan2 pose counts as overlapping scan1
+OVERLAP_RADIUS = 0.5
+
+# Minimum overlapping fraction of poses for a merge to be feasible (10%)
+MIN_OVERLAP_RATIO = 0.1
 
 def extract_poses(db_path):
     """Extract all poses from RTAB-Map database"""
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute('SELECT id, pose FROM Node ORDER BY id')
-    rows = cursor.fetchall()
+    conn = open_ro(db_path)
+    rows = conn.execute(
+        'SELECT pose FROM Node WHERE pose IS NOT NULL AND length(pose) = 48 ORDER BY id'
+    ).fetchall()
     conn.close()
 
-    positions = []
-    for node_id, pose_blob in rows:
-        if pose_blob and len(pose_blob) == 48:
-            values = struct.unpack('12f', pose_blob)
-            matrix = np.array(values).reshape(3, 4)
-            pos = matrix[:, 3]
-            if not np.allclose(pos, [0, 0, 0]):
-                positions.append(pos)
+    # Decode every 48-byte pose blob in one buffer parse
+    blobs = b''.join(row[0] for row in rows)
+    matrices = np.frombuffer(blobs, dtype='<f4').reshape(-1, 3, 4).copy()
+    positions = matrices[:, :, 3]
+    positions = positions[(np.abs(positions) > 1e-8).any(axis=1)]
 
-    return np.array(positions) if positions else None
+    return positions if len(positions) > 0 else None
 
 # Extract from both databases
 scan1_poses = extract_poses('scan1.db')
@@ -38,13 +49,15 @@ ax1 = fig.add_subplot(221, projection='3d')
 
 if scan1_poses is not None:
     x1, y1, z1 = scan1_poses[:, 0], scan1_poses[:, 1], scan1_poses[:, 2]
-    ax1.plot(x1, y1, z1, 'b-', linewidth=2, alpha=0.8, label='scan1.db')
+    s1 = max(1, len(scan1_poses) // MAX_PLOT_POINTS)
+    ax1.plot(x1[::s1], y1[::s1], z1[::s1], 'b-', linewidth=2, alpha=0.8, label='scan1.db')
     ax1.scatter(x1[0], y1[0], z1[0], c='lime', s=200, marker='o', edgecolors='black', zorder=10)
     ax1.scatter(x1[-1], y1[-1], z1[-1], c='blue', s=150, marker='s', edgecolors='black', zorder=10)
 
 if scan2_poses is not None:
     x2, y2, z2 = scan2_poses[:, 0], scan2_poses[:, 1], scan2_poses[:, 2]
-    ax1.plot(x2, y2, z2, 'r-', linewidth=2, alpha=0.8, label='scan2.db')
+    s2 = max(1, len(scan2_poses) // MAX_PLOT_POINTS)
+    ax1.plot(x2[::s2], y2[::s2], z2[::s2], 'r-', linewidth=2, alpha=0.8, label='scan2.db')
     ax1.scatter(x2[0], y2[0], z2[0], c='orange', s=200, marker='o', edgecolors='black', zorder=10)
     ax1.scatter(x2[-1], y2[-1], z2[-1], c='red', s=150, marker='s', edgecolors='black', zorder=10)
 
@@ -57,10 +70,10 @@ ax1.legend()
 # Top view (X-Y)
 ax2 = fig.add_subplot(222)
 if scan1_poses is not None:
-    ax2.plot(x1, y1, 'b-', linewidth=2, alpha=0.8, label='scan1.db')
+    ax2.plot(x1[::s1], y1[::s1], 'b-', linewidth=2, alpha=0.8, label='scan1.db')
     ax2.scatter(x1[0], y1[0], c='lime', s=150, marker='o', edgecolors='black', zorder=10)
 if scan2_poses is not None:
-    ax2.plot(x2, y2, 'r-', linewidth=2, alpha=0.8, label='scan2.db')
+    ax2.plot(x2[::s2], y2[::s2], 'r-', linewidth=2, alpha=0.8, label='scan2.db')
     ax2.scatter(x2[0], y2[0], c='orange', s=150, marker='o', edgecolors='black', zorder=10)
 ax2.set_xlabel('X (m)')
 ax2.set_ylabel('Y (m)')
@@ -72,9 +85,9 @@ ax2.axis('equal')
 # Side view (X-Z)
 ax3 = fig.add_subplot(223)
 if scan1_poses is not None:
-    ax3.plot(x1, z1, 'b-', linewidth=2, alpha=0.8, label='scan1.db')
+    ax3.plot(x1[::s1], z1[::s1], 'b-', linewidth=2, alpha=0.8, label='scan1.db')
 if scan2_poses is not None:
-    ax3.plot(x2, z2, 'r-', linewidth=2, alpha=0.8, label='scan2.db')
+    ax3.plot(x2[::s2], z2[::s2], 'r-', linewidth=2, alpha=0.8, label='scan2.db')
 ax3.set_xlabel('X (m)')
 ax3.set_ylabel('Z (m)')
 ax3.set_title('Side View (X-Z)', fontsize=14, fontweight='bold')
@@ -120,7 +133,8 @@ ax4.text(0.1, 0.9, info_text, transform=ax4.transAxes, fontsize=11,
 
 plt.suptitle('RTAB-Map 분할 촬영 비교\n(병합 전 두 경로 겹침 확인)', fontsize=16, fontweight='bold')
 plt.tight_layout(rect=[0, 0, 1, 0.95])
-plt.savefig('trajectories_overlap_check.png', dpi=150, bbox_inches='tight')
+plt.savefig('trajectories_overlap_check.png', dpi=150, bbox_inches='tight',
+            pil_kwargs={'compress_level': 1})  # fast zlib level over small files
 print('\nSaved trajectories_overlap_check.png')
 
 # Check overlap
@@ -134,13 +148,21 @@ if scan1_poses is not None and scan2_poses is not None:
     x_overlap = max(0, min(x1_range[1], x2_range[1]) - max(x1_range[0], x2_range[0]))
     y_overlap = max(0, min(y1_range[1], y2_range[1]) - max(y1_range[0], y2_range[0]))
 
+    # Actual path overlap: scan2 poses with a scan1 pose within OVERLAP_RADIUS (XY)
+    # - bbox intersection alone gives false positives for paths that never meet
+    tree1 = cKDTree(scan1_poses[:, :2])
+    nearest, _ = tree1.query(scan2_poses[:, :2], distance_upper_bound=OVERLAP_RADIUS)
+    overlap_count = int(np.isfinite(nearest).sum())
+    overlap_ratio = overlap_count / len(scan2_poses)
+
     print(f"\n=== 겹침 분석 ===")
     print(f"scan1 X 범위: {x1_range[0]:.2f} ~ {x1_range[1]:.2f} m")
     print(f"scan2 X 범위: {x2_range[0]:.2f} ~ {x2_range[1]:.2f} m")
     print(f"X 겹침: {x_overlap:.2f} m")
     print(f"Y 겹침: {y_overlap:.2f} m")
+    print(f"경로 겹침: scan2 {overlap_count}/{len(scan2_poses)} poses ({overlap_ratio * 100:.1f}%, 반경 {OVERLAP_RADIUS}m)")
 
-    if x_overlap > 0.5 or y_overlap > 0.5:
+    if overlap_ratio >= MIN_OVERLAP_RATIO:
         print("✅ 병합 가능성 있음!")
     else:
         print("⚠️ 겹치는 영역이 부족할 수 있음")
@@ -37,6 +37,8 @@
 [환경 변수]
 - UPLOAD_DIR: 업로드 디렉토리 (기본: ./uploads)
 - OUTPUT_DIR: 출력 디렉토리 (기본: ./output)
+- PROCESS_WORKERS: 처리 워커 프로세스 수 (기본: CPU 코어 수 - 1)
+- PROFILE_PIPELINE: 1이면 단계별 소요 시간을 작업 상태(timings)에 기록 (기본: 0)
 """
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
@@ -44,13 +46,20 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager, suppress
+from dataclasses import dataclass, field
+from functools import partial
 import os
+import time
 import uuid
 import asyncio
 from datetime import datetime
 import numpy as np
 
 # 서비스 모듈 임포트
+from services import PREVIEW_IMAGE_TYPES, warmup_jit
 from services.extraction import extract_trajectory_from_db, get_trajectory_stats
 from services.deduplication import deduplicate_path, merge_overlapping_segments
 from services.smoothing import remove_outliers
@@ -82,6 +91,14 @@ tags_metadata = [
     },
 ]
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """종료 시 처리 워커 프로세스 풀을 정리합니다."""
+    yield
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+
+
 app = FastAPI(
     title="실내 경로 처리 서비스 (Indoor Path Processing Service)",
     description="""
@@ -108,6 +125,7 @@ app = FastAPI(
     openapi_tags=tags_metadata,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS 설정
@@ -128,28 +146,60 @@ app.add_middleware(
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "./uploads")
 OUTPUT_DIR = os.getenv("OUTPUT_DIR", "./output")
 
+# 업로드 스트리밍 청크 크기 (1MB)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# 처리 워커 프로세스 수 (이벤트 루프용으로 코어 하나를 남겨둠)
+PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", max(1, (os.cpu_count() or 1) - 1)))
+
+# 단계별 소요 시간 측정 (디버그용 - 정리 단계별 제거 포인트 수도 함께 기록)
+PROFILE_PIPELINE = os.getenv("PROFILE_PIPELINE", "0") == "1"
+
 # 디렉토리 생성 (없으면)
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# 작업 저장소 (메모리 기반 - 프로덕션에서는 Redis 등 사용 권장)
-processing_jobs: Dict[str, "ProcessingJob"] = {}
+# 메모리에 유지할 최대 작업 수 (초과 시 끝난 작업 중 가장 오래된 것부터 제거)
+MAX_JOBS = 256
+
+# 제거 가능한 종료 상태 (PENDING/PROCESSING 작업은 끝날 때까지 유지)
+TERMINAL_JOB_STATUSES = frozenset({'COMPLETED', 'FAILED'})
+
+# 작업 저장소 (메모리 기반 LRU - 프로덕션에서는 Redis 등 사용 권장)
+# 요청 핸들러와 백그라운드 태스크가 함께 접근하므로 _jobs_lock으로 보호합니다.
+processing_jobs: "OrderedDict[str, ProcessingJob]" = OrderedDict()
+_jobs_lock = asyncio.Lock()
+
+# 상태 조회용 스냅샷 (result 제외, 갱신 시마다 새 딕셔너리로 교체)
+# 폴링 요청은 이 딕셔너리를 그대로 반환하므로 조회 시 직렬화 작업이 없습니다.
+_job_status: Dict[str, dict] = {}
+
+# CPU 작업용 프로세스 풀 (첫 사용 시 생성 - _run_in_pool 참고)
+_process_pool: Optional[ProcessPoolExecutor] = None
 
 
 # =============================================================================
 # 데이터 모델 (Pydantic)
 # =============================================================================
 
-class ProcessingJob(BaseModel):
-    """처리 작업의 상태를 추적하는 모델"""
+@dataclass(slots=True)
+class ProcessingJob:
+    """처리 작업의 상태를 추적하는 모델 (내부용 - 검증 불필요)"""
     job_id: str
     status: str  # PENDING, PROCESSING, COMPLETED, FAILED
     progress: int  # 0 ~ 100
     message: str
     created_at: str
     completed_at: Optional[str] = None
-    result: Optional[dict] = None
+    result_path: Optional[str] = None  # 완료 시 디스크에 기록한 결과 JSON 파일 경로
     error: Optional[str] = None
+    timings: Dict[str, float] = field(default_factory=dict)  # PROFILE_PIPELINE 전용
+
+
+# 상태 조회 응답에 포함되는 필드 (결과 파일 경로는 내부용,
+# timings는 PROFILE_PIPELINE이 켜졌을 때만 노출)
+_HIDDEN_STATUS_FIELDS = {'result_path'} if PROFILE_PIPELINE else {'result_path', 'timings'}
+STATUS_FIELDS = tuple(name for name in ProcessingJob.__slots__ if name not in _HIDDEN_STATUS_FIELDS)
 
 
 class Point3DResponse(BaseModel):
@@ -274,17 +324,19 @@ async def upload_db_file(file: UploadFile = File(...)):
     file_path = os.path.join(UPLOAD_DIR, f"{file_id}.db")
 
     try:
-        # 파일 저장
-        contents = await file.read()
+        # 파일 저장 (전체를 메모리에 올리지 않고 청크 단위로 기록)
+        size = 0
         with open(file_path, "wb") as f:
-            f.write(contents)
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                f.write(chunk)
+                size += len(chunk)
 
         return {
             "file_id": file_id,
             "filename": file.filename,
             "file_path": file_path,
-            "size": len(contents),
-            "size_mb": round(len(contents) / (1024 * 1024), 2)
+            "size": size,
+            "size_mb": round(size / (1024 * 1024), 2)
         }
 
     except Exception as e:
@@ -327,13 +379,13 @@ async def start_processing(file_id: str, background_tasks: BackgroundTasks):
 
     # 작업 생성
     job_id = str(uuid.uuid4())
-    processing_jobs[job_id] = ProcessingJob(
+    await _store_job(ProcessingJob(
         job_id=job_id,
         status="PENDING",
         progress=0,
         message="처리 작업이 대기열에 추가되었습니다.",
         created_at=datetime.now().isoformat()
-    )
+    ))
 
     # 백그라운드에서 처리 시작
     background_tasks.add_task(process_path_async, job_id, file_path)
@@ -341,14 +393,151 @@ async def start_processing(file_id: str, background_tasks: BackgroundTasks):
     return {"job_id": job_id, "status": "PENDING"}
 
 
+# =============================================================================
+# 작업 저장소 접근
+# =============================================================================
+
+async def _store_job(job: ProcessingJob):
+    """
+    작업을 저장소에 등록합니다.
+
+    MAX_JOBS를 초과하면 종료 상태(COMPLETED/FAILED)인 작업 중 가장 오래된 것부터 제거합니다.
+    진행 중인 작업은 제거하지 않으므로, 모든 작업이 진행 중이면 일시적으로 MAX_JOBS를 넘을 수 있습니다.
+    제거된 작업의 결과 JSON과 미리보기 이미지도 디스크에서 함께 삭제합니다.
+
+    Args:
+        job: 등록할 작업
+    """
+    async with _jobs_lock:
+        processing_jobs[job.job_id] = job
+        processing_jobs.move_to_end(job.job_id)
+        _job_status[job.job_id] = _snapshot_status(job)
+        evicted_jobs = []
+        excess = len(processing_jobs) - MAX_JOBS
+        if excess > 0:
+            # 오래된 순서로 훑으며 끝난 작업만 초과분만큼 골라 제거
+            evicted_ids = []
+            for queued_id, queued_job in processing_jobs.items():
+                if queued_job.status in TERMINAL_JOB_STATUSES:
+                    evicted_ids.append(queued_id)
+                    if len(evicted_ids) == excess:
+                        break
+            for evicted_id in evicted_ids:
+                evicted_jobs.append(processing_jobs.pop(evicted_id))
+                _job_status.pop(evicted_id, None)
+
+    # 파일 삭제는 잠금 밖에서 (저장소에서 빠진 작업은 더 이상 조회되지 않음)
+    for evicted_job in evicted_jobs:
+        _remove_job_files(evicted_job)
+
+
+def _remove_job_files(job: ProcessingJob):
+    """
+    작업이 OUTPUT_DIR에 남긴 파일(결과 JSON, 미리보기 이미지)을 삭제합니다.
+
+    이미 없는 파일은 무시합니다.
+
+    Args:
+        job: 제거된 작업
+    """
+    output_prefix = os.path.join(OUTPUT_DIR, job.job_id)
+    paths = [f"{output_prefix}_{image_type}.png" for image_type in PREVIEW_IMAGE_TYPES]
+    if job.result_path:
+        paths.append(job.result_path)
+    for path in paths:
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+
+def _snapshot_status(job: ProcessingJob) -> dict:
+    """작업 상태 필드(결과 JSON 제외)를 응답용 딕셔너리로 만듭니다."""
+    return {name: getattr(job, name) for name in STATUS_FIELDS}
+
+
+def _update_job(job: ProcessingJob, **fields):
+    """
+    작업 필드를 갱신하고 상태 스냅샷을 교체합니다.
+
+    이미 저장소에서 제거된 작업은 스냅샷을 다시 등록하지 않습니다.
+
+    Args:
+        job: 갱신할 작업
+        **fields: 변경할 필드 값
+    """
+    for name, value in fields.items():
+        setattr(job, name, value)
+    if job.job_id in _job_status:
+        _job_status[job.job_id] = _snapshot_status(job)
+
+
+async def _get_job(job_id: str) -> Optional[ProcessingJob]:
+    """
+    작업을 조회합니다.
+
+    Args:
+        job_id: 작업 ID
+
+    Returns:
+        작업 객체, 없으면 (또는 제거되었으면) None
+    """
+    async with _jobs_lock:
+        return processing_jobs.get(job_id)
+
+
 # =============================================================================
 # 비동기 처리 로직
 # =============================================================================
 
+async def _run_in_pool(func, *args, **kwargs):
+    """
+    CPU 작업을 워커 프로세스에서 실행합니다.
+
+    스레드(asyncio.to_thread)는 Python 코드 구간에서 GIL을 공유하므로
+    동시 업로드가 직렬화됩니다. 프로세스 풀은 작업마다 별도 코어를 사용하고
+    이벤트 루프는 상태 조회 요청에 계속 응답할 수 있습니다.
+
+    Args:
+        func: 실행할 함수 (모듈 최상위 함수 - pickle 가능해야 함)
+        *args, **kwargs: 함수 인자
+
+    Returns:
+        함수 실행 결과
+    """
+    global _process_pool
+    if _process_pool is None:
+        # 워커마다 시작 시 JIT 커널을 미리 로드 (첫 작업에서 컴파일/캐시 로드 지연 없음)
+        _process_pool = ProcessPoolExecutor(max_workers=PROCESS_WORKERS, initializer=warmup_jit)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_process_pool, partial(func, *args, **kwargs))
+
+
+async def _timed(job: ProcessingJob, stage: str, awaitable):
+    """
+    PROFILE_PIPELINE이 켜져 있으면 단계의 소요 시간(초)을 job.timings에 기록합니다.
+
+    Args:
+        job: 기록할 작업
+        stage: 단계 이름
+        awaitable: 실행할 코루틴 (_run_in_pool 또는 asyncio.gather)
+
+    Returns:
+        awaitable의 결과
+    """
+    if not PROFILE_PIPELINE:
+        return await awaitable
+    start = time.perf_counter()
+    result = await awaitable
+    _update_job(job, timings={**job.timings, stage: round(time.perf_counter() - start, 4)})
+    return result
+
+
 async def process_path_async(job_id: str, file_path: str):
     """
     경로 처리 메인 파이프라인 (백그라운드 태스크)
 
+    진행 상태는 이벤트 루프에서 갱신하고, 각 단계의 연산은
+    _run_in_pool로 워커 프로세스에 위임합니다.
+
     [처리 단계]
     1. 궤적 추출 (10%)
     2. 수직 통로 감지 (25%)
@@ -362,142 +551,131 @@ async def process_path_async(job_id: str, file_path: str):
         job_id: 작업 ID
         file_path: DB 파일 경로
     """
+    job = await _get_job(job_id)
+    if job is None:
+        return
+
     try:
-        job = processing_jobs[job_id]
-        job.status = "PROCESSING"
+        _update_job(job, status="PROCESSING")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 1: 궤적 추출 (10%)
         # ─────────────────────────────────────────────────────────────────
-        job.progress = 5
-        job.message = "DB에서 궤적 추출 중..."
+        _update_job(job, progress=5, message="DB에서 궤적 추출 중...")
 
-        raw_positions, node_ids = await asyncio.to_thread(
+        raw_positions, node_ids = await _timed(job, 'extract', _run_in_pool(
             extract_trajectory_from_db, file_path
-        )
+        ))
 
         # 기본 통계
         trajectory_stats = get_trajectory_stats(raw_positions)
-        job.progress = 10
-        job.message = f"궤적 추출 완료: {len(raw_positions)}개 포인트"
+        _update_job(job, progress=10, message=f"궤적 추출 완료: {len(raw_positions)}개 포인트")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 2: 수직 통로 감지 (25%)
         # ─────────────────────────────────────────────────────────────────
-        job.progress = 15
-        job.message = "계단/엘리베이터 감지 중..."
+        _update_job(job, progress=15, message="계단/엘리베이터 감지 중...")
 
-        vertical_passages, stair_mask = await asyncio.to_thread(
+        vertical_passages, stair_mask = await _timed(job, 'detect_stairs', _run_in_pool(
             detect_stairs_first, raw_positions
-        )
+        ))
 
-        job.progress = 25
         passage_count = len(vertical_passages)
-        job.message = f"수직 통로 {passage_count}개 감지"
+        _update_job(job, progress=25, message=f"수직 통로 {passage_count}개 감지")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 3: 층 분리 (35%)
         # ─────────────────────────────────────────────────────────────────
-        job.progress = 30
-        job.message = "층 분리 중..."
+        _update_job(job, progress=30, message="층 분리 중...")
 
-        floors_data = await asyncio.to_thread(
+        floors_data = await _timed(job, 'separate_floors', _run_in_pool(
             separate_floors, raw_positions, node_ids, stair_mask=stair_mask
-        )
+        ))
 
         # 수직 통로에 층 정보 할당
         vertical_passages = assign_floors_to_stairs(vertical_passages, floors_data)
 
-        job.progress = 35
         floor_count = len(floors_data)
-        job.message = f"{floor_count}개 층 분리 완료"
+        _update_job(job, progress=35, message=f"{floor_count}개 층 분리 완료")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 4: 중복 제거 (50%)
         # ─────────────────────────────────────────────────────────────────
-        job.progress = 40
-        job.message = "중복 경로 제거 중..."
-
+        _update_job(job, progress=40, message="중복 경로 제거 중...")
+
+        # 층끼리는 독립적이므로 층별 작업을 동시에 워커에 분배
+        floor_levels = list(floors_data.keys())
+        cleaned = await _timed(job, 'clean', asyncio.gather(*(
+            _run_in_pool(_clean_floor_positions, floors_data[level]['positions'])
+            for level in floor_levels
+        )))
         deduplicated_floors = {}
-        for floor_level, floor_data in floors_data.items():
-            # 이상치 제거
-            cleaned = await asyncio.to_thread(remove_outliers, floor_data['positions'])
-            # 왕복 구간 병합
-            merged = await asyncio.to_thread(
-                merge_overlapping_segments, cleaned, overlap_threshold=1.0
-            )
-            # 공간적 중복 제거
-            deduplicated = await asyncio.to_thread(
-                deduplicate_path, merged, distance_threshold=0.5
-            )
-            deduplicated_floors[floor_level] = deduplicated
-
-        job.progress = 50
-        job.message = "중복 제거 완료"
+        for level, (positions, pass_stats) in zip(floor_levels, cleaned):
+            deduplicated_floors[level] = positions
+            if PROFILE_PIPELINE:
+                _update_job(job, timings={**job.timings, **{
+                    f"clean.{level}.{name}": value for name, value in pass_stats.items()
+                }})
+
+        _update_job(job, progress=50, message="중복 제거 완료")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 5: RDP + 직선 스냅 (65%)
         # ─────────────────────────────────────────────────────────────────
         # RDP로 핵심 꼭짓점을 추출하고, 꼭짓점 사이를 직선으로 연결합니다.
-        job.progress = 55
-        job.message = "경로 직선화 중 (RDP + 직선 스냅)..."
+        _update_job(job, progress=55, message="경로 직선화 중 (RDP + 직선 스냅)...")
 
-        smoothed_floors = {}
-        for floor_level, positions in deduplicated_floors.items():
-            snapped = await asyncio.to_thread(
-                snap_to_lines, positions, epsilon=0.5, point_spacing=0.5
-            )
-            smoothed_floors[floor_level] = snapped
+        snapped = await _timed(job, 'snap_to_lines', asyncio.gather(*(
+            _run_in_pool(snap_to_lines, deduplicated_floors[level], epsilon=0.5, point_spacing=0.5)
+            for level in floor_levels
+        )))
+        smoothed_floors = dict(zip(floor_levels, snapped))
 
-        job.progress = 65
-        job.message = "직선화 완료"
+        _update_job(job, progress=65, message="직선화 완료")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 7: 그래프 구축 (85%)
         # ─────────────────────────────────────────────────────────────────
-        job.progress = 75
-        job.message = "경로 그래프 구축 중..."
+        _update_job(job, progress=75, message="경로 그래프 구축 중...")
 
-        floor_graphs = {}
-        for floor_level, positions in smoothed_floors.items():
-            nodes, edges = await asyncio.to_thread(
-                build_path_graph, positions, floor_level
-            )
-            floor_graphs[floor_level] = (nodes, edges)
+        graphs = await _timed(job, 'build_graph', asyncio.gather(*(
+            _run_in_pool(build_path_graph, smoothed_floors[level], level)
+            for level in floor_levels
+        )))
+        floor_graphs = dict(zip(floor_levels, graphs))
 
         # 층 간 그래프 병합
-        all_nodes, all_edges = merge_floor_graphs(floor_graphs, vertical_passages)
+        all_nodes, all_edges = await _timed(job, 'merge_graphs', _run_in_pool(
+            merge_floor_graphs, floor_graphs, vertical_passages
+        ))
 
         graph_stats = get_graph_stats(all_nodes, all_edges)
 
-        job.progress = 85
-        job.message = f"그래프 구축 완료: 노드 {len(all_nodes)}개, 엣지 {len(all_edges)}개"
+        _update_job(job, progress=85, message=f"그래프 구축 완료: 노드 {len(all_nodes)}개, 엣지 {len(all_edges)}개")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 8: 미리보기 이미지 생성 (90%)
         # ─────────────────────────────────────────────────────────────────
-        job.progress = 88
-        job.message = "미리보기 이미지 생성 중..."
+        _update_job(job, progress=88, message="미리보기 이미지 생성 중...")
 
         output_prefix = os.path.join(OUTPUT_DIR, job_id)
-        preview_paths = await asyncio.to_thread(
-            _generate_preview_images,
+        preview_paths = await _timed(job, 'preview', _generate_preview_images(
             raw_positions,
             smoothed_floors,
             vertical_passages,
             output_prefix
-        )
+        ))
 
-        job.progress = 90
-        job.message = "미리보기 생성 완료"
+        _update_job(job, progress=90, message="미리보기 생성 완료")
 
         # ─────────────────────────────────────────────────────────────────
         # Step 9: 결과 생성 (100%)
         # ─────────────────────────────────────────────────────────────────
-        job.progress = 95
-        job.message = "결과 데이터 생성 중..."
+        _update_job(job, progress=95, message="결과 데이터 생성 중...")
 
-        result = _build_processing_result(
+        result_path = await _timed(job, 'serialize', _run_in_pool(
+            _write_processing_result,
+            f"{output_prefix}_result.json",
             job_id=job_id,
             raw_positions=raw_positions,
             smoothed_floors=smoothed_floors,
@@ -507,21 +685,52 @@ async def process_path_async(job_id: str, file_path: str):
             preview_paths=preview_paths,
             trajectory_stats=trajectory_stats,
             graph_stats=graph_stats
+        ))
+
+        # 완료 (결과 파일 경로를 먼저 저장한 뒤 상태를 공개)
+        job.result_path = result_path
+        _update_job(
+            job,
+            status="COMPLETED",
+            progress=100,
+            message="처리 완료!",
+            completed_at=datetime.now().isoformat()
         )
 
-        # 완료
-        job.status = "COMPLETED"
-        job.progress = 100
-        job.message = "처리 완료!"
-        job.completed_at = datetime.now().isoformat()
-        job.result = result
-
     except Exception as e:
         # 에러 처리
-        job = processing_jobs[job_id]
-        job.status = "FAILED"
-        job.error = str(e)
-        job.message = f"처리 실패: {str(e)}"
+        _update_job(job, status="FAILED", error=str(e), message=f"처리 실패: {str(e)}")
+
+
+def _clean_floor_positions(positions: np.ndarray) -> tuple:
+    """
+    한 층의 좌표에 정리 단계를 순서대로 적용합니다 (워커 프로세스에서 실행).
+
+    단계별 소요 시간과 남은 포인트 수를 함께 반환하므로, PROFILE_PIPELINE으로
+    RDP 전에 실제로 효과가 있는 단계인지 확인할 수 있습니다.
+
+    Args:
+        positions: 층 좌표 배열
+
+    Returns:
+        (이상치/왕복/중복이 제거된 좌표 배열, 단계별 통계 딕셔너리) 튜플
+        - 통계: {"<단계>.sec": 소요 시간, "<단계>.points": 단계 후 포인트 수}
+    """
+    passes = (
+        # 이상치 제거
+        ('remove_outliers', remove_outliers, {}),
+        # 왕복 구간 병합
+        ('merge_overlapping', merge_overlapping_segments, {'overlap_threshold': 1.0}),
+        # 공간적 중복 제거
+        ('deduplicate', deduplicate_path, {'distance_threshold': 0.5}),
+    )
+    pass_stats = {'input.points': len(positions)}
+    for name, func, kwargs in passes:
+        start = time.perf_counter()
+        positions = func(positions, **kwargs)
+        pass_stats[f"{name}.sec"] = round(time.perf_counter() - start, 4)
+        pass_stats[f"{name}.points"] = len(positions)
+    return positions, pass_stats
 
 
 def _build_processing_result(
@@ -556,90 +765,68 @@ def _build_processing_result(
     total_distance = 0
 
     # 층별 경로 데이터 생성
-    for floor_level, positions in smoothed_floors.items():
-        positions = np.array(positions)
-        segments = []
-
-        for i in range(len(positions) - 1):
-            start = positions[i]
-            end = positions[i + 1]
-            length = float(np.linalg.norm(end - start))
-            total_distance += length
-
-            segments.append({
-                "sequence_order": i,
-                "start_point": {
-                    "x": float(start[0]),
-                    "y": float(start[1]),
-                    "z": float(start[2])
-                },
-                "end_point": {
-                    "x": float(end[0]),
-                    "y": float(end[1]),
-                    "z": float(end[2])
-                },
-                "length": length
-            })
-
-        # 경계 계산
-        bounds = {
-            "min_x": float(positions[:, 0].min()),
-            "max_x": float(positions[:, 0].max()),
-            "min_y": float(positions[:, 1].min()),
-            "max_y": float(positions[:, 1].max())
-        }
-
-        floor_distance = sum(s["length"] for s in segments)
-
-        # 층 이름 생성 (음수면 지하)
-        if floor_level >= 0:
-            floor_name = f"{floor_level}층" if floor_level > 0 else "1층"
-        else:
-            floor_name = f"B{abs(floor_level)}"
+    # 수직 통로와 같은 방식으로 모든 층 좌표를 하나의 버퍼(+ 오프셋)로 모아
+    # 세그먼트 길이, 층별 총 길이, 경계를 각각 한 번의 벡터 연산으로 계산합니다.
+    if smoothed_floors:
+        floor_points, offsets = _concat_positions(smoothed_floors.values())
+        lengths = np.linalg.norm(np.diff(floor_points, axis=0), axis=1)
+        begins, ends = offsets[:-1], offsets[1:]
+
+        # 층별 총 길이 = 누적 길이의 차 (층 경계를 넘는 세그먼트는 포함되지 않음)
+        cumulative = np.concatenate(([0.0], np.cumsum(lengths)))
+        floor_distances = (cumulative[ends - 1] - cumulative[begins]).tolist()
+
+        # 경계 계산 (층별 축 min/max를 한 번에)
+        min_xyz = np.minimum.reduceat(floor_points, begins, axis=0).tolist()
+        max_xyz = np.maximum.reduceat(floor_points, begins, axis=0).tolist()
+
+        lengths = lengths.tolist()
+        points = [{"x": x, "y": y, "z": z} for x, y, z in floor_points.tolist()]
+
+        for floor_level, begin, end, floor_distance, lo, hi in zip(
+            smoothed_floors, begins.tolist(), ends.tolist(), floor_distances, min_xyz, max_xyz
+        ):
+            total_distance += floor_distance
+            bounds = {
+                "min_x": lo[0],
+                "max_x": hi[0],
+                "min_y": lo[1],
+                "max_y": hi[1]
+            }
 
-        floor_paths.append({
-            "floor_level": floor_level,
-            "floor_name": floor_name,
-            "segments": segments,
-            "bounds": bounds,
-            "total_distance": floor_distance
-        })
+            # 층 이름 생성 (음수면 지하)
+            if floor_level >= 0:
+                floor_name = f"{floor_level}층" if floor_level > 0 else "1층"
+            else:
+                floor_name = f"B{abs(floor_level)}"
+
+            floor_paths.append({
+                "floor_level": floor_level,
+                "floor_name": floor_name,
+                "segments": _segments_from_points(points[begin:end], lengths[begin:end - 1]),
+                "bounds": bounds,
+                "total_distance": floor_distance
+            })
 
     # 수직 통로 데이터 생성
+    # 모든 통로 좌표를 하나의 연속 버퍼(+ 오프셋)로 모아 길이를 한 번에 계산하고,
+    # 통로 경계를 넘는 세그먼트는 슬라이스에서 제외합니다.
     passage_results = []
-    for passage in vertical_passages:
-        positions = np.array(passage['positions'])
-        segments = []
-
-        for i in range(len(positions) - 1):
-            start = positions[i]
-            end = positions[i + 1]
-            length = float(np.linalg.norm(end - start))
-
-            segments.append({
-                "sequence_order": i,
-                "start_point": {"x": float(start[0]), "y": float(start[1]), "z": float(start[2])},
-                "end_point": {"x": float(end[0]), "y": float(end[1]), "z": float(end[2])},
-                "length": length
+    if vertical_passages:
+        passage_points, offsets = _concat_positions(passage['positions'] for passage in vertical_passages)
+        lengths = np.linalg.norm(np.diff(passage_points, axis=0), axis=1).tolist()
+        points = [{"x": x, "y": y, "z": z} for x, y, z in passage_points.tolist()]
+
+        for passage, begin, end in zip(vertical_passages, offsets[:-1].tolist(), offsets[1:].tolist()):
+            passage_results.append({
+                "type": passage['type'],
+                "from_floor_level": passage.get('from_floor', 0),
+                "to_floor_level": passage.get('to_floor', 0),
+                "segments": _segments_from_points(points[begin:end], lengths[begin:end - 1]),
+                "entry_point": points[begin],
+                "exit_point": points[end - 1]
             })
 
-        passage_results.append({
-            "type": passage['type'],
-            "from_floor_level": passage.get('from_floor', 0),
-            "to_floor_level": passage.get('to_floor', 0),
-            "segments": segments,
-            "entry_point": {
-                "x": float(positions[0][0]),
-                "y": float(positions[0][1]),
-                "z": float(positions[0][2])
-            },
-            "exit_point": {
-                "x": float(positions[-1][0]),
-                "y": float(positions[-1][1]),
-                "z": float(positions[-1][2])
-            }
-        })
-
     return {
         "job_id": job_id,
         "total_nodes": len(raw_positions),
@@ -657,7 +844,83 @@ def _build_processing_result(
     }
 
 
-def _generate_preview_images(
+def _serialize_processing_result(**kwargs) -> str:
+    """
+    처리 결과를 응답 스키마로 검증하고 JSON 문자열로 직렬화합니다.
+
+    완료 시 워커 프로세스에서 한 번만 실행하므로, 결과 조회 요청마다
+    대용량 딕셔너리를 다시 검증·직렬화하지 않습니다.
+
+    Args:
+        **kwargs: _build_processing_result 인자
+
+    Returns:
+        ProcessingResultResponse 형식의 JSON 문자열
+    """
+    result = _build_processing_result(**kwargs)
+    return ProcessingResultResponse.model_validate(result).model_dump_json()
+
+
+def _write_processing_result(result_path: str, **kwargs) -> str:
+    """
+    처리 결과를 JSON 파일로 기록합니다 (워커 프로세스에서 실행).
+
+    결과는 이벤트 루프 프로세스의 메모리에 올리지 않고 파일로만 유지하며,
+    결과 조회 시 FileResponse로 그대로 전송합니다.
+
+    Args:
+        result_path: 기록할 파일 경로
+        **kwargs: _build_processing_result 인자
+
+    Returns:
+        기록한 파일 경로
+    """
+    with open(result_path, "w", encoding="utf-8") as f:
+        f.write(_serialize_processing_result(**kwargs))
+    return result_path
+
+
+def _segments_from_points(points: list, lengths: list) -> list:
+    """
+    좌표 딕셔너리 리스트와 세그먼트 길이로 세그먼트 리스트를 만듭니다.
+
+    Args:
+        points: {"x", "y", "z"} 딕셔너리 리스트 (N개)
+        lengths: 연속 좌표 간 길이 리스트 (N-1개)
+
+    Returns:
+        세그먼트 리스트
+    """
+    return [
+        {
+            "sequence_order": i,
+            "start_point": points[i],
+            "end_point": points[i + 1],
+            "length": length
+        }
+        for i, length in enumerate(lengths)
+    ]
+
+
+def _concat_positions(position_arrays) -> tuple:
+    """
+    여러 좌표 배열을 하나의 (N, 3) 버퍼와 CSR 형태 오프셋으로 합칩니다.
+
+    배열 i의 좌표는 points[offsets[i]:offsets[i + 1]] 입니다.
+
+    Args:
+        position_arrays: 좌표 배열(또는 리스트)의 iterable (층 또는 수직 통로)
+
+    Returns:
+        (좌표 버퍼, 오프셋 배열 [M + 1])
+    """
+    arrays = [np.asarray(positions, dtype=float) for positions in position_arrays]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(arr) for arr in arrays], out=offsets[1:])
+    return np.concatenate(arrays), offsets
+
+
+async def _generate_preview_images(
     raw_positions: np.ndarray,
     smoothed_floors: dict,
     vertical_passages: list,
@@ -666,7 +929,8 @@ def _generate_preview_images(
     """
     미리보기 이미지를 생성합니다.
 
-    시각화 모듈이 없는 경우 빈 경로를 반환합니다.
+    이미지끼리는 독립적이므로 타입별로 워커 프로세스에 동시에 분배합니다.
+    (matplotlib pyplot 상태는 스레드 안전하지 않으므로 스레드가 아닌 프로세스 사용)
 
     Args:
         raw_positions: 원본 좌표
@@ -677,17 +941,54 @@ def _generate_preview_images(
     Returns:
         이미지 경로 딕셔너리
     """
-    try:
-        from services.visualization import generate_preview_images
-        return generate_preview_images(
+    paths = await asyncio.gather(*(
+        _run_in_pool(
+            _render_preview_image,
+            image_type,
             raw_positions,
             smoothed_floors,
             vertical_passages,
             output_prefix
         )
+        for image_type in PREVIEW_IMAGE_TYPES
+    ))
+    return dict(zip(PREVIEW_IMAGE_TYPES, paths))
+
+
+def _render_preview_image(
+    image_type: str,
+    raw_positions: np.ndarray,
+    smoothed_floors: dict,
+    vertical_passages: list,
+    output_prefix: str
+) -> str:
+    """
+    미리보기 이미지 한 장을 생성합니다 (워커 프로세스에서 실행).
+
+    시각화 모듈이 없는 경우 빈 경로를 반환합니다.
+
+    Args:
+        image_type: 이미지 타입 ('raw', 'processed', 'comparison')
+        raw_positions: 원본 좌표
+        smoothed_floors: 층별 처리된 좌표
+        vertical_passages: 수직 통로 리스트
+        output_prefix: 출력 파일 접두사
+
+    Returns:
+        이미지 경로
+    """
+    try:
+        from services.visualization import render_preview_image
     except ImportError:
         # 시각화 모듈 없으면 빈 경로 반환
-        return {'raw': '', 'processed': ''}
+        return ''
+    return render_preview_image(
+        image_type,
+        raw_positions,
+        smoothed_floors,
+        vertical_passages,
+        output_prefix
+    )
 
 
 # =============================================================================
@@ -715,20 +1016,15 @@ async def get_job_status(job_id: str):
     Raises:
         404: 작업을 찾을 수 없음
     """
-    if job_id not in processing_jobs:
+    # 미리 만들어 둔 스냅샷을 그대로 반환 (result는 별도 엔드포인트에서 제공)
+    status = _job_status.get(job_id)
+    if status is None:
         raise HTTPException(
             status_code=404,
             detail=f"작업을 찾을 수 없습니다: {job_id}"
         )
 
-    job = processing_jobs[job_id]
-
-    # result는 별도 엔드포인트에서 제공
-    response = job.model_dump()
-    if response.get('result'):
-        del response['result']
-
-    return response
+    return status
 
 
 @app.get("/api/v1/jobs/{job_id}/result", tags=["Processing"], summary="처리 작업 결과 조회",
@@ -748,21 +1044,21 @@ async def get_job_result(job_id: str):
         404: 작업을 찾을 수 없음
         400: 작업이 아직 완료되지 않음
     """
-    if job_id not in processing_jobs:
+    job = await _get_job(job_id)
+    if job is None:
         raise HTTPException(
             status_code=404,
             detail=f"작업을 찾을 수 없습니다: {job_id}"
         )
 
-    job = processing_jobs[job_id]
-
     if job.status != "COMPLETED":
         raise HTTPException(
             status_code=400,
             detail=f"작업이 아직 완료되지 않았습니다. 현재 상태: {job.status}"
         )
 
-    return job.result
+    # 완료 시 기록해 둔 JSON 파일을 그대로 전송
+    return FileResponse(job.result_path, media_type="application/json")
 
 
 # =============================================================================
@@ -1,5 +1,7 @@
-from .extraction import extract_trajectory_from_db
-from .deduplication import deduplicate_path
+import numpy as np
+
+from .extraction import extract_trajectory_from_db, POSITION_DTYPE
+from .deduplication import deduplicate_path, simplify_path_rdp
 from .smoothing import smooth_path
 from .vertical_detector import (
     detect_vertical_passages,
@@ -7,7 +9,37 @@ from .vertical_detector import (
     detect_stairs_first,
     assign_floors_to_stairs
 )
-from .visualization import generate_preview_images
+from .path_flattening import snap_to_lines
+from .junction_detection import build_path_graph
+
+# 미리보기 이미지 타입 (생성 순서). matplotlib 없이 import 가능한 이 패키지에 두어
+# API 서버(main.py)와 렌더러(visualization.py)가 같은 목록을 공유
+PREVIEW_IMAGE_TYPES = ('raw', 'processed', 'comparison')
+
+
+def warmup_jit() -> None:
+    """
+    Numba 커널을 작은 합성 궤적으로 한 번씩 실행해 미리 로드합니다.
+
+    모든 커널은 cache=True로 컴파일 결과를 __pycache__에 저장하므로, 이 호출은
+    캐시를 읽어 오는 비용(캐시가 없으면 최초 컴파일)을 첫 작업 대신 여기서 치릅니다.
+    입력은 파이프라인과 같은 POSITION_DTYPE이므로 실제 호출과 같은 시그니처가 준비됩니다.
+    Numba가 없으면 NumPy 경로만 실행되므로 호출해도 무방합니다.
+    """
+    n = 64
+    t = np.arange(n, dtype=np.float64)
+    positions = np.column_stack((
+        t * 0.3,
+        np.sin(t * 0.2),
+        np.clip((t - 20) * 0.15, 0.0, 3.0)   # 중간에 계단 형태의 Z 변화
+    )).astype(POSITION_DTYPE)
+
+    detect_stairs_first(positions)
+    deduplicate_path(positions, distance_threshold=0.5)
+    simplify_path_rdp(positions, epsilon=0.5)
+    snap_to_lines(positions, epsilon=0.5, point_spacing=0.5)
+    build_path_graph(positions)
+
 
 __all__ = [
     'extract_trajectory_from_db',
@@ -17,5 +49,16 @@ __all__ = [
     'separate_floors',
     'detect_stairs_first',
     'assign_floors_to_stairs',
-    'generate_preview_images'
+    'generate_preview_images',
+    'PREVIEW_IMAGE_TYPES',
+    'warmup_jit'
 ]
+
+
+def __getattr__(name):
+    # visualization은 matplotlib을 불러오므로 실제로 쓰일 때만 import
+    # (경로 처리만 하는 워커/스크립트는 matplotlib 초기화 비용을 치르지 않음)
+    if name == 'generate_preview_images':
+        from .visualization import generate_preview_images
+        return generate_preview_images
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
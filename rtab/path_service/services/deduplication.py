@@ -15,6 +15,7 @@ SLAM으로 실내 맵핑 시, 사용자가 같은 경로를 왕복하거나 반
 
 [제공 기능]
 1. deduplicate_path: KD-Tree 기반 공간 클러스터링으로 중복 제거
+   (deduplicate_floors: 여러 층을 KD-Tree 하나로 한 번에 처리)
 2. merge_overlapping_segments: 왕복 구간 감지 및 병합
 3. simplify_path_rdp: RDP 알고리즘으로 경로 단순화 (직선 구간 압축)
 
@@ -29,8 +30,18 @@ SLAM으로 실내 맵핑 시, 사용자가 같은 경로를 왕복하거나 반
 """
 
 import numpy as np
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist
+
+from services.extraction import POSITION_DTYPE
+
+# Numba가 설치된 경우 중복 제거/RDP 내부 루프를 JIT 컴파일 (없으면 NumPy 구현 사용)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 
 # =============================================================================
@@ -45,6 +56,15 @@ DEFAULT_DISTANCE_THRESHOLD = 0.3
 # - 직선에서 10cm 이내의 점은 생략 가능
 DEFAULT_RDP_EPSILON = 0.1
 
+# 재방문 검색용 KD-Tree 재구축 주기 (추가된 포인트 수)
+# - 마지막 재구축 이후 추가된 포인트는 선형 검사로 처리
+REVISIT_TREE_REBUILD_INTERVAL = 256
+
+# 분기점 검색 시 한 번에 계산할 거리 행렬 크기 (원소 수 상한)
+# - 첫 블록은 작게 시작해 두 배씩 늘림 (분기는 보통 앞쪽에서 발생)
+DIVERGENCE_BLOCK_ROWS = 32
+DIVERGENCE_MAX_BLOCK_ELEMENTS = 1 << 20
+
 
 # =============================================================================
 # KD-Tree 기반 중복 제거
@@ -62,8 +82,12 @@ def deduplicate_path(
 
     처리 흐름:
     1. 모든 포인트로 KD-Tree 구축 - O(N log N)
-    2. 각 포인트에 대해 threshold 거리 내의 이웃 검색 - O(log N)
-    3. 첫 번째로 방문한 포인트만 유지, 이웃들은 중복으로 표시
+    2. threshold 거리 내의 모든 포인트 쌍을 한 번에 검색 (query_pairs, C 구현)
+    3. 순서대로 훑으며 첫 번째로 방문한 포인트만 유지, 이웃들은 중복으로 표시
+
+    [연결 요소(union-find)를 쓰지 않는 이유]
+    이웃 관계를 전이적으로 묶으면 촘촘한 경로 전체가 하나의 점으로 합쳐집니다.
+    "먼저 방문한 점이 반경 내 이웃을 흡수"하는 기존 규칙을 그대로 유지합니다.
 
     [시간 복잡도]
     - 전체: O(N log N) - N은 포인트 수
@@ -94,32 +118,19 @@ def deduplicate_path(
     # cKDTree: C로 구현된 고속 KD-Tree (scipy)
     tree = cKDTree(positions)
 
-    # Step 2: 유지할 포인트 마스크 초기화
-    # True = 유지, False = 제거 (중복)
-    keep_mask = np.ones(len(positions), dtype=bool)
-
-    # Step 3: 이미 처리된 포인트 추적
-    visited = set()
+    # Step 2: 거리 내 모든 쌍 (i < j) → i 기준 CSR 이웃 목록
+    # 순서대로 훑으므로 유지된 i가 흡수할 대상은 뒤쪽 이웃 j뿐입니다.
+    pairs = tree.query_pairs(distance_threshold, output_type='ndarray')
+    pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+    indptr = np.zeros(len(positions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=len(positions)), out=indptr[1:])
+    neighbors = np.ascontiguousarray(pairs[:, 1], dtype=np.int64)
 
-    # Step 4: 각 포인트 처리
-    for i in range(len(positions)):
-        # 이미 중복으로 처리된 경우 스킵
-        if i in visited:
-            continue
-
-        # 현재 포인트 주변의 모든 이웃 검색
-        # query_ball_point: 주어진 거리 내의 모든 포인트 인덱스 반환
-        neighbors = tree.query_ball_point(positions[i], distance_threshold)
-
-        # 현재 포인트(i)는 유지하고, 나머지 이웃은 중복으로 표시
-        for j in neighbors:
-            if j != i and j not in visited:
-                keep_mask[j] = False  # 중복으로 표시
-                visited.add(j)
-
-        visited.add(i)
+    # Step 3: 첫 방문 포인트 유지, 이웃은 중복으로 표시
+    # True = 유지, False = 제거 (중복)
+    keep_mask = _greedy_cover_mask(indptr, neighbors)
 
-    # Step 5: 유지할 포인트만 추출
+    # Step 4: 유지할 포인트만 추출
     unique_positions = positions[keep_mask]
 
     # 최소 품질 보장 (너무 많이 제거된 경우 원본 반환)
@@ -129,6 +140,84 @@ def deduplicate_path(
     return unique_positions
 
 
+def deduplicate_floors(
+    floors: Dict[int, np.ndarray],
+    distance_threshold: float = DEFAULT_DISTANCE_THRESHOLD
+) -> Dict[int, np.ndarray]:
+    """
+    여러 층의 경로를 한 번에 중복 제거합니다.
+
+    모든 층을 하나의 배열로 이어 붙여 KD-Tree 구축과 쌍 검색을 한 번만 수행하고,
+    서로 다른 층에 속한 쌍은 버립니다. 결과는 층마다 deduplicate_path를
+    따로 호출한 것과 같습니다.
+
+    Args:
+        floors: {층 번호: [N, 3] 좌표 배열}
+        distance_threshold: 중복 판정 거리 (미터)
+
+    Returns:
+        {층 번호: 중복이 제거된 좌표 배열}
+    """
+    levels = list(floors.keys())
+    arrays = [np.asarray(floors[level]) for level in levels]
+    if not arrays:
+        return {}
+
+    lengths = np.array([len(arr) for arr in arrays], dtype=np.int64)
+    all_positions = np.concatenate(arrays, axis=0)
+    floor_ids = np.repeat(np.arange(len(arrays)), lengths)
+    if len(all_positions) < 2:
+        return dict(zip(levels, arrays))
+
+    # 전체 포인트로 KD-Tree 한 번 구축 → 같은 층 안의 쌍만 유지
+    tree = cKDTree(all_positions)
+    pairs = tree.query_pairs(distance_threshold, output_type='ndarray')
+    pairs = pairs[floor_ids[pairs[:, 0]] == floor_ids[pairs[:, 1]]]
+    pairs = pairs[np.argsort(pairs[:, 0], kind='stable')]
+    indptr = np.zeros(len(all_positions) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(pairs[:, 0], minlength=len(all_positions)), out=indptr[1:])
+    neighbors = np.ascontiguousarray(pairs[:, 1], dtype=np.int64)
+
+    # 층 경계를 넘는 이웃이 없으므로 층별 결과와 동일
+    keep_mask = _greedy_cover_mask(indptr, neighbors)
+
+    # 층별로 다시 분할 (deduplicate_path와 같은 최소 품질 보장 포함)
+    result = {}
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    for level, arr, begin, end in zip(levels, arrays, offsets[:-1], offsets[1:]):
+        unique_positions = arr[keep_mask[begin:end]]
+        result[level] = unique_positions if len(unique_positions) >= 2 else arr
+    return result
+
+
+def _greedy_cover_mask(indptr: np.ndarray, neighbors: np.ndarray) -> np.ndarray:
+    """
+    CSR 이웃 목록을 순서대로 훑어 유지할 포인트 마스크를 만듭니다.
+
+    Args:
+        indptr: [N+1] 포인트 i의 이웃 범위 (neighbors[indptr[i]:indptr[i+1]])
+        neighbors: 각 포인트보다 뒤에 있는 거리 내 이웃 인덱스
+
+    Returns:
+        유지할 포인트의 불리언 마스크
+    """
+    n = indptr.shape[0] - 1
+    keep_mask = np.zeros(n, dtype=np.bool_)
+    visited = np.zeros(n, dtype=np.bool_)
+    for i in range(n):
+        # 이미 중복으로 처리된 경우 스킵
+        if visited[i]:
+            continue
+        keep_mask[i] = True
+        for k in range(indptr[i], indptr[i + 1]):
+            visited[neighbors[k]] = True
+    return keep_mask
+
+
+if NUMBA_AVAILABLE:
+    _greedy_cover_mask = njit(cache=True)(_greedy_cover_mask)
+
+
 # =============================================================================
 # 왕복 구간 병합
 # =============================================================================
@@ -164,22 +253,35 @@ def merge_overlapping_segments(
     if len(positions) < 3:
         return positions
 
-    # 결과 경로 (첫 포인트로 초기화)
-    result = [positions[0]]
-    i = 1
+    # 결과 경로 (미리 할당한 배열 + 커서, 첫 포인트로 초기화)
+    result = np.empty_like(positions)
+    result[0] = positions[0]
+    count = 1
 
+    # 결과 경로의 앞부분 [0, tree_size)를 담는 KD-Tree (주기적으로 재구축)
+    tree = None
+    tree_size = 0
+
+    i = 1
     while i < len(positions):
         current = positions[i]
 
+        if count - tree_size >= REVISIT_TREE_REBUILD_INTERVAL:
+            tree = cKDTree(result[:count])
+            tree_size = count
+
         # 현재 위치가 이전 경로의 어딘가와 가까운지 확인
-        revisit_idx = _find_revisit_point(result, current, overlap_threshold)
+        # (직전 두 포인트는 제외 - 충분히 이전 지점만 재방문으로 인정)
+        revisit_idx = _find_revisit_point(
+            result, count - 2, tree, tree_size, current, overlap_threshold
+        )
 
-        # 재방문이 감지되었고, 충분히 이전 지점인 경우
-        if revisit_idx is not None and revisit_idx < len(result) - 2:
+        # 재방문이 감지된 경우
+        if revisit_idx is not None:
             # 앞으로의 경로에서 분기점 찾기
             diverge_idx = _find_divergence_point(
-                positions[i:],           # 앞으로 갈 경로
-                result[revisit_idx:],    # 재방문 감지된 이전 경로 구간
+                positions[i:],                 # 앞으로 갈 경로
+                result[revisit_idx:count],     # 재방문 감지된 이전 경로 구간
                 overlap_threshold
             )
 
@@ -189,14 +291,18 @@ def merge_overlapping_segments(
                 continue
 
         # 일반 케이스: 현재 포인트 추가
-        result.append(current)
+        result[count] = current
+        count += 1
         i += 1
 
-    return np.array(result)
+    return result[:count]
 
 
 def _find_revisit_point(
-    path: List[np.ndarray],
+    path: np.ndarray,
+    limit: int,
+    tree: Optional[cKDTree],
+    tree_size: int,
     point: np.ndarray,
     threshold: float
 ) -> Optional[int]:
@@ -204,28 +310,47 @@ def _find_revisit_point(
     현재 포인트가 이전 경로의 어느 지점을 재방문하는지 찾습니다.
 
     [역할]
-    - 경로의 각 포인트와 현재 포인트의 거리 계산
-    - threshold 이내의 가장 가까운 이전 포인트 인덱스 반환
+    - path[:limit] 중 threshold 이내인 가장 앞선 포인트 인덱스 반환
+    - path[:tree_size]는 KD-Tree로 검색, 그 이후 구간만 선형 검사
 
     Args:
-        path: 지금까지 구성된 경로 (리스트)
+        path: 지금까지 구성된 경로 (미리 할당된 배열)
+        limit: 검사할 포인트 수 (path[:limit])
+        tree: path[:tree_size]로 구축된 KD-Tree (없으면 None)
+        tree_size: KD-Tree에 포함된 포인트 수
         point: 현재 검사할 포인트
         threshold: 재방문 판정 거리
 
     Returns:
         재방문 포인트의 인덱스, 없으면 None
     """
-    # 마지막 포인트는 제외 (바로 직전 포인트와의 비교는 의미 없음)
-    for i, p in enumerate(path[:-1]):
-        distance = np.linalg.norm(np.array(p) - point)
-        if distance < threshold:
-            return i
+    if limit <= 0:
+        return None
+
+    # KD-Tree 구간: 후보를 뽑은 뒤 엄격한 부등호(<)로 다시 확인
+    if tree is not None:
+        candidates = np.asarray(tree.query_ball_point(point, threshold), dtype=np.intp)
+        candidates = candidates[candidates < limit]
+        if len(candidates) > 0:
+            distances = np.linalg.norm(path[candidates] - point, axis=1)
+            hits = candidates[distances < threshold]
+            if len(hits) > 0:
+                return int(hits.min())
+
+    # 재구축 이후 추가된 꼬리 구간: 선형 검사
+    tail_start = tree_size if tree is not None else 0
+    if tail_start >= limit:
+        return None
+    distances = np.linalg.norm(path[tail_start:limit] - point, axis=1)
+    hits = np.flatnonzero(distances < threshold)
+    if len(hits) > 0:
+        return tail_start + int(hits[0])
     return None
 
 
 def _find_divergence_point(
     forward_path: np.ndarray,
-    backward_path: List[np.ndarray],
+    backward_path: np.ndarray,
     threshold: float
 ) -> Optional[int]:
     """
@@ -234,6 +359,8 @@ def _find_divergence_point(
     [역할]
     - forward_path의 각 포인트가 backward_path의 어떤 포인트와도
       threshold 이상 떨어지는 최초의 인덱스를 반환
+    - forward_path를 블록 단위로 나눠 거리 행렬(cdist)을 한 번에 계산하고,
+      분기점이 나온 블록에서 바로 종료 (제곱 거리로 비교해 sqrt 생략)
 
     Args:
         forward_path: 앞으로 진행할 경로
@@ -243,15 +370,25 @@ def _find_divergence_point(
     Returns:
         분기 시작 인덱스, 없으면 None
     """
-    backward_arr = np.array(backward_path)
+    backward_arr = np.asarray(backward_path)
+    threshold_sq = threshold * threshold
+    max_rows = max(1, DIVERGENCE_MAX_BLOCK_ELEMENTS // max(len(backward_arr), 1))
+
+    start = 0
+    rows = DIVERGENCE_BLOCK_ROWS
+    while start < len(forward_path):
+        block = forward_path[start:start + min(rows, max_rows)]
 
-    for i, point in enumerate(forward_path):
-        # 현재 포인트에서 backward_path의 모든 포인트까지 거리 계산
-        distances = np.linalg.norm(backward_arr - point, axis=1)
+        # 블록의 각 포인트에서 backward_path까지의 최소 제곱 거리
+        min_sq = cdist(block, backward_arr, 'sqeuclidean').min(axis=1)
 
         # 모든 거리가 threshold보다 크면 = 새로운 영역으로 분기
-        if np.min(distances) > threshold:
-            return i
+        diverged = np.flatnonzero(min_sq > threshold_sq)
+        if len(diverged) > 0:
+            return start + int(diverged[0])
+
+        start += len(block)
+        rows *= 2
 
     return None
 
@@ -274,7 +411,7 @@ def simplify_path_rdp(
     1. 시작점과 끝점을 잇는 직선을 그림
     2. 중간 포인트들 중 직선에서 가장 먼 점을 찾음
     3. 가장 먼 점의 거리가 epsilon 이하면 → 중간 점들 모두 제거
-    4. epsilon 초과면 → 그 점을 기준으로 분할 후 재귀 처리
+    4. epsilon 초과면 → 그 점을 기준으로 분할 (구간 스택으로 반복 처리, 재귀 없음)
 
     [시각적 예시]
     원본:     A ----*---*---*---- B   (* = 직선에서 약간 벗어난 점들)
@@ -302,119 +439,152 @@ def simplify_path_rdp(
     if len(positions) < 3:
         return positions
 
-    # 재귀적으로 유지할 포인트 인덱스 계산
-    indices = _rdp_recursive(positions, epsilon)
+    # 추출 단계와 같은 float32 그대로 스캔 (epsilon이 수십 cm라 정밀도 충분, float64 복사본 없음)
+    points = np.ascontiguousarray(positions, dtype=POSITION_DTYPE)
+
+    # 유지할 포인트 마스크 계산 (반복 스택 구현)
+    if NUMBA_AVAILABLE:
+        keep_mask = _rdp_mask_numba(points, float(epsilon))
+    else:
+        keep_mask = _rdp_mask(points, epsilon)
 
-    # 계산된 인덱스의 포인트만 반환
-    return positions[indices]
+    # 마스크된 포인트만 반환
+    return positions[keep_mask]
 
 
-def _rdp_recursive(points: np.ndarray, epsilon: float) -> List[int]:
+def _rdp_mask(points: np.ndarray, epsilon: float) -> np.ndarray:
     """
-    RDP 알고리즘의 재귀 구현부입니다.
+    RDP 알고리즘의 반복 구현부입니다 (NumPy).
 
-    [재귀 구조]
-    Base case: 포인트가 3개 미만이면 모두 유지
-    Recursive case:
-        1. 시작-끝 직선에서 가장 먼 점 찾기
-        2. 거리 > epsilon: 그 점에서 분할 후 양쪽 재귀
-        3. 거리 <= epsilon: 시작점과 끝점만 유지
+    [구조]
+    재귀 대신 (시작, 끝) 구간 스택을 사용합니다.
+        1. 구간의 시작-끝 직선에서 가장 먼 점 찾기 (구간 전체를 한 번에 계산)
+        2. 거리 > epsilon: 그 점을 유지하고 양쪽 구간을 스택에 추가
+        3. 거리 <= epsilon: 중간 점 모두 제거
 
     Args:
-        points: 처리할 포인트 배열
+        points: [N, 3] float32 포인트 배열 (POSITION_DTYPE)
         epsilon: 허용 오차
 
     Returns:
-        유지할 포인트의 인덱스 리스트
+        유지할 포인트의 불리언 마스크
     """
-    # Base case
-    if len(points) < 3:
-        return list(range(len(points)))
-
-    # 시작점과 끝점
-    start = points[0]
-    end = points[-1]
-
-    # 시작-끝 직선 벡터
-    line_vec = end - start
-    line_len = np.linalg.norm(line_vec)
-
-    # 시작점과 끝점이 거의 같은 위치인 경우
-    if line_len < 1e-10:
-        return [0, len(points) - 1]
-
-    # 직선의 단위 벡터
-    line_unit = line_vec / line_len
-
-    # 가장 먼 점 찾기
-    max_dist = 0
-    max_idx = 0
-
-    for i in range(1, len(points) - 1):
-        # 점에서 직선까지의 수직 거리 계산
-        dist = _point_to_line_distance(points[i], start, line_unit)
-
-        if dist > max_dist:
-            max_dist = dist
-            max_idx = i
-
-    # Recursive case
-    if max_dist > epsilon:
-        # 가장 먼 점을 기준으로 분할
-        # 왼쪽: start ~ max_idx (포함)
-        left_indices = _rdp_recursive(points[:max_idx + 1], epsilon)
-        # 오른쪽: max_idx ~ end (max_idx부터 시작)
-        right_indices = _rdp_recursive(points[max_idx:], epsilon)
-
-        # 결과 병합 (max_idx가 중복되지 않도록)
-        # left_indices[-1]과 right_indices[0]은 같은 점(max_idx)
-        return left_indices[:-1] + [idx + max_idx for idx in right_indices]
-    else:
-        # 모든 중간 점이 epsilon 이내 → 시작점과 끝점만 유지
-        return [0, len(points) - 1]
+    n = len(points)
+    keep_mask = np.zeros(n, dtype=bool)
+    keep_mask[0] = keep_mask[-1] = True
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
 
+        start = points[first]
+        line_vec = points[last] - start
+        line_len = np.linalg.norm(line_vec)
 
-def _point_to_line_distance(
-    point: np.ndarray,
+        # 시작점과 끝점이 거의 같은 위치인 경우
+        if line_len < 1e-10:
+            continue
+
+        # 점에서 직선까지의 수직 거리 = |AP × AB| / |AB|
+        dists = _point_to_line_distances(points[first + 1:last], start, line_vec, line_len)
+        max_offset = int(np.argmax(dists))
+
+        if dists[max_offset] > epsilon:
+            max_idx = first + 1 + max_offset
+            keep_mask[max_idx] = True
+            stack.append((first, max_idx))
+            stack.append((max_idx, last))
+
+    return keep_mask
+
+
+def _point_to_line_distances(
+    points: np.ndarray,
     line_start: np.ndarray,
-    line_unit: np.ndarray
-) -> float:
+    line_vec: np.ndarray,
+    line_len: float
+) -> np.ndarray:
     """
-    점에서 직선까지의 수직 거리를 계산합니다.
+    여러 점에서 직선까지의 수직 거리를 한 번에 계산합니다.
 
     [수학적 원리]
-    점 P에서 직선 AB까지의 거리:
-    1. 벡터 AP를 직선 방향으로 투영
-    2. 투영점 Q 계산
-    3. 거리 = |PQ|
+    점 P에서 직선 AB까지의 거리는 평행사변형 넓이를 밑변으로 나눈 값:
+        거리 = |AP × AB| / |AB|
 
          P
          |
          | ← 수직 거리
          |
     A----Q--------B
-         ↑
-      투영점
 
     Args:
-        point: 거리를 측정할 점
+        points: 거리를 측정할 점들 [M, 3]
         line_start: 직선의 시작점 (A)
-        line_unit: 직선의 단위 방향 벡터
+        line_vec: 직선 벡터 (AB)
+        line_len: 직선 길이 (|AB|)
 
     Returns:
-        점에서 직선까지의 수직 거리
+        각 점에서 직선까지의 수직 거리 [M]
     """
-    # 시작점에서 점까지의 벡터
-    point_vec = point - line_start
-
-    # 직선 방향으로의 투영 길이 (내적)
-    projection_length = np.dot(point_vec, line_unit)
+    cross = np.cross(points - line_start, line_vec)
+    return np.linalg.norm(cross, axis=1) / line_len
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True, nogil=True)
+    def _rdp_mask_numba(points, epsilon):
+        """_rdp_mask의 Numba 버전 (외적 거리를 스칼라 루프로 직접 계산)"""
+        n = points.shape[0]
+        keep_mask = np.zeros(n, dtype=np.bool_)
+        keep_mask[0] = True
+        keep_mask[n - 1] = True
+
+        # 구간 스택 (구간은 항상 서로 겹치지 않으므로 N개면 충분)
+        stack = np.empty((n, 2), dtype=np.int64)
+        stack[0, 0] = 0
+        stack[0, 1] = n - 1
+        top = 1
+
+        while top > 0:
+            top -= 1
+            first = stack[top, 0]
+            last = stack[top, 1]
+            if last - first < 2:
+                continue
 
-    # 투영점 좌표
-    projection_point = line_start + projection_length * line_unit
+            sx, sy, sz = points[first, 0], points[first, 1], points[first, 2]
+            dx = points[last, 0] - sx
+            dy = points[last, 1] - sy
+            dz = points[last, 2] - sz
+            line_len = np.sqrt(dx * dx + dy * dy + dz * dz)
+            if line_len < 1e-10:
+                continue
 
-    # 점에서 투영점까지의 거리 = 수직 거리
-    return np.linalg.norm(point - projection_point)
+            max_dist = 0.0
+            max_idx = first
+            for k in range(first + 1, last):
+                px = points[k, 0] - sx
+                py = points[k, 1] - sy
+                pz = points[k, 2] - sz
+                cx = py * dz - pz * dy
+                cy = pz * dx - px * dz
+                cz = px * dy - py * dx
+                dist = np.sqrt(cx * cx + cy * cy + cz * cz) / line_len
+                if dist > max_dist:
+                    max_dist = dist
+                    max_idx = k
+
+            if max_dist > epsilon:
+                keep_mask[max_idx] = True
+                stack[top, 0] = first
+                stack[top, 1] = max_idx
+                stack[top + 1, 0] = max_idx
+                stack[top + 1, 1] = last
+                top += 2
+
+        return keep_mask
 
 
 # =============================================================================
@@ -25,13 +25,12 @@ RTAB-Map DB 궤적 추출 모듈 (Trajectory Extraction Module)
 
     positions, node_ids = extract_trajectory_from_db("path/to/map.db")
     # positions: numpy 배열 [N, 3] - 각 행이 (x, y, z) 좌표
-    # node_ids: 해당 위치의 원본 노드 ID 리스트
+    # node_ids: 해당 위치의 원본 노드 ID 배열 [N] (int64)
 """
 
 import sqlite3
-import struct
 import numpy as np
-from typing import Tuple, List, Optional
+from typing import Tuple, Optional
 
 
 # =============================================================================
@@ -43,6 +42,19 @@ POSE_BLOB_SIZE = 48
 FLOATS_PER_POSE = 12
 POSE_MATRIX_SHAPE = (3, 4)
 
+# 위치 배열 dtype (DB 원본과 같은 float32 - 실내 좌표 범위에서 mm 이하 정밀도,
+# float64 대비 메모리/대역폭 절반)
+POSITION_DTYPE = np.float32
+
+# DB 조회 배치 크기 (행 수) - 전체 행을 한 번에 파이썬 객체로 올리지 않음
+FETCH_BATCH_SIZE = 10_000
+
+# SQLite 메모리 맵 크기 (256MB) - 페이지를 read() 복사 없이 접근
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024
+
+# 원점 판정 허용 오차 (모든 축이 이 값 이하면 초기화 전 pose로 간주)
+ORIGIN_TOLERANCE = 1e-6
+
 
 # =============================================================================
 # Pose 추출 함수들
@@ -53,8 +65,8 @@ def extract_pose(pose_blob: bytes) -> Optional[np.ndarray]:
     바이너리 blob에서 3x4 변환 행렬을 추출합니다.
 
     [동작 원리]
-    1. 48바이트 blob을 12개의 float로 언패킹
-    2. 12개 float를 3x4 행렬로 재배열 (row-major)
+    1. 48바이트 blob을 12개의 float32 배열로 바로 해석 (np.frombuffer)
+    2. 12개 float를 3x4 행렬로 재배열 (row-major, float32 유지)
 
     Args:
         pose_blob: RTAB-Map DB에서 가져온 pose 바이너리 데이터
@@ -75,19 +87,11 @@ def extract_pose(pose_blob: bytes) -> Optional[np.ndarray]:
     if len(pose_blob) != POSE_BLOB_SIZE:
         return None
 
-    try:
-        # struct.unpack: 바이너리 → Python 숫자
-        # '12f': 12개의 float (little-endian)
-        values = struct.unpack('12f', pose_blob)
+    # 바이너리 → float32 배열 (little-endian, 튜플 변환 없이 버퍼를 그대로 해석)
+    values = np.frombuffer(pose_blob, dtype='<f4', count=FLOATS_PER_POSE)
 
-        # 1차원 배열 → 3x4 행렬
-        matrix = np.array(values).reshape(POSE_MATRIX_SHAPE)
-
-        return matrix
-
-    except struct.error:
-        # 언패킹 실패 (잘못된 데이터 형식)
-        return None
+    # 1차원 배열 → 3x4 행렬 (POSITION_DTYPE, 쓰기 가능한 복사본)
+    return values.reshape(POSE_MATRIX_SHAPE).astype(POSITION_DTYPE)
 
 
 def get_position_from_matrix(matrix: np.ndarray) -> Optional[np.ndarray]:
@@ -132,36 +136,54 @@ def is_valid_position(position: np.ndarray) -> bool:
     if position is None:
         return False
 
+    x, y, z = float(position[0]), float(position[1]), float(position[2])
+
     # NaN 또는 무한대 체크
-    if not np.isfinite(position).all():
+    if not (np.isfinite(x) and np.isfinite(y) and np.isfinite(z)):
         return False
 
-    # 원점 체크 (매우 작은 값도 무효로 처리)
-    if np.allclose(position, [0, 0, 0], atol=1e-6):
+    # 원점 체크 (매우 작은 값도 무효로 처리, 임시 배열 없이 스칼라 비교)
+    if abs(x) <= ORIGIN_TOLERANCE and abs(y) <= ORIGIN_TOLERANCE and abs(z) <= ORIGIN_TOLERANCE:
         return False
 
     return True
 
 
+def valid_position_mask(positions: np.ndarray) -> np.ndarray:
+    """
+    [N, 3] 위치 배열 전체에 is_valid_position을 한 번에 적용합니다.
+
+    Args:
+        positions: [N, 3] 좌표 배열
+
+    Returns:
+        유효한 행이면 True인 [N] 불리언 마스크
+    """
+    finite = np.isfinite(positions).all(axis=1)
+    not_origin = (np.abs(positions) > ORIGIN_TOLERANCE).any(axis=1)
+    return finite & not_origin
+
+
 # =============================================================================
 # DB에서 궤적 추출
 # =============================================================================
 
-def extract_trajectory_from_db(db_path: str) -> Tuple[np.ndarray, List[int]]:
+def extract_trajectory_from_db(db_path: str) -> Tuple[np.ndarray, np.ndarray]:
     """
     RTAB-Map DB에서 전체 카메라 이동 궤적을 추출합니다.
 
     [처리 흐름]
     1. SQLite DB 연결
-    2. Node 테이블에서 모든 pose 조회 (id 순서)
-    3. 각 pose blob → 3x4 행렬 → (x, y, z) 위치 추출
-    4. 유효한 위치만 필터링
+    2. Node 테이블에서 48바이트 pose만 조회 (id 순서)
+    3. FETCH_BATCH_SIZE 행씩 읽어 배치마다 [K, 3, 4] 행렬 배열로 변환 → (x, y, z) 위치 추출
+    4. 유효한 위치만 필터링 (벡터 연산)
 
     [반환 데이터]
-    - positions: [N, 3] numpy 배열
+    - positions: [N, 3] float32 numpy 배열 (POSITION_DTYPE)
       - N = 유효한 노드 수
       - 각 행 = (x, y, z) 3D 좌표
-    - node_ids: 해당 위치의 원본 노드 ID 리스트
+    - node_ids: 해당 위치의 원본 노드 ID [N] int64 numpy 배열
+      (positions와 같은 길이 - 불리언 마스크로 함께 인덱싱 가능)
 
     Args:
         db_path: RTAB-Map .db 파일 경로
@@ -183,38 +205,49 @@ def extract_trajectory_from_db(db_path: str) -> Tuple[np.ndarray, List[int]]:
     cursor = conn.cursor()
 
     try:
-        # 모든 노드의 pose 조회 (id 순서대로 = 시간 순서)
-        cursor.execute('SELECT id, pose FROM Node ORDER BY id')
-        rows = cursor.fetchall()
-
-        # 결과 저장용 리스트
-        positions = []
-        node_ids = []
-
-        # 각 노드 처리
-        for node_id, pose_blob in rows:
-            # Step 1: blob → 변환 행렬
-            matrix = extract_pose(pose_blob)
-            if matrix is None:
-                continue
-
-            # Step 2: 행렬 → 위치 벡터
-            position = get_position_from_matrix(matrix)
-
-            # Step 3: 유효성 검증
-            if is_valid_position(position):
-                positions.append(position)
-                node_ids.append(node_id)
+        cursor.execute(f'PRAGMA mmap_size = {SQLITE_MMAP_SIZE}')
+
+        # 크기가 올바른 pose만 조회 (id 순서대로 = 시간 순서)
+        cursor.arraysize = FETCH_BATCH_SIZE
+        cursor.execute(
+            'SELECT id, pose FROM Node WHERE length(pose) = ? ORDER BY id',
+            (POSE_BLOB_SIZE,)
+        )
+
+        # 배치 단위로 디코딩 (메모리에는 배치 하나 분량의 행 객체만 유지)
+        id_chunks = []
+        position_chunks = []
+        while True:
+            rows = cursor.fetchmany()
+            if not rows:
+                break
+
+            # Step 1: 배치의 모든 blob → [K, 3, 4] 행렬 (blob을 이어붙여 한 번에 해석)
+            id_chunks.append(np.fromiter((node_id for node_id, _ in rows), dtype=np.int64, count=len(rows)))
+            blobs = b''.join(pose_blob for _, pose_blob in rows)
+            matrices = np.frombuffer(blobs, dtype='<f4').reshape(-1, *POSE_MATRIX_SHAPE)
+
+            # Step 2: 행렬 → 위치 벡터 (마지막 열, 연속 메모리 float32)
+            position_chunks.append(np.ascontiguousarray(matrices[:, :, 3], dtype=POSITION_DTYPE))
+
+        ids = np.concatenate(id_chunks) if id_chunks else np.empty(0, dtype=np.int64)
+        positions = (
+            np.concatenate(position_chunks) if position_chunks
+            else np.empty((0, 3), dtype=POSITION_DTYPE)
+        )
+
+        # Step 3: 유효성 검증 (유한값 & 원점 아님)
+        valid = valid_position_mask(positions)
 
         # 결과 검증
-        if len(positions) == 0:
+        if not valid.any():
+            total = cursor.execute('SELECT COUNT(*) FROM Node').fetchone()[0]
             raise ValueError(
                 f"DB에서 유효한 pose를 찾을 수 없습니다: {db_path}\n"
-                f"총 {len(rows)}개 노드 중 유효한 pose가 0개입니다."
+                f"총 {total}개 노드 중 유효한 pose가 0개입니다."
             )
 
-        # 리스트 → numpy 배열
-        return np.array(positions), node_ids
+        return positions[valid], ids[valid]
 
     finally:
         # DB 연결 종료 (예외 발생해도 반드시 실행)
@@ -249,28 +282,26 @@ def get_trajectory_stats(positions: np.ndarray) -> dict:
         >>> print(f"총 이동 거리: {stats['total_distance']:.2f}m")
         >>> print(f"높이 범위: {stats['z_range'][0]:.2f} ~ {stats['z_range'][1]:.2f}m")
     """
-    # 각 축 분리
-    x = positions[:, 0]
-    y = positions[:, 1]
-    z = positions[:, 2]
+    # 축별 최소/최대값을 한 번에
+    min_xyz = positions.min(axis=0).tolist()
+    max_xyz = positions.max(axis=0).tolist()
 
     # 연속된 점 간의 거리 계산
-    # np.diff: 배열의 연속된 원소 간 차이 계산
-    dx = np.diff(x)  # x₂-x₁, x₃-x₂, ...
-    dy = np.diff(y)
-    dz = np.diff(z)
+    # np.diff: 배열의 연속된 원소 간 차이 계산 ([N-1, 3], x₂-x₁, ...)
+    diffs = np.diff(positions, axis=0)
 
-    # 각 구간의 3D 거리
-    segment_distances = np.sqrt(dx**2 + dy**2 + dz**2)
+    # 각 구간의 3D 거리 (제곱합을 einsum 한 번으로, 축별 임시 배열 없이)
+    segment_distances = np.einsum('ij,ij->i', diffs, diffs)
+    np.sqrt(segment_distances, out=segment_distances)
 
     # 총 이동 거리
     total_distance = np.sum(segment_distances)
 
     return {
         'total_nodes': len(positions),
-        'x_range': (float(x.min()), float(x.max())),
-        'y_range': (float(y.min()), float(y.max())),
-        'z_range': (float(z.min()), float(z.max())),
+        'x_range': (min_xyz[0], max_xyz[0]),
+        'y_range': (min_xyz[1], max_xyz[1]),
+        'z_range': (min_xyz[2], max_xyz[2]),
         'total_distance': float(total_distance),
         'avg_step_distance': float(np.mean(segment_distances)) if len(segment_distances) > 0 else 0
     }
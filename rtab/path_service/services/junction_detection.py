@@ -47,12 +47,20 @@
 """
 
 import numpy as np
-from typing import List, Dict, Tuple, Optional, Set
+from typing import List, Dict, Tuple, Optional, Set, Union
 from dataclasses import dataclass
 from enum import Enum
+import os
 import uuid
 from scipy.spatial import cKDTree
 
+# Numba가 설치된 경우 노드 선택 루프를 JIT 컴파일 (없으면 같은 코드를 파이썬으로 실행)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 
 # =============================================================================
 # 타입 정의
@@ -93,6 +101,57 @@ class PathNode:
         }
 
 
+@dataclass
+class PathNodes:
+    """
+    경로 그래프 노드 묶음 (구조체 배열 대신 배열 구조체)
+
+    노드마다 PathNode 객체를 만들지 않고 좌표/인덱스를 연속 배열로 보관합니다.
+    인덱싱/순회 시에는 PathNode를 돌려주므로 List[PathNode]처럼 사용할 수 있습니다.
+    """
+    ids: List[str]
+    xyz: np.ndarray                 # [N, 3] float64 좌표
+    node_types: List[NodeType]
+    original_index: np.ndarray      # [N] int64, 원본 positions 배열에서의 인덱스 (오름차순)
+    floor_level: Optional[int] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, i: int) -> PathNode:
+        x, y, z = self.xyz[i].tolist()
+        return PathNode(
+            id=self.ids[i],
+            x=x,
+            y=y,
+            z=z,
+            node_type=self.node_types[i],
+            original_index=int(self.original_index[i]),
+            floor_level=self.floor_level
+        )
+
+    def __iter__(self):
+        return (self[i] for i in range(len(self)))
+
+    def to_dicts(self) -> List[Dict]:
+        """PathNode.to_dict()와 같은 형식의 딕셔너리 리스트 (좌표/인덱스는 tolist로 한 번에 변환)"""
+        return [
+            {
+                'id': node_id,
+                'x': x,
+                'y': y,
+                'z': z,
+                'type': node_type.value,
+                'original_index': idx,
+                'floor_level': self.floor_level,
+                'metadata': {}
+            }
+            for node_id, idx, (x, y, z), node_type in zip(
+                self.ids, self.original_index.tolist(), self.xyz.tolist(), self.node_types
+            )
+        ]
+
+
 @dataclass
 class PathEdge:
     """경로 그래프의 엣지"""
@@ -179,35 +238,64 @@ def detect_junctions(
     if len(positions) < 5:
         return []
 
-    junctions = []
+    # Step 1: 단위 방향 벡터 계산 (한 번만 정규화, 각도는 float64로 계산)
+    unit, lengths = _unit_directions(positions)  # [N-1, 3], [N-1]
+    return _junctions_from_directions(positions, unit, lengths, angle_threshold, min_branch_points)
 
-    # Step 1: 방향 벡터 계산
-    directions = np.diff(positions, axis=0)  # [N-1, 3]
 
-    # Step 2: 각 포인트에서 방향 변화 각도 계산
-    for i in range(1, len(directions) - 1):
-        # 이전 방향
-        v1 = directions[i - 1]
-        # 다음 방향
-        v2 = directions[i]
+def _junctions_from_directions(
+    positions: np.ndarray,
+    unit: np.ndarray,
+    lengths: np.ndarray,
+    angle_threshold: float,
+    min_branch_points: int
+) -> List[Dict]:
+    """
+    미리 계산한 단위 방향 벡터/구간 길이로 갈림길을 감지합니다.
 
-        # 각도 계산
-        angle = _angle_between_vectors(v1, v2)
+    detect_junctions와 build_path_graph가 공유하는 부분입니다.
+    (build_path_graph는 같은 구간 길이로 엣지 누적 거리도 구하므로 좌표를 다시 읽지 않음)
 
-        # 갈림길 후보 판정
-        if angle >= angle_threshold:
-            # 추가 검증: 분기점 전후에 충분한 경로가 있는지
-            points_before = i
-            points_after = len(positions) - i - 1
+    Args:
+        positions: [N, 3] 좌표 배열 (N >= 5)
+        unit: [N-1, 3] 단위 방향 벡터 (_unit_directions)
+        lengths: [N-1] 구간 길이 (_unit_directions)
+        angle_threshold: 갈림길 판정 각도 (도)
+        min_branch_points: 최소 분기 길이
 
-            if points_before >= min_branch_points and points_after >= min_branch_points:
-                junctions.append({
-                    'index': i,
-                    'position': positions[i].tolist(),
-                    'angle_change': float(angle),
-                    'incoming_direction': (v1 / np.linalg.norm(v1)).tolist() if np.linalg.norm(v1) > 0 else [0, 0, 0],
-                    'outgoing_direction': (v2 / np.linalg.norm(v2)).tolist() if np.linalg.norm(v2) > 0 else [0, 0, 0]
-                })
+    Returns:
+        병합된 갈림길 정보 딕셔너리 리스트 (detect_junctions와 동일)
+    """
+    valid = lengths >= 1e-10
+
+    # Step 2: 모든 포인트 i의 방향 변화 각도를 한 번에 계산
+    # 포인트 i (1 ≤ i ≤ N-3): 이전 방향 unit[i-1], 다음 방향 unit[i]
+    # 단위 벡터끼리의 내적이 곧 cos이므로 쌍마다 다시 정규화하지 않음
+    cos_angle = np.einsum('ij,ij->i', unit[:-2], unit[1:-1])
+    angles = np.degrees(np.arccos(np.clip(cos_angle, -1, 1)))
+    # 길이가 0에 가까운 방향(이동 없음)이 끼어 있으면 방향 변화 없음으로 보고 각도 0
+    angles[~(valid[:-2] & valid[1:-1])] = 0.0
+
+    # 갈림길 후보 판정 + 분기점 전후에 충분한 경로가 있는지 검증
+    indices = np.arange(1, len(unit) - 1)
+    points_before = indices
+    points_after = len(positions) - indices - 1
+    candidates = indices[
+        (angles >= angle_threshold)
+        & (points_before >= min_branch_points)
+        & (points_after >= min_branch_points)
+    ]
+
+    junctions = [
+        {
+            'index': int(i),
+            'position': positions[i].tolist(),
+            'angle_change': float(angles[i - 1]),
+            'incoming_direction': unit[i - 1].tolist(),
+            'outgoing_direction': unit[i].tolist()
+        }
+        for i in candidates
+    ]
 
     # Step 3: 가까운 갈림길 병합 (노이즈 제거)
     junctions = _merge_nearby_junctions(junctions, merge_radius=JUNCTION_MERGE_RADIUS)
@@ -215,26 +303,21 @@ def detect_junctions(
     return junctions
 
 
-def _angle_between_vectors(v1: np.ndarray, v2: np.ndarray) -> float:
+def _unit_directions(positions: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
     """
-    두 벡터 사이의 각도를 계산합니다 (도 단위).
+    연속 포인트 간 단위 방향 벡터와 구간 길이를 계산합니다.
 
     Args:
-        v1, v2: 3D 벡터
+        positions: [N, 3] 좌표 배열
 
     Returns:
-        각도 (0° ~ 180°)
+        (단위 방향 벡터 [N-1, 3] - 길이 0인 구간은 [0, 0, 0], 구간 길이 [N-1])
     """
-    len1 = np.linalg.norm(v1)
-    len2 = np.linalg.norm(v2)
-
-    if len1 < 1e-10 or len2 < 1e-10:
-        return 0.0
-
-    cos_angle = np.dot(v1, v2) / (len1 * len2)
-    cos_angle = np.clip(cos_angle, -1, 1)
-
-    return float(np.degrees(np.arccos(cos_angle)))
+    directions = np.diff(np.asarray(positions, dtype=float), axis=0)
+    lengths = np.linalg.norm(directions, axis=1)
+    unit = np.zeros_like(directions)
+    np.divide(directions, lengths[:, None], out=unit, where=lengths[:, None] > 0)
+    return unit, lengths
 
 
 def _merge_nearby_junctions(
@@ -247,6 +330,10 @@ def _merge_nearby_junctions(
     [목적]
     노이즈나 작은 흔들림으로 인해 감지된 가짜 갈림길을 제거합니다.
 
+    [병합 규칙]
+    앞쪽 갈림길부터 반경 내의 아직 병합되지 않은 갈림길을 흡수합니다.
+    (연결 요소로 묶지 않음 - 사슬처럼 이어진 갈림길이 하나로 합쳐지지 않도록)
+
     Args:
         junctions: 갈림길 리스트
         merge_radius: 병합 반경
@@ -257,46 +344,56 @@ def _merge_nearby_junctions(
     if len(junctions) < 2:
         return junctions
 
-    merged = []
-    used = set()
-
-    for i, j1 in enumerate(junctions):
-        if i in used:
-            continue
-
-        # 현재 갈림길과 가까운 다른 갈림길 찾기
-        group = [j1]
-        used.add(i)
+    positions = np.array([j['position'] for j in junctions], dtype=float)
+    angles = np.array([j['angle_change'] for j in junctions], dtype=float)
 
-        pos1 = np.array(j1['position'])
+    # 반경 내 모든 갈림길 쌍 (i < k)을 KD-Tree로 한 번에 검색
+    # query_pairs는 거리 <= 반경을 반환하므로 기존 기준(거리 < 반경)으로 다시 거름
+    tree = cKDTree(positions)
+    pairs = tree.query_pairs(merge_radius, output_type='ndarray')
+    if len(pairs) > 0:
+        dists = np.linalg.norm(positions[pairs[:, 0]] - positions[pairs[:, 1]], axis=1)
+        pairs = pairs[dists < merge_radius]
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
 
-        for k, j2 in enumerate(junctions):
-            if k in used:
-                continue
+    # i 기준 CSR 이웃 목록 (앞쪽 갈림길이 뒤쪽 이웃을 흡수하므로 k > i만 필요)
+    indptr = np.searchsorted(pairs[:, 0], np.arange(len(junctions) + 1))
+    neighbors = pairs[:, 1]
 
-            pos2 = np.array(j2['position'])
-            dist = np.linalg.norm(pos1 - pos2)
+    # 갈림길마다 그룹 번호만 매김 (그룹 번호 = 대표 갈림길 순서)
+    labels = np.full(len(junctions), -1, dtype=np.int64)
+    leaders = []
 
-            if dist < merge_radius:
-                group.append(j2)
-                used.add(k)
-
-        # 그룹의 중심을 대표 갈림길로
-        if len(group) == 1:
-            merged.append(group[0])
-        else:
-            positions = np.array([g['position'] for g in group])
-            center = np.mean(positions, axis=0)
-            max_angle = max(g['angle_change'] for g in group)
-
-            merged.append({
-                'index': group[0]['index'],  # 첫 번째 인덱스 사용
-                'position': center.tolist(),
-                'angle_change': max_angle,
-                'merged_count': len(group)
-            })
-
-    return merged
+    for i in range(len(junctions)):
+        if labels[i] >= 0:
+            continue
+        labels[i] = len(leaders)
+
+        # 현재 갈림길과 가까운, 아직 병합되지 않은 갈림길
+        candidates = neighbors[indptr[i]:indptr[i + 1]]
+        labels[candidates[labels[candidates] < 0]] = len(leaders)
+        leaders.append(i)
+
+    # 그룹별 중심/최대 각도를 reduceat으로 한 번에 계산
+    # (안정 정렬이므로 그룹 안에서는 원래 순서 유지)
+    order = np.argsort(labels, kind='stable')
+    sizes = np.bincount(labels)
+    offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    centroids = np.add.reduceat(positions[order], offsets, axis=0) / sizes[:, None]
+    max_angles = np.maximum.reduceat(angles[order], offsets)
+
+    # 그룹의 중심을 대표 갈림길로
+    return [
+        junctions[i] if size == 1 else {
+            'index': junctions[i]['index'],  # 첫 번째 인덱스 사용
+            'position': centroid,
+            'angle_change': max_angle,
+            'merged_count': size
+        }
+        for i, size, centroid, max_angle in zip(
+            leaders, sizes.tolist(), centroids.tolist(), max_angles.tolist()
+        )
+    ]
 
 
 # =============================================================================
@@ -308,7 +405,7 @@ def extract_path_nodes(
     junctions: Optional[List[Dict]] = None,
     node_spacing: float = NODE_SPACING,
     floor_level: Optional[int] = None
-) -> List[PathNode]:
+) -> PathNodes:
     """
     경로에서 그래프 노드를 추출합니다.
 
@@ -329,78 +426,141 @@ def extract_path_nodes(
         floor_level: 층 번호 (옵션)
 
     Returns:
-        PathNode 리스트
+        PathNodes (배열 구조체, 순회하면 PathNode)
     """
     if len(positions) < 2:
-        return []
+        return PathNodes(
+            ids=[],
+            xyz=np.empty((0, 3), dtype=np.float64),
+            node_types=[],
+            original_index=np.empty(0, dtype=np.int64),
+            floor_level=floor_level
+        )
 
     # 갈림길 자동 감지 (제공되지 않은 경우)
     if junctions is None:
         junctions = detect_junctions(positions)
 
-    nodes = []
-    junction_indices = {j['index'] for j in junctions}
-
-    # Step 1: 시작점 노드
-    nodes.append(PathNode(
-        id=str(uuid.uuid4()),
-        x=float(positions[0, 0]),
-        y=float(positions[0, 1]),
-        z=float(positions[0, 2]),
-        node_type=NodeType.ENDPOINT,
-        original_index=0,
-        floor_level=floor_level
-    ))
-
-    last_node_pos = positions[0]
-    last_node_idx = 0
-
-    # Step 2: 중간 노드들
-    for i in range(1, len(positions) - 1):
-        pos = positions[i]
-        dist_from_last = np.linalg.norm(pos - last_node_pos)
-
-        # 갈림길이면 무조건 노드 추가
-        if i in junction_indices:
-            nodes.append(PathNode(
-                id=str(uuid.uuid4()),
-                x=float(pos[0]),
-                y=float(pos[1]),
-                z=float(pos[2]),
-                node_type=NodeType.JUNCTION,
-                original_index=i,
-                floor_level=floor_level
-            ))
-            last_node_pos = pos
-            last_node_idx = i
-
-        # 일정 간격 이상이면 일반 노드 추가
-        elif dist_from_last >= node_spacing:
-            nodes.append(PathNode(
-                id=str(uuid.uuid4()),
-                x=float(pos[0]),
-                y=float(pos[1]),
-                z=float(pos[2]),
-                node_type=NodeType.WAYPOINT,
-                original_index=i,
-                floor_level=floor_level
-            ))
-            last_node_pos = pos
-            last_node_idx = i
-
-    # Step 3: 끝점 노드
+    return _select_path_nodes(positions, junctions, node_spacing, floor_level)
+
+
+def _select_path_nodes(
+    positions: np.ndarray,
+    junctions: List[Dict],
+    node_spacing: float,
+    floor_level: Optional[int] = None
+) -> PathNodes:
+    """
+    노드로 사용할 포인트를 고르고 ID/인덱스/좌표/타입 배열을 만듭니다.
+
+    extract_path_nodes와 build_path_graph(딕셔너리)가 공유하는 부분입니다.
+
+    Args:
+        positions: [N, 3] 좌표 배열 (N >= 2)
+        junctions: 갈림길 리스트
+        node_spacing: 노드 간 최소 간격 (미터)
+        floor_level: 층 번호 (옵션)
+
+    Returns:
+        PathNodes (원본 인덱스 오름차순)
+    """
+    # 갈림길 위치를 불리언 배열로 표시 (JIT 커널에 넘길 평탄한 배열)
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    junction_mask = np.zeros(len(positions), dtype=np.bool_)
+    for j in junctions:
+        junction_mask[j['index']] = True
+
+    # Step 1~3: 노드로 사용할 인덱스 선택 (시작점, 갈림길, 일정 간격 포인트, 끝점)
+    indices = _select_node_indices(positions, junction_mask, float(node_spacing))
+
+    # 선택된 인덱스의 노드 타입
     end_idx = len(positions) - 1
-    nodes.append(PathNode(
-        id=str(uuid.uuid4()),
-        x=float(positions[end_idx, 0]),
-        y=float(positions[end_idx, 1]),
-        z=float(positions[end_idx, 2]),
-        node_type=NodeType.ENDPOINT,
-        original_index=end_idx,
+    node_types = [
+        NodeType.ENDPOINT if idx == 0 or idx == end_idx
+        else NodeType.JUNCTION if is_junction
+        else NodeType.WAYPOINT
+        for idx, is_junction in zip(indices.tolist(), junction_mask[indices].tolist())
+    ]
+
+    return PathNodes(
+        ids=_alloc_ids(len(indices)),
+        xyz=positions[indices],
+        node_types=node_types,
+        original_index=indices,
         floor_level=floor_level
-    ))
+    )
+
+
+def _select_node_indices(
+    positions: np.ndarray,
+    junction_mask: np.ndarray,
+    node_spacing: float
+) -> np.ndarray:
+    """
+    노드로 사용할 포인트 인덱스를 순서대로 선택합니다.
+
+    [선택 규칙]
+    - 시작점과 끝점은 항상 선택
+    - 갈림길은 무조건 선택
+    - 마지막 노드에서 node_spacing 이상 떨어진 포인트 선택
 
-    return nodes
+    Numba가 있으면 JIT 컴파일되어 평탄한 배열 위에서 실행됩니다.
+
+    Args:
+        positions: [N, 3] float64 좌표 배열
+        junction_mask: [N] 갈림길 여부
+        node_spacing: 노드 간 최소 간격 (미터)
+
+    Returns:
+        선택된 인덱스 배열 (오름차순)
+    """
+    n = positions.shape[0]
+    selected = np.empty(n, dtype=np.int64)
+    selected[0] = 0
+    count = 1
+
+    last = 0
+    for i in range(1, n - 1):
+        dx = positions[i, 0] - positions[last, 0]
+        dy = positions[i, 1] - positions[last, 1]
+        dz = positions[i, 2] - positions[last, 2]
+
+        if junction_mask[i] or np.sqrt(dx * dx + dy * dy + dz * dz) >= node_spacing:
+            selected[count] = i
+            count += 1
+            last = i
+
+    selected[count] = n - 1
+    count += 1
+    return selected[:count]
+
+
+if NUMBA_AVAILABLE:
+    _select_node_indices = njit(cache=True)(_select_node_indices)
+
+
+def _alloc_ids(count: int) -> List[str]:
+    """
+    UUID4 문자열 ID를 한 번에 여러 개 생성합니다.
+
+    uuid.uuid4()를 ID마다 호출하면 매번 os.urandom(16) 시스템 콜과 UUID 객체 생성이
+    발생하므로, 난수 바이트를 한 번에 읽어 버전/변형 비트를 배열 연산으로 설정한 뒤
+    전체를 한 번에 hex로 변환하고 문자열 슬라이스로 UUID 형식을 만듭니다.
+
+    Args:
+        count: 생성할 ID 수
+
+    Returns:
+        UUID4 형식 문자열 리스트 (str(uuid.uuid4())와 같은 형식)
+    """
+    raw = np.frombuffer(os.urandom(16 * count), dtype=np.uint8).reshape(count, 16).copy()
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40  # version 4
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80  # RFC 4122 variant
+    h = raw.tobytes().hex()
+    return [
+        f"{h[i:i + 8]}-{h[i + 8:i + 12]}-{h[i + 12:i + 16]}-{h[i + 16:i + 20]}-{h[i + 20:i + 32]}"
+        for i in range(0, 32 * count, 32)
+    ]
 
 
 # =============================================================================
@@ -408,7 +568,7 @@ def extract_path_nodes(
 # =============================================================================
 
 def extract_path_edges(
-    nodes: List[PathNode],
+    nodes: Union[PathNodes, List[PathNode]],
     positions: np.ndarray,
     max_distance: float = EDGE_CONNECTION_RADIUS
 ) -> List[PathEdge]:
@@ -422,9 +582,10 @@ def extract_path_edges(
     [거리 계산]
     두 노드 사이의 실제 경로 거리를 계산합니다.
     직선 거리가 아닌, 경유하는 포인트들을 따라 측정합니다.
+    (누적 경로 거리를 한 번 계산해 두고 엣지마다 차이만 구함 - O(1))
 
     Args:
-        nodes: PathNode 리스트
+        nodes: PathNodes 또는 PathNode 리스트
         positions: 원본 좌표 배열
         max_distance: 최대 연결 거리
 
@@ -434,66 +595,83 @@ def extract_path_edges(
     if len(nodes) < 2:
         return []
 
-    edges = []
-
-    # 노드를 original_index로 정렬
-    sorted_nodes = sorted(nodes, key=lambda n: n.original_index)
+    # 노드를 original_index로 정렬 (PathNodes는 이미 오름차순)
+    if isinstance(nodes, PathNodes):
+        sorted_ids = nodes.ids
+        original_indices = nodes.original_index
+    else:
+        sorted_nodes = sorted(nodes, key=lambda n: n.original_index)
+        sorted_ids = [node.id for node in sorted_nodes]
+        original_indices = [node.original_index for node in sorted_nodes]
 
     # Step 1: 연속 노드 간 엣지 생성
-    for i in range(len(sorted_nodes) - 1):
-        node1 = sorted_nodes[i]
-        node2 = sorted_nodes[i + 1]
+    links = _link_consecutive_nodes(
+        original_indices, _cumulative_path_length(positions), max_distance
+    )
 
-        # 두 노드 사이의 실제 경로 거리 계산
-        start_idx = node1.original_index
-        end_idx = node2.original_index
+    return [
+        PathEdge(
+            id=edge_id,
+            from_node_id=sorted_ids[i],
+            to_node_id=sorted_ids[i + 1],
+            distance=path_distance,
+            is_bidirectional=True,
+            edge_type="HORIZONTAL"
+        )
+        for edge_id, i, path_distance in links
+    ]
 
-        path_distance = _calculate_path_distance(positions, start_idx, end_idx)
 
-        # 최대 거리 체크 (너무 먼 노드는 연결하지 않음)
-        if path_distance <= max_distance:
-            edges.append(PathEdge(
-                id=str(uuid.uuid4()),
-                from_node_id=node1.id,
-                to_node_id=node2.id,
-                distance=path_distance,
-                is_bidirectional=True,
-                edge_type="HORIZONTAL"
-            ))
+def _link_consecutive_nodes(
+    original_indices: Union[np.ndarray, List[int]],
+    cumulative: np.ndarray,
+    max_distance: float
+) -> List[Tuple[str, int, float]]:
+    """
+    original_index 순으로 정렬된 노드 중 연결할 연속 쌍을 찾습니다.
 
-    return edges
+    extract_path_edges(PathEdge)와 build_path_graph(딕셔너리)가 공유하는 부분입니다.
 
+    Args:
+        original_indices: 정렬된 노드의 원본 인덱스 (배열 또는 리스트)
+        cumulative: 경로 시작점부터 각 포인트까지의 누적 거리 [N] (_cumulative_path_length)
+        max_distance: 최대 연결 거리
 
-def _calculate_path_distance(
-    positions: np.ndarray,
-    start_idx: int,
-    end_idx: int
-) -> float:
+    Returns:
+        (엣지 ID, 앞 노드의 순번 i, 경로 거리) 리스트 - 노드 i와 i+1을 연결
     """
-    경로를 따라 두 인덱스 사이의 실제 거리를 계산합니다.
+    if len(original_indices) < 2:
+        return []
 
-    [직선 거리 vs 경로 거리]
-    직선: A────────────B (유클리드 거리)
-    경로: A───*───*───B (실제 이동 거리)
+    # 두 노드 사이의 실제 경로 거리 (누적 거리의 차)
+    idx = np.asarray(original_indices, dtype=np.int64)
+    start_idx, end_idx = idx[:-1], idx[1:]
+    path_distances = np.where(
+        start_idx < end_idx, cumulative[end_idx] - cumulative[start_idx], 0.0
+    )
 
-    Args:
-        positions: 좌표 배열
-        start_idx: 시작 인덱스
-        end_idx: 끝 인덱스
+    # 최대 거리 체크 (너무 먼 노드는 연결하지 않음)
+    connected = np.flatnonzero(path_distances <= max_distance)
 
-    Returns:
-        경로 거리 (미터)
+    # 엣지 ID 일괄 생성
+    edge_ids = _alloc_ids(len(connected))
+    return list(zip(edge_ids, connected.tolist(), path_distances[connected].tolist()))
+
+
+def _cumulative_path_length(positions: np.ndarray) -> np.ndarray:
     """
-    if start_idx >= end_idx:
-        return 0.0
+    경로 시작점부터 각 포인트까지의 누적 경로 거리를 계산합니다.
 
-    total_distance = 0.0
+    두 인덱스 사이의 경로 거리 = cumulative[end_idx] - cumulative[start_idx]
 
-    for i in range(start_idx, end_idx):
-        segment_distance = np.linalg.norm(positions[i + 1] - positions[i])
-        total_distance += segment_distance
+    Args:
+        positions: [N, 3] 좌표 배열
 
-    return float(total_distance)
+    Returns:
+        [N] 누적 거리 배열 (첫 원소는 0)
+    """
+    segment_lengths = np.linalg.norm(np.diff(np.asarray(positions, dtype=float), axis=0), axis=1)
+    return np.concatenate(([0.0], np.cumsum(segment_lengths)))
 
 
 # =============================================================================
@@ -530,23 +708,44 @@ def build_path_graph(
         >>> nodes, edges = build_path_graph(positions, floor_level=1)
         >>> print(f"노드 {len(nodes)}개, 엣지 {len(edges)}개")
     """
+    if len(positions) < 2:
+        return [], []
+
+    # 좌표를 float64로 한 번만 변환하고, 구간 방향/길이도 한 번만 계산해
+    # 갈림길 감지(각도)와 엣지 거리(누적 길이)가 함께 사용
+    positions = np.ascontiguousarray(positions, dtype=np.float64)
+    unit, lengths = _unit_directions(positions)
+    cumulative = np.concatenate(([0.0], np.cumsum(lengths)))
+
     # Step 1: 갈림길 감지
-    junctions = detect_junctions(positions, angle_threshold=angle_threshold)
+    if len(positions) < 5:
+        junctions = []
+    else:
+        junctions = _junctions_from_directions(
+            positions, unit, lengths, angle_threshold, MIN_BRANCH_LENGTH
+        )
 
     # Step 2: 노드 추출
-    nodes = extract_path_nodes(
-        positions,
-        junctions=junctions,
-        node_spacing=node_spacing,
-        floor_level=floor_level
-    )
+    # PathNode/PathEdge 객체를 거치지 않고 to_dict()와 같은 형식의 딕셔너리를 바로 생성
+    nodes = _select_path_nodes(positions, junctions, node_spacing, floor_level)
+    node_ids = nodes.ids
+    nodes_dict = nodes.to_dicts()
 
     # Step 3: 엣지 추출
-    edges = extract_path_edges(nodes, positions)
-
-    # 딕셔너리 형식으로 변환
-    nodes_dict = [node.to_dict() for node in nodes]
-    edges_dict = [edge.to_dict() for edge in edges]
+    edges_dict = [
+        {
+            'id': edge_id,
+            'from_node_id': node_ids[i],
+            'to_node_id': node_ids[i + 1],
+            'distance': path_distance,
+            'is_bidirectional': True,
+            'edge_type': "HORIZONTAL",
+            'metadata': {}
+        }
+        for edge_id, i, path_distance in _link_consecutive_nodes(
+            nodes.original_index, cumulative, EDGE_CONNECTION_RADIUS
+        )
+    ]
 
     return nodes_dict, edges_dict
 
@@ -608,21 +807,22 @@ def find_dead_ends(nodes: List[Dict], edges: List[Dict]) -> List[Dict]:
     Returns:
         막다른 길 노드 리스트
     """
-    # 각 노드의 연결 수 계산
-    connection_count = {node['id']: 0 for node in nodes}
-
-    for edge in edges:
-        connection_count[edge['from_node_id']] += 1
-        if edge['is_bidirectional']:
-            connection_count[edge['to_node_id']] += 1
+    # 노드 ID → 배열 인덱스 (한 번만 구축)
+    id_to_idx = {node['id']: i for i, node in enumerate(nodes)}
+
+    # 엣지 양 끝 노드의 인덱스 배열
+    from_idx = np.fromiter((id_to_idx[e['from_node_id']] for e in edges), dtype=np.int64, count=len(edges))
+    to_idx = np.fromiter((id_to_idx[e['to_node_id']] for e in edges), dtype=np.int64, count=len(edges))
+    bidirectional = np.fromiter((e['is_bidirectional'] for e in edges), dtype=bool, count=len(edges))
+
+    # 각 노드의 연결 수 계산 (출발 노드 + 양방향 엣지의 도착 노드)
+    connection_count = (
+        np.bincount(from_idx, minlength=len(nodes))
+        + np.bincount(to_idx[bidirectional], minlength=len(nodes))
+    )
 
     # 연결이 1개인 노드 찾기
-    dead_ends = []
-    for node in nodes:
-        if connection_count[node['id']] == 1:
-            dead_ends.append(node)
-
-    return dead_ends
+    return [nodes[i] for i in np.flatnonzero(connection_count == 1).tolist()]
 
 
 def merge_floor_graphs(
@@ -652,6 +852,8 @@ def merge_floor_graphs(
         all_edges.extend(edges)
 
     # 수직 통로로 층 간 연결
+    # 층별 노드 KD-Tree는 처음 필요할 때 한 번만 구축해 모든 통로가 공유
+    node_trees = {}
     for passage in vertical_passages:
         from_floor = passage.get('from_floor')
         to_floor = passage.get('to_floor')
@@ -661,12 +863,14 @@ def merge_floor_graphs(
         entry_node = _find_nearest_node_to_position(
             all_nodes,
             passage.get('entry_point'),
-            floor_level=from_floor
+            floor_level=from_floor,
+            node_trees=node_trees
         )
         exit_node = _find_nearest_node_to_position(
             all_nodes,
             passage.get('exit_point'),
-            floor_level=to_floor
+            floor_level=to_floor,
+            node_trees=node_trees
         )
 
         if entry_node and exit_node:
@@ -687,15 +891,21 @@ def merge_floor_graphs(
 def _find_nearest_node_to_position(
     nodes: List[Dict],
     position: Dict,
-    floor_level: Optional[int] = None
+    floor_level: Optional[int] = None,
+    node_trees: Optional[Dict] = None
 ) -> Optional[Dict]:
     """
     주어진 위치에 가장 가까운 노드를 찾습니다.
 
+    [검색 방법]
+    층별 노드 좌표로 KD-Tree를 구축하여 최근접 노드를 O(log N)으로 찾습니다.
+    node_trees를 넘기면 층별 (KD-Tree, 노드 리스트)를 캐시하여 재사용합니다.
+
     Args:
         nodes: 노드 리스트
         position: {'x': float, 'y': float, 'z': float} 딕셔너리
         floor_level: 특정 층으로 필터링 (옵션)
+        node_trees: {층번호: (KD-Tree, 노드 리스트)} 캐시 (옵션, 같은 nodes에 대해서만 공유)
 
     Returns:
         가장 가까운 노드 딕셔너리, 없으면 None
@@ -703,20 +913,23 @@ def _find_nearest_node_to_position(
     if not position or not nodes:
         return None
 
-    target = np.array([position['x'], position['y'], position['z']])
-    min_dist = float('inf')
-    nearest = None
+    if node_trees is None:
+        node_trees = {}
 
-    for node in nodes:
+    if floor_level not in node_trees:
         # 층 필터
-        if floor_level is not None and node.get('floor_level') != floor_level:
-            continue
-
-        node_pos = np.array([node['x'], node['y'], node['z']])
-        dist = np.linalg.norm(target - node_pos)
-
-        if dist < min_dist:
-            min_dist = dist
-            nearest = node
+        candidates = [
+            node for node in nodes
+            if floor_level is None or node.get('floor_level') == floor_level
+        ]
+        tree = None
+        if candidates:
+            tree = cKDTree([[node['x'], node['y'], node['z']] for node in candidates])
+        node_trees[floor_level] = (tree, candidates)
+
+    tree, candidates = node_trees[floor_level]
+    if tree is None:
+        return None
 
-    return nearest
+    _, nearest_idx = tree.query([position['x'], position['y'], position['z']])
+    return candidates[nearest_idx]
@@ -45,6 +45,7 @@
         projected = project_points_to_line(segment_points, line_params)
 """
 
+import math
 import numpy as np
 from typing import List, Tuple, Dict, Optional
 from dataclasses import dataclass
@@ -52,6 +53,13 @@ from dataclasses import dataclass
 from services.smoothing import split_at_gaps
 from services.deduplication import simplify_path_rdp
 
+# Numba가 설치된 경우 PCA 공분산/고유값 분해를 JIT 컴파일 (없으면 NumPy 구현 사용)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 
 # =============================================================================
 # 상수 정의
@@ -148,22 +156,107 @@ def fit_line_pca(points: np.ndarray) -> LineParams:
         >>> line = fit_line_pca(points)
         >>> print(f"직선성: {line.explained_variance_ratio:.2f}")  # ~0.99
     """
-    # Step 1: 중심점 계산 (평균)
-    center = np.mean(points, axis=0)
+    if points.ndim == 2 and points.shape[1] == 2:
+        # 2D 좌표는 2x2 고유값 문제를 닫힌 식으로 풂 (straighten_path_xy_only)
+        return _fit_line_pca_2d(points)
+
+    if NUMBA_AVAILABLE and len(points) >= 2:
+        # Step 1-4를 하나의 컴파일된 커널에서 처리 (3x3 행렬에 대한 호출 오버헤드 제거)
+        center, eigenvalues, eigenvectors = _pca_eigen_numba(
+            np.ascontiguousarray(points, dtype=np.float64)
+        )
+    elif len(points) > 3:
+        # Numba가 없으면 중심화된 행렬을 바로 SVD (공분산 행렬을 만들지 않음)
+        #   X = U·S·Vᵀ 이면 Cov = V·(S²/(n-1))·Vᵀ
+        #   → 오른쪽 특이벡터 = 주성분 방향, S²/(n-1) = 고유값
+        center = np.mean(points, axis=0)
+        _, singular_values, vt = np.linalg.svd(points - center, full_matrices=False)
+        eigenvalues = singular_values ** 2 / (len(points) - 1)
+        eigenvectors = vt.T
+    else:
+        # 점이 3개 이하이면 SVD보다 3x3 공분산 고유값 분해가 더 가벼움
+        # Step 1: 중심점 계산 (평균)
+        center = np.mean(points, axis=0)
+
+        # Step 2: 중심을 원점으로 이동 (중심화)
+        centered = points - center
+
+        # Step 3: 공분산 행렬 계산
+        #         Cov = (1/(n-1)) * X^T * X
+        #         여기서 X는 중심화된 데이터
+        covariance = np.cov(centered.T)
 
-    # Step 2: 중심을 원점으로 이동 (중심화)
+        # Step 4: 고유값 분해 (Eigendecomposition)
+        #         공분산 행렬의 고유벡터 = 주성분 방향
+        #         고유값 = 해당 방향의 분산
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+
+    return _line_from_eigen(center, eigenvalues, eigenvectors)
+
+
+def _fit_line_pca_2d(points: np.ndarray) -> LineParams:
+    """
+    2D 점들에 PCA 직선을 피팅합니다 (LAPACK 호출 없이 2x2 닫힌 식).
+
+    [2x2 대칭 행렬 [[a, b], [b, d]]의 고유값 분해]
+        λ₁ = tr/2 + √(tr²/4 - det)   (tr = a + d, det = ad - b²)
+        고유벡터 = (λ₁ - d, b) 또는 (b, λ₁ - a)
+        (a ≥ d이면 앞의 식, 아니면 뒤의 식 - 0에 가까운 성분끼리 빼지 않도록)
+
+    Args:
+        points: [N, 2] 좌표 배열
+
+    Returns:
+        LineParams 객체 (point, direction은 2차원)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    center = points.mean(axis=0)
     centered = points - center
 
-    # Step 3: 공분산 행렬 계산
-    #         Cov = (1/n) * X^T * X
-    #         여기서 X는 중심화된 데이터
-    covariance = np.cov(centered.T)
+    # 공분산 행렬 성분 (np.cov와 같은 n-1 정규화)
+    dof = max(len(points) - 1, 1)
+    a = float(centered[:, 0] @ centered[:, 0]) / dof
+    b = float(centered[:, 0] @ centered[:, 1]) / dof
+    d = float(centered[:, 1] @ centered[:, 1]) / dof
 
-    # Step 4: 고유값 분해 (Eigendecomposition)
-    #         공분산 행렬의 고유벡터 = 주성분 방향
-    #         고유값 = 해당 방향의 분산
-    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    trace = a + d
+    half_gap = math.sqrt(max((a - d) * (a - d) / 4 + b * b, 0.0))
+    largest = trace / 2 + half_gap
 
+    if a >= d:
+        dx, dy = largest - d, b
+    else:
+        dx, dy = b, largest - a
+    norm = math.hypot(dx, dy)
+    if norm < 1e-15:
+        # 등방성(또는 점 하나) - eigh와 같이 첫 번째 축 방향
+        dx, dy, norm = (1.0, 0.0, 1.0) if a >= d else (0.0, 1.0, 1.0)
+
+    explained_ratio = largest / trace if trace > 1e-10 else 1.0
+
+    return LineParams(
+        point=center,
+        direction=np.array([dx / norm, dy / norm]),
+        explained_variance_ratio=explained_ratio
+    )
+
+
+def _line_from_eigen(
+    center: np.ndarray,
+    eigenvalues: np.ndarray,
+    eigenvectors: np.ndarray
+) -> LineParams:
+    """
+    공분산 고유값 분해 결과로 LineParams를 만듭니다 (fit_line_pca Step 5-7).
+
+    Args:
+        center: 중심점
+        eigenvalues: 공분산 행렬의 고유값
+        eigenvectors: 공분산 행렬의 고유벡터 (열 벡터)
+
+    Returns:
+        LineParams 객체
+    """
     # Step 5: 가장 큰 고유값에 해당하는 고유벡터 = 주성분 = 직선 방향
     #         (numpy는 고유값을 오름차순 정렬하므로 마지막이 최대)
     max_idx = np.argmax(eigenvalues)
@@ -187,6 +280,40 @@ def fit_line_pca(points: np.ndarray) -> LineParams:
     )
 
 
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def _pca_eigen_numba(points):
+        """fit_line_pca Step 1-4의 Numba 버전 (중심, 고유값, 고유벡터 반환)"""
+        n = points.shape[0]
+
+        # 중심점 (평균)
+        center = np.zeros(3)
+        for i in range(n):
+            for a in range(3):
+                center[a] += points[i, a]
+        center /= n
+
+        # 공분산 행렬 (np.cov와 같은 n-1 정규화, 상삼각만 누적 후 대칭 복사)
+        covariance = np.zeros((3, 3))
+        for i in range(n):
+            d0 = points[i, 0] - center[0]
+            d1 = points[i, 1] - center[1]
+            d2 = points[i, 2] - center[2]
+            covariance[0, 0] += d0 * d0
+            covariance[0, 1] += d0 * d1
+            covariance[0, 2] += d0 * d2
+            covariance[1, 1] += d1 * d1
+            covariance[1, 2] += d1 * d2
+            covariance[2, 2] += d2 * d2
+        covariance /= n - 1
+        covariance[1, 0] = covariance[0, 1]
+        covariance[2, 0] = covariance[0, 2]
+        covariance[2, 1] = covariance[1, 2]
+
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        return center, eigenvalues, eigenvectors
+
+
 # =============================================================================
 # 점을 직선 위로 투영
 # =============================================================================
@@ -236,25 +363,16 @@ def project_points_to_line(
         >>> projected = project_points_to_line(points, line)
         >>> # projected는 모두 직선 위에 있음
     """
-    projected = np.zeros_like(points)
+    # 각 점의 직선 위 위치 t = (P - point) · d  (d는 정규화된 방향 벡터)
+    # 모든 점을 한 번의 행렬-벡터 곱으로 계산
+    t_values = (points - line.point) @ line.direction
 
-    for i, p in enumerate(points):
-        # 점에서 직선의 기준점까지의 벡터
-        v = p - line.point
-
-        # 방향 벡터에 투영 (내적)
-        # t = v · d  (d는 정규화된 방향 벡터)
-        t = np.dot(v, line.direction)
-
-        # 직선 위의 점 계산
-        projected[i] = line.point + t * line.direction
+    # 직선 위의 점 계산 (입력과 같은 dtype 유지)
+    projected = (line.point + t_values[:, None] * line.direction).astype(points.dtype, copy=False)
 
     if not preserve_order:
-        # 직선 방향으로 정렬
-        # 각 점의 t값(직선 위 위치)으로 정렬
-        t_values = np.array([np.dot(p - line.point, line.direction) for p in points])
-        sort_idx = np.argsort(t_values)
-        projected = projected[sort_idx]
+        # 직선 방향으로 정렬 (이미 계산한 t값 재사용)
+        projected = projected[np.argsort(t_values)]
 
     return projected
 
@@ -296,23 +414,26 @@ def detect_straight_segments(
     if len(positions) < min_length:
         return [(0, len(positions) - 1)]
 
-    segments = []
-    segment_start = 0
+    # 모든 포인트 i (1 ≤ i ≤ N-2)의 방향 변화 각도를 한 번에 계산
+    # 이전 방향 v[i-1], 다음 방향 v[i] (둘 중 길이가 0에 가까운 방향이 있으면 각도 0)
+    v = np.diff(np.asarray(positions, dtype=np.float64), axis=0)
+    lens = np.sqrt(np.einsum('ij,ij->i', v, v))
 
-    for i in range(1, len(positions) - 1):
-        # 이전 방향
-        v1 = positions[i] - positions[i - 1]
-        # 다음 방향
-        v2 = positions[i + 1] - positions[i]
+    # 방향 벡터를 한 번만 정규화 → 단위 벡터끼리의 내적이 곧 cos
+    unit = np.zeros_like(v)
+    np.divide(v, lens[:, None], out=unit, where=lens[:, None] > 0)
+    cos_angle = np.einsum('ij,ij->i', unit[:-1], unit[1:])
+    angles = np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0)))
+    angles[(lens[:-1] < 1e-10) | (lens[1:] < 1e-10)] = 0.0
 
-        # 방향 변화 각도 계산
-        angle = _angle_between_vectors(v1, v2)
+    # 큰 방향 변화 지점만 순회하며 구간 분리
+    segments = []
+    segment_start = 0
 
-        # 큰 방향 변화 감지 → 구간 분리
-        if angle > angle_threshold:
-            if i - segment_start >= min_length:
-                segments.append((segment_start, i))
-            segment_start = i
+    for i in (np.flatnonzero(angles > angle_threshold) + 1).tolist():
+        if i - segment_start >= min_length:
+            segments.append((segment_start, i))
+        segment_start = i
 
     # 마지막 구간 추가
     if len(positions) - 1 - segment_start >= min_length:
@@ -325,29 +446,6 @@ def detect_straight_segments(
     return segments
 
 
-def _angle_between_vectors(v1: np.ndarray, v2: np.ndarray) -> float:
-    """
-    두 벡터 사이의 각도를 계산합니다 (도 단위).
-
-    Args:
-        v1: 첫 번째 벡터
-        v2: 두 번째 벡터
-
-    Returns:
-        각도 (도)
-    """
-    len1 = np.linalg.norm(v1)
-    len2 = np.linalg.norm(v2)
-
-    if len1 < 1e-10 or len2 < 1e-10:
-        return 0.0
-
-    cos_angle = np.dot(v1, v2) / (len1 * len2)
-    cos_angle = np.clip(cos_angle, -1.0, 1.0)
-
-    return np.degrees(np.arccos(cos_angle))
-
-
 # =============================================================================
 # 메인 직선화 함수
 # =============================================================================
@@ -358,7 +456,8 @@ def straighten_path(
     angle_threshold: float = DEFAULT_ANGLE_THRESHOLD,
     linearity_threshold: float = DEFAULT_LINEARITY_THRESHOLD,
     min_segment_length: int = DEFAULT_MIN_SEGMENT_LENGTH,
-    max_displacement: float = DEFAULT_MAX_DISPLACEMENT
+    max_displacement: float = DEFAULT_MAX_DISPLACEMENT,
+    inplace: bool = False
 ) -> Tuple[np.ndarray, Dict]:
     """
     전체 경로를 직선화합니다.
@@ -397,6 +496,8 @@ def straighten_path(
         linearity_threshold: 직선 피팅 품질 임계값 (0~1)
         min_segment_length: 최소 구간 길이
         max_displacement: 최대 허용 변위 (미터). 이 값 이상 이동하면 skip
+        inplace: True면 복사본을 만들지 않고 positions에 직접 기록
+                 (호출자가 원본 좌표를 더 이상 쓰지 않을 때 N×3 복사를 생략)
 
     Returns:
         (직선화된 좌표 배열, 처리 통계)
@@ -414,7 +515,6 @@ def straighten_path(
     segments = detect_straight_segments(positions, min_segment_length, angle_threshold)
 
     # Step 2: 각 구간을 재귀적으로 직선화
-    result = positions.copy()
     stats = {
         'total_segments': len(segments),
         'straightened_segments': 0,
@@ -424,14 +524,21 @@ def straighten_path(
     }
 
     sub_segment_bounds = []  # 직선화된 sub-segment 범위 추적
+    projections = []         # (start, end, 투영 좌표) - 기록 순서대로
 
     for start_idx, end_idx in segments:
         _straighten_segment_recursive(
-            positions, result, start_idx, end_idx,
+            positions, projections, start_idx, end_idx,
             max_displacement, min_segment_length,
             stats, sub_segment_bounds
         )
 
+    # 재귀 단계는 항상 원본 좌표를 읽으므로 (인접 구간이 끝점을 공유)
+    # 투영 결과는 모든 구간이 끝난 뒤 같은 순서로 기록
+    result = positions if inplace else positions.copy()
+    for start_idx, end_idx, projected in projections:
+        result[start_idx:end_idx + 1] = projected
+
     # Step 3: 거의 평행한 인접 sub-segment 병합
     #   ex) 60m 복도가 4개 sub-segment로 나뉘었는데
     #       방향이 비슷하면 하나로 합쳐서 반듯한 직선 생성
@@ -445,7 +552,7 @@ def straighten_path(
 
 def _straighten_segment_recursive(
     positions: np.ndarray,
-    result: np.ndarray,
+    projections: List,
     start_idx: int,
     end_idx: int,
     max_displacement: float,
@@ -476,7 +583,7 @@ def _straighten_segment_recursive(
 
     Args:
         positions: 원본 좌표 배열
-        result: 결과 배열 (in-place 수정)
+        projections: 직선화 결과 (start, end, 투영 좌표) 리스트 (추가 기록)
         start_idx, end_idx: 세그먼트 범위
         max_displacement: 최대 허용 편차 (m)
         sub_segment_bounds: 직선화된 구간 범위 리스트 (추적용)
@@ -495,52 +602,108 @@ def _straighten_segment_recursive(
     line = fit_line_pca(segment_points)
     projected = project_points_to_line(segment_points, line, preserve_order=True)
 
-    # 편차 계산
-    displacements = np.linalg.norm(projected - segment_points, axis=1)
-    max_disp = float(np.max(displacements))
+    # 편차 계산 + 분할 후보 탐색 (가장자리 제외 구간의 최대 편차 지점)
+    edge_margin = min_pts
+    max_disp, split_local = _scan_displacements(projected, segment_points, edge_margin)
 
     if max_disp <= max_displacement:
         # 편차가 허용 범위 내 → 직선화!
-        result[start_idx:end_idx + 1] = projected
+        projections.append((start_idx, end_idx, projected))
         stats['straightened_segments'] += 1
         sub_segment_bounds.append((start_idx, end_idx))
         return
 
     # 편차 초과 → 최대 편차 지점에서 분할
     if depth < max_depth and n_points >= 2 * min_pts:
-        # 코너 찾기: 가장자리 제외하고 최대 편차 지점 탐색
-        edge_margin = min_pts
-        if n_points > 2 * edge_margin:
-            interior = displacements[edge_margin:n_points - edge_margin]
-            split_local = edge_margin + int(np.argmax(interior))
-        else:
-            split_local = n_points // 2
-
+        # 코너 = 가장자리 제외 구간의 최대 편차 지점 (_scan_displacements에서 탐색)
         split_idx = start_idx + split_local
 
         _straighten_segment_recursive(
-            positions, result, start_idx, split_idx,
+            positions, projections, start_idx, split_idx,
             max_displacement, min_segment_length,
             stats, sub_segment_bounds, depth + 1, max_depth
         )
         _straighten_segment_recursive(
-            positions, result, split_idx, end_idx,
+            positions, projections, split_idx, end_idx,
             max_displacement, min_segment_length,
             stats, sub_segment_bounds, depth + 1, max_depth
         )
     else:
         # 더 이상 분할 불가 → 작은 세그먼트라도 강제 직선화
         # (3~5점 정도의 짧은 구간이므로 강제 투영해도 시각적 영향 미미)
+        # 위에서 같은 segment_points로 구한 투영 결과를 그대로 사용
         if n_points >= 3:
-            line = fit_line_pca(segment_points)
-            projected = project_points_to_line(segment_points, line, preserve_order=True)
-            result[start_idx:end_idx + 1] = projected
+            projections.append((start_idx, end_idx, projected))
             stats['straightened_segments'] += 1
             sub_segment_bounds.append((start_idx, end_idx))
         else:
             stats['skipped_segments'] += 1
 
 
+def _scan_displacements(
+    projected: np.ndarray,
+    segment_points: np.ndarray,
+    edge_margin: int
+) -> Tuple[float, int]:
+    """
+    투영 편차의 최댓값과 분할 지점을 찾습니다.
+
+    Args:
+        projected: [N, 3] 직선에 투영된 좌표
+        segment_points: [N, 3] 원본 좌표
+        edge_margin: 분할 지점 탐색 시 양 끝에서 제외할 포인트 수
+
+    Returns:
+        (최대 편차, 분할 지점 로컬 인덱스)
+        - 분할 지점: N > 2 * edge_margin이면 가장자리 제외 구간의 최대 편차 지점, 아니면 N // 2
+    """
+    if NUMBA_AVAILABLE:
+        # 편차 계산, 최댓값, 내부 argmax를 임시 배열 없이 한 번의 컴파일된 루프로
+        max_disp, split_local = _scan_displacements_numba(projected, segment_points, edge_margin)
+        return float(max_disp), int(split_local)
+
+    n_points = len(segment_points)
+    displacements = np.linalg.norm(projected - segment_points, axis=1)
+    max_disp = float(np.max(displacements))
+
+    if n_points > 2 * edge_margin:
+        interior = displacements[edge_margin:n_points - edge_margin]
+        split_local = edge_margin + int(np.argmax(interior))
+    else:
+        split_local = n_points // 2
+
+    return max_disp, split_local
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def _scan_displacements_numba(projected, segment_points, edge_margin):
+        """_scan_displacements의 Numba 버전 (입력 dtype 그대로 계산)"""
+        n = segment_points.shape[0]
+        has_interior = n > 2 * edge_margin
+
+        max_disp = -1.0
+        interior_max = -1.0
+        split_local = n // 2
+        dims = segment_points.shape[1]
+        for i in range(n):
+            # 차원 수와 무관하게 (2D: straighten_path_xy_only) 축 순서대로 제곱합
+            delta = projected[i, 0] - segment_points[i, 0]
+            d = delta * delta
+            for a in range(1, dims):
+                delta = projected[i, a] - segment_points[i, a]
+                d += delta * delta
+            d = np.sqrt(d)
+
+            if d > max_disp:
+                max_disp = d
+            if has_interior and edge_margin <= i < n - edge_margin and d > interior_max:
+                interior_max = d
+                split_local = i
+
+        return max_disp, split_local
+
+
 def _merge_collinear_segments(
     result: np.ndarray,
     bounds: List[Tuple[int, int]],
@@ -577,46 +740,133 @@ def _merge_collinear_segments(
 
     bounds.sort(key=lambda x: x[0])
 
+    # 각도 비교 대신 cos 비교 (angle > merge_angle ⇔ cos < cos(merge_angle), arccos 생략)
+    cos_merge = math.cos(math.radians(merge_angle))
+
+    # 구간별 (포인트 수, 좌표 합, 외적 합) - 병합 시도마다 공분산을 처음부터 누적하지 않고
+    # 두 구간의 값을 더해 병합 구간의 직선을 피팅
+    moments = [_point_moments(result[start:end + 1]) for start, end in bounds]
+
+    # 앞에서부터 한 번만 훑으며 현재 병합 구간(start1~end1)을 키워 나감
+    # (list.pop 없이 확정된 구간만 merged_bounds에 추가)
+    merged_bounds = []
     merged_count = 0
-    i = 0
-    while i < len(bounds) - 1:
-        start1, end1 = bounds[i]
-        start2, end2 = bounds[i + 1]
+    start1, end1 = bounds[0]
+    current_moments = moments[0]
+    # 현재 구간의 방향 벡터 (직전 반복에서 계산한 dir2 재사용, 병합으로 좌표가 바뀌면 None)
+    cached_dir = None
+    for j in range(1, len(bounds)):
+        start2, end2 = bounds[j]
 
         # 인접 확인 (1점 이내 차이)
         if start2 - end1 > 1:
-            i += 1
+            merged_bounds.append((start1, end1))
+            start1, end1 = start2, end2
+            current_moments = moments[j]
+            cached_dir = None
             continue
 
         # 방향 각도 비교
-        dir1 = result[end1] - result[start1]
+        dir1 = cached_dir if cached_dir is not None else result[end1] - result[start1]
         dir2 = result[end2] - result[start2]
-        angle = _angle_between_vectors(dir1, dir2)
 
-        if angle > merge_angle:
-            i += 1
+        if _cos_between_vectors(dir1, dir2) < cos_merge:
+            merged_bounds.append((start1, end1))
+            start1, end1 = start2, end2
+            current_moments = moments[j]
+            cached_dir = dir2
             continue
 
         # 병합 시도: 두 구간을 하나의 직선으로
+        # (두 구간이 공유하는 끝점은 한 번만 포함되도록 겹치는 부분을 뺌)
+        n, total, outer = (a + b for a, b in zip(current_moments, moments[j]))
+        if start2 <= end1:
+            n_overlap, total_overlap, outer_overlap = _point_moments(result[start2:end1 + 1])
+            n, total, outer = n - n_overlap, total - total_overlap, outer - outer_overlap
+
         merged_points = result[start1:end2 + 1]
-        line = fit_line_pca(merged_points)
+        line = _fit_line_from_moments(n, total, outer)
         projected = project_points_to_line(merged_points, line, preserve_order=True)
 
         max_disp = float(np.max(np.linalg.norm(projected - merged_points, axis=1)))
 
         if max_disp <= max_displacement:
-            # 병합 성공
+            # 병합 성공 → 현재 구간을 늘리고 다음 세그먼트와도 병합 시도
             result[start1:end2 + 1] = projected
-            bounds[i] = (start1, end2)
-            bounds.pop(i + 1)
+            end1 = end2
+            current_moments = _point_moments(projected)
+            # 다음 구간이 병합 구간과 끝점을 공유하면 바뀐 좌표로 다시 계산
+            if j + 1 < len(bounds) and bounds[j + 1][0] <= end2:
+                next_start, next_end = bounds[j + 1]
+                moments[j + 1] = _point_moments(result[next_start:next_end + 1])
             merged_count += 1
-            # i 유지 → 다음 세그먼트와도 병합 시도
+            cached_dir = None
         else:
-            i += 1
+            merged_bounds.append((start1, end1))
+            start1, end1 = start2, end2
+            current_moments = moments[j]
+            cached_dir = dir2
+
+    merged_bounds.append((start1, end1))
+    bounds[:] = merged_bounds
 
     return merged_count
 
 
+def _point_moments(points: np.ndarray) -> Tuple[int, np.ndarray, np.ndarray]:
+    """
+    점 집합의 (포인트 수, 좌표 합 [3], 외적 합 [3, 3])을 계산합니다 (float64).
+
+    두 점 집합의 값을 더하면 합집합의 값이 되므로 공분산을 점진적으로 구할 수 있습니다.
+    """
+    points = np.asarray(points, dtype=np.float64)
+    return len(points), points.sum(axis=0), points.T @ points
+
+
+def _fit_line_from_moments(n: int, total: np.ndarray, outer: np.ndarray) -> LineParams:
+    """
+    _point_moments 값으로 PCA 직선을 피팅합니다 (fit_line_pca와 같은 결과).
+
+    Cov = (Σxxᵀ - n·μμᵀ) / (n-1)
+
+    Args:
+        n: 포인트 수 (2 이상)
+        total: 좌표 합
+        outer: 외적 합
+
+    Returns:
+        LineParams 객체
+    """
+    center = total / n
+    covariance = (outer - n * np.outer(center, center)) / (n - 1)
+    eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+    return _line_from_eigen(center, eigenvalues, eigenvectors)
+
+
+def _cos_between_vectors(v1: np.ndarray, v2: np.ndarray) -> float:
+    """
+    두 벡터 사이 각도의 cos 값을 계산합니다.
+
+    길이가 0에 가까운 벡터가 있으면 각도를 0°로 보고 1.0을 반환합니다.
+
+    Args:
+        v1: 첫 번째 벡터
+        v2: 두 번째 벡터
+
+    Returns:
+        cos 값 (-1 ~ 1)
+    """
+    a = v1.tolist()
+    b = v2.tolist()
+    len1 = math.sqrt(sum(x * x for x in a))
+    len2 = math.sqrt(sum(y * y for y in b))
+
+    if len1 < 1e-10 or len2 < 1e-10:
+        return 1.0
+
+    return sum(x * y for x, y in zip(a, b)) / (len1 * len2)
+
+
 # =============================================================================
 # 고정 길이 구간 직선화 (대안 방법)
 # =============================================================================
@@ -717,22 +967,22 @@ def straighten_path_xy_only(
     if len(positions) < 3:
         return positions.copy(), {'straightened_segments': 0}
 
-    # Z값 백업
-    original_z = positions[:, 2].copy()
-
-    # XY만으로 2D 좌표 생성 (Z=0)
-    xy_positions = np.column_stack([positions[:, :2], np.zeros(len(positions))])
+    # XY만으로 [N, 2] 2D 좌표 생성 (연속 메모리 float64 복사본)
+    # Z=0을 채운 3D로 피팅하지 않고 PCA도 2D 닫힌 식으로 처리 (fit_line_pca)
+    xy_positions = positions[:, :2].astype(np.float64)
 
     # XY 평면에서 직선화
+    # (xy_positions는 이 함수에서만 쓰는 버퍼이므로 복사 없이 직접 기록)
     straightened_xy, stats = straighten_path(
         xy_positions,
         segment_length=segment_length,
         angle_threshold=angle_threshold,
-        linearity_threshold=linearity_threshold
+        linearity_threshold=linearity_threshold,
+        inplace=True
     )
 
     # 결과: 직선화된 XY + 원본 Z
-    result = np.column_stack([straightened_xy[:, :2], original_z])
+    result = np.column_stack([straightened_xy, positions[:, 2]])
 
     return result, stats
 
@@ -850,34 +1100,63 @@ def _interpolate_between_vertices(
     Returns:
         보간된 좌표 배열
     """
-    result = [vertices[0]]
-
-    for i in range(len(vertices) - 1):
-        start = vertices[i]
-        end = vertices[i + 1]
-        seg_length = np.linalg.norm(end - start)
-
-        if seg_length < 1e-10:
-            continue
-
-        # 간격에 맞는 포인트 수 계산
-        n_points = max(1, int(np.ceil(seg_length / spacing)))
-
-        # np.linspace로 균등 보간 (시작점 제외, 끝점 포함)
-        for j in range(1, n_points + 1):
-            t = j / n_points
-            point = start + t * (end - start)
-            result.append(point)
-
-    return np.array(result)
-
-
-def calculate_deviation_from_line(positions: np.ndarray) -> Dict:
+    # 모든 구간 길이를 한 번에 계산
+    deltas = np.diff(vertices, axis=0)
+    seg_lengths = np.sqrt(np.einsum('ij,ij->i', deltas, deltas).astype(np.float64))
+
+    # 간격에 맞는 구간별 포인트 수 (길이 0인 구간은 건너뜀)
+    counts = np.where(
+        seg_lengths < 1e-10, 0, np.maximum(1, np.ceil(seg_lengths / spacing))
+    ).astype(np.int64)
+
+    # 결과 배열을 한 번에 할당 (첫 꼭짓점 + 보간 포인트)
+    result = np.empty((int(counts.sum()) + 1, vertices.shape[1]), dtype=vertices.dtype)
+    result[0] = vertices[0]
+
+    if NUMBA_AVAILABLE:
+        # 보간 포인트를 임시 배열 없이 한 번의 컴파일된 루프로 채움
+        _fill_interpolation_numba(vertices, deltas, counts, result)
+        return result
+
+    # 출력 포인트마다 소속 구간과 구간 내 순번 j (1 ≤ j ≤ n)
+    # t = j / n 으로 균등 보간 (시작점 제외, 끝점 포함)
+    seg = np.repeat(np.arange(len(counts)), counts)
+    offsets = np.cumsum(counts) - counts
+    j = np.arange(1, len(seg) + 1) - offsets[seg]
+    t = (j / counts[seg]).astype(vertices.dtype)
+
+    result[1:] = vertices[:-1][seg] + t[:, None] * deltas[seg]
+
+    return result
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, nogil=True)
+    def _fill_interpolation_numba(vertices, deltas, counts, out):
+        """_interpolate_between_vertices 보간 단계의 Numba 버전 (out[1:]을 채움)"""
+        # t를 좌표와 같은 dtype으로 맞추기 위한 스칼라 버퍼 (NumPy 구현과 같은 반올림)
+        t_buf = np.empty(1, dtype=out.dtype)
+        k = 1
+        for i in range(counts.shape[0]):
+            n = counts[i]
+            for j in range(1, n + 1):
+                t_buf[0] = j / n
+                t = t_buf[0]
+                for a in range(out.shape[1]):
+                    out[k, a] = vertices[i, a] + t * deltas[i, a]
+                k += 1
+
+
+def calculate_deviation_from_line(
+    positions: np.ndarray,
+    return_distances: bool = False
+) -> Dict:
     """
     경로가 직선에서 얼마나 벗어나는지 계산합니다.
 
     Args:
         positions: [N, 3] 좌표 배열
+        return_distances: True면 점별 거리 배열('distances', [N] ndarray)도 포함
 
     Returns:
         편차 통계 (mean, max, std)
@@ -888,23 +1167,19 @@ def calculate_deviation_from_line(positions: np.ndarray) -> Dict:
     # 직선 피팅
     line = fit_line_pca(positions)
 
-    # 각 점에서 직선까지의 거리 계산
-    distances = []
-    for p in positions:
-        # 투영점 계산
-        v = p - line.point
-        t = np.dot(v, line.direction)
-        projection = line.point + t * line.direction
-
-        # 원본과 투영점 사이 거리
-        dist = np.linalg.norm(p - projection)
-        distances.append(dist)
+    # 각 점에서 직선까지의 거리를 한 번에 계산
+    # 투영 성분 t·d를 빼고 남은 수직 성분의 길이 = 직선까지의 거리
+    v = positions - line.point
+    t = v @ line.direction
+    perpendicular = v - t[:, None] * line.direction
+    distances = np.sqrt(np.einsum('ij,ij->i', perpendicular, perpendicular))
 
-    distances = np.array(distances)
-
-    return {
+    deviation = {
         'mean': float(np.mean(distances)),
         'max': float(np.max(distances)),
-        'std': float(np.std(distances)),
-        'distances': distances.tolist()
+        'std': float(np.std(distances))
     }
+    if return_distances:
+        deviation['distances'] = distances
+
+    return deviation
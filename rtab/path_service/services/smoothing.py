@@ -15,6 +15,7 @@ SLAM 데이터는 센서 노이즈로 인해 떨리는(jittery) 경로가 됩니
 2. smooth_path_spline: B-스플라인 보간 (부드러운 곡선)
 3. adaptive_smooth: 곡률 기반 적응형 스무딩
 4. remove_outliers: 이상치 제거
+5. clean_and_smooth: 이상치 제거 + 가우시안 스무딩 (한 버퍼에서 처리)
 
 [스무딩 방법 선택 가이드]
 ┌─────────────────────┬────────────────────┬───────────────────┐
@@ -33,13 +34,19 @@ SLAM 데이터는 센서 노이즈로 인해 떨리는(jittery) 경로가 됩니
 
     # Step 2: 가우시안 스무딩
     smoothed = smooth_path(cleaned, sigma=2.0)
+
+    # 또는 두 단계를 한 번에 (중간 배열 없이)
+    smoothed = clean_and_smooth(raw_positions, sigma=2.0, threshold_std=3.0)
 """
 
 import numpy as np
 from typing import Optional, List
+from dataclasses import dataclass
 from scipy.ndimage import gaussian_filter1d
 from scipy.interpolate import splprep, splev
 
+from services.extraction import POSITION_DTYPE
+
 
 # =============================================================================
 # 상수 정의
@@ -61,13 +68,49 @@ DEFAULT_OUTLIER_THRESHOLD = 3.0
 DEFAULT_GAP_THRESHOLD = 5.0
 
 
+# =============================================================================
+# 경로 구간 정보 (재사용용)
+# =============================================================================
+
+@dataclass
+class PathMetrics:
+    """
+    경로의 구간 벡터/길이/누적 길이
+
+    같은 좌표 배열에 split_at_gaps, remove_outliers, calculate_curvature 등을
+    연달아 적용할 때 compute_path_metrics로 한 번만 계산해 metrics 인자로 넘기면
+    함수마다 np.diff + norm을 다시 계산하지 않습니다.
+    (좌표 배열을 수정하면 다시 계산해야 함)
+    """
+    diffs: np.ndarray       # [N-1, 3] 연속 포인트 간 차이 (positions와 같은 dtype)
+    lengths: np.ndarray     # [N-1] 구간 길이
+    cumulative: np.ndarray  # [N] 시작점부터의 누적 길이 (첫 원소 0)
+
+
+def compute_path_metrics(positions: np.ndarray) -> PathMetrics:
+    """
+    좌표 배열의 구간 벡터/길이/누적 길이를 계산합니다.
+
+    Args:
+        positions: [N, 3] 좌표 배열
+
+    Returns:
+        PathMetrics
+    """
+    diffs = np.diff(positions, axis=0)
+    lengths = np.linalg.norm(diffs, axis=1)
+    cumulative = np.concatenate(([0.0], np.cumsum(lengths)))
+    return PathMetrics(diffs=diffs, lengths=lengths, cumulative=cumulative)
+
+
 # =============================================================================
 # 갭 인식 스무딩
 # =============================================================================
 
 def split_at_gaps(
     positions: np.ndarray,
-    gap_threshold: float = DEFAULT_GAP_THRESHOLD
+    gap_threshold: float = DEFAULT_GAP_THRESHOLD,
+    metrics: Optional[PathMetrics] = None
 ) -> List[np.ndarray]:
     """
     연속 포인트 간 거리가 gap_threshold를 초과하는 지점에서 경로를 분리합니다.
@@ -86,6 +129,7 @@ def split_at_gaps(
     Args:
         positions: [N, 3] 좌표 배열
         gap_threshold: 갭 판정 거리 (미터)
+        metrics: positions의 PathMetrics (있으면 구간 길이 재사용)
 
     Returns:
         세그먼트 리스트 (각각 numpy 배열)
@@ -93,22 +137,17 @@ def split_at_gaps(
     if len(positions) < 2:
         return [positions]
 
-    dists = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+    if metrics is not None:
+        dists = metrics.lengths
+    else:
+        dists = np.linalg.norm(np.diff(positions, axis=0), axis=1)
     split_indices = np.where(dists > gap_threshold)[0] + 1
 
     if len(split_indices) == 0:
         return [positions]
 
-    segments = []
-    prev = 0
-    for idx in split_indices:
-        if idx - prev >= 2:
-            segments.append(positions[prev:idx])
-        prev = idx
-    if len(positions) - prev >= 2:
-        segments.append(positions[prev:])
-
-    return segments
+    # 갭 위치에서 한 번에 분할 (뷰 리스트) 후 2점 미만 조각은 버림
+    return [seg for seg in np.split(positions, split_indices) if len(seg) >= 2]
 
 
 def smooth_path_gapaware(
@@ -191,16 +230,9 @@ def smooth_path(
     if len(positions) < 3:
         return positions
 
-    # 결과 배열 초기화
-    smoothed = np.zeros_like(positions)
-
     # 각 좌표축(X, Y, Z)에 독립적으로 가우시안 필터 적용
-    # - 1D 필터를 3번 적용 (각 축에 대해)
-    smoothed[:, 0] = gaussian_filter1d(positions[:, 0], sigma=sigma)  # X
-    smoothed[:, 1] = gaussian_filter1d(positions[:, 1], sigma=sigma)  # Y
-    smoothed[:, 2] = gaussian_filter1d(positions[:, 2], sigma=sigma)  # Z
-
-    return smoothed
+    # - axis=0으로 한 번 호출하면 SciPy가 세 열을 C 루프 안에서 각각 필터링
+    return gaussian_filter1d(positions, sigma=sigma, axis=0)
 
 
 # =============================================================================
@@ -331,34 +363,36 @@ def adaptive_smooth(
     adaptive_sigma = base_sigma * (1 - curvature_weight * normalized_curvature)
 
     # Step 4: 각 포인트별 가변 스무딩 적용
-    smoothed = np.zeros_like(positions)
-
-    for i in range(len(positions)):
-        # 최소 시그마 보장
-        sigma = max(MIN_SIGMA, adaptive_sigma[i])
+    # 포인트마다 커널을 만드는 대신, 모든 포인트의 가중치를 [N, 2W+1] 배열로 한 번에 계산
+    n = len(positions)
 
-        # 윈도우 크기 결정 (3σ 규칙: 99.7% 데이터 포함)
-        window = int(3 * sigma)
+    # 최소 시그마 보장
+    sigma = np.maximum(MIN_SIGMA, adaptive_sigma)
 
-        # 윈도우 범위
-        start = max(0, i - window)
-        end = min(len(positions), i + window + 1)
+    # 윈도우 크기 결정 (3σ 규칙: 99.7% 데이터 포함)
+    window = (3 * sigma).astype(np.int64)
+    max_window = int(window.max())
+    offsets = np.arange(-max_window, max_window + 1)
 
-        # 가우시안 가중치 계산
-        indices = np.arange(start, end)
-        weights = np.exp(-0.5 * ((indices - i) / sigma) ** 2)
-        weights /= weights.sum()  # 정규화 (합 = 1)
+    # 가우시안 가중치 계산 (각 포인트의 윈도우 밖이나 배열 범위 밖은 0)
+    neighbor = np.arange(n)[:, None] + offsets
+    inside = (np.abs(offsets) <= window[:, None]) & (neighbor >= 0) & (neighbor < n)
+    weights = np.where(inside, np.exp(-0.5 * (offsets / sigma[:, None]) ** 2), 0.0)
+    weights /= weights.sum(axis=1, keepdims=True)  # 정규화 (합 = 1)
 
-        # 가중 평균으로 스무딩
-        smoothed[i] = np.sum(
-            positions[start:end] * weights[:, np.newaxis],
-            axis=0
-        )
+    # 가중 평균으로 스무딩 (오프셋마다 한 번씩 전체 배열에 누적)
+    accumulated = np.zeros(positions.shape)
+    for k, offset in enumerate(offsets.tolist()):
+        shifted = positions[np.clip(np.arange(n) + offset, 0, n - 1)]
+        accumulated += weights[:, k, None] * shifted
 
-    return smoothed
+    return accumulated.astype(positions.dtype, copy=False)
 
 
-def calculate_curvature(positions: np.ndarray) -> np.ndarray:
+def calculate_curvature(
+    positions: np.ndarray,
+    metrics: Optional[PathMetrics] = None
+) -> np.ndarray:
     """
     각 포인트에서의 로컬 곡률을 계산합니다.
 
@@ -384,6 +418,7 @@ def calculate_curvature(positions: np.ndarray) -> np.ndarray:
 
     Args:
         positions: [N, 3] 좌표 배열
+        metrics: positions의 PathMetrics (있으면 구간 벡터 재사용)
 
     Returns:
         각 포인트의 곡률 배열 [N]
@@ -393,27 +428,20 @@ def calculate_curvature(positions: np.ndarray) -> np.ndarray:
 
     curvature = np.zeros(len(positions))
 
-    for i in range(1, len(positions) - 1):
-        # 세 연속 점
-        p0 = positions[i - 1]
-        p1 = positions[i]      # 현재 점
-        p2 = positions[i + 1]
+    # 연속 벡터 (v[i-1]: 이전 → 현재, v[i]: 현재 → 다음)
+    if metrics is not None:
+        v = np.asarray(metrics.diffs, dtype=np.float64)
+    else:
+        v = np.diff(np.asarray(positions, dtype=np.float64), axis=0)
 
-        # 연속 벡터
-        v1 = p1 - p0  # 이전 → 현재
-        v2 = p2 - p1  # 현재 → 다음
+    # 외적 크기와 벡터 길이를 모든 포인트에 대해 한 번에 계산
+    cross = np.cross(v[:-1], v[1:])
+    cross_magnitude = np.sqrt(np.einsum('ij,ij->i', cross, cross))
+    lengths = np.sqrt(np.einsum('ij,ij->i', v, v))
 
-        # 외적 계산
-        cross = np.cross(v1, v2)
-        cross_magnitude = np.linalg.norm(cross)
-
-        # 벡터 길이
-        len1 = np.linalg.norm(v1)
-        len2 = np.linalg.norm(v2)
-
-        # 곡률 계산 (0으로 나누기 방지)
-        if len1 > 1e-10 and len2 > 1e-10:
-            curvature[i] = cross_magnitude / (len1 * len2)
+    # 곡률 계산 (0으로 나누기 방지)
+    valid = (lengths[:-1] > 1e-10) & (lengths[1:] > 1e-10)
+    np.divide(cross_magnitude, lengths[:-1] * lengths[1:], out=curvature[1:-1], where=valid)
 
     # 경계 값 처리 (첫 번째, 마지막 점)
     curvature[0] = curvature[1]
@@ -428,7 +456,8 @@ def calculate_curvature(positions: np.ndarray) -> np.ndarray:
 
 def remove_outliers(
     positions: np.ndarray,
-    threshold_std: float = DEFAULT_OUTLIER_THRESHOLD
+    threshold_std: float = DEFAULT_OUTLIER_THRESHOLD,
+    metrics: Optional[PathMetrics] = None
 ) -> np.ndarray:
     """
     이웃 점들에서 크게 벗어난 이상치(outlier)를 보간으로 대체합니다.
@@ -452,6 +481,7 @@ def remove_outliers(
     Args:
         positions: [N, 3] 좌표 배열
         threshold_std: 이상치 판정 기준 (표준편차의 배수)
+        metrics: positions의 PathMetrics (있으면 구간 길이 재사용)
 
     Returns:
         이상치가 보간된 좌표 배열
@@ -469,7 +499,10 @@ def remove_outliers(
     result = positions.copy()
 
     # Step 1: 연속 점 간의 거리 계산
-    distances = np.linalg.norm(np.diff(positions, axis=0), axis=1)
+    if metrics is not None:
+        distances = metrics.lengths
+    else:
+        distances = np.linalg.norm(np.diff(positions, axis=0), axis=1)
 
     # Step 2: 통계 계산
     mean_dist = np.mean(distances)
@@ -479,20 +512,48 @@ def remove_outliers(
     threshold = mean_dist + threshold_std * std_dist
 
     # Step 4: 이상치 감지 및 보간
-    for i in range(1, len(positions) - 1):
-        # 이전 점까지의 거리
-        dist_prev = np.linalg.norm(positions[i] - positions[i - 1])
-        # 다음 점까지의 거리
-        dist_next = np.linalg.norm(positions[i + 1] - positions[i])
+    # 포인트 i의 이전/다음 거리는 distances[i-1], distances[i] (Step 1 결과 재사용)
+    # 양쪽 중 하나라도 임계값 초과면 이상치
+    outlier = (distances[:-1] > threshold) | (distances[1:] > threshold)
+    idx = np.flatnonzero(outlier) + 1
 
-        # 양쪽 중 하나라도 임계값 초과면 이상치
-        if dist_prev > threshold or dist_next > threshold:
-            # 선형 보간: 이전 점과 다음 점의 중간값
-            result[i] = (positions[i - 1] + positions[i + 1]) / 2
+    # 선형 보간: 이전 점과 다음 점의 중간값 (원본 좌표 기준)
+    result[idx] = (positions[idx - 1] + positions[idx + 1]) / 2
 
     return result
 
 
+def clean_and_smooth(
+    positions: np.ndarray,
+    sigma: float = DEFAULT_GAUSSIAN_SIGMA,
+    threshold_std: float = DEFAULT_OUTLIER_THRESHOLD
+) -> np.ndarray:
+    """
+    이상치 제거 후 가우시안 스무딩을 적용합니다.
+
+    remove_outliers → smooth_path와 같은 결과이지만, remove_outliers가 만든
+    복사본을 필터의 출력 버퍼로 그대로 사용하므로 중간 배열을 하나 덜 만듭니다.
+    (gaussian_filter1d는 축 방향 한 줄씩 버퍼에 복사해 필터링하므로 입력=출력 가능)
+
+    Args:
+        positions: [N, 3] 좌표 배열
+        sigma: 가우시안 표준편차
+        threshold_std: 이상치 판정 기준 (표준편차의 배수)
+
+    Returns:
+        이상치가 보간되고 스무딩된 좌표 배열
+    """
+    cleaned = remove_outliers(positions, threshold_std=threshold_std)
+
+    # 최소 포인트 검증 (smooth_path와 동일)
+    if len(cleaned) < 3:
+        return cleaned
+
+    # 포인트가 적으면 remove_outliers가 원본을 그대로 돌려주므로 원본은 덮어쓰지 않음
+    output = cleaned if cleaned is not positions else None
+    return gaussian_filter1d(cleaned, sigma=sigma, axis=0, output=output)
+
+
 # =============================================================================
 # 유틸리티 함수
 # =============================================================================
@@ -528,5 +589,5 @@ def _calculate_path_length(positions: np.ndarray) -> float:
     if len(positions) < 2:
         return 0.0
 
-    distances = np.linalg.norm(np.diff(positions, axis=0), axis=1)
-    return float(np.sum(distances))
+    diffs = np.diff(np.ascontiguousarray(positions, dtype=POSITION_DTYPE), axis=0)
+    return float(np.sqrt(np.einsum('ij,ij->i', diffs, diffs)).sum())
@@ -45,6 +45,16 @@ Z값의 히스토그램을 분석하여 각 층의 높이를 식별합니다.
 import numpy as np
 from typing import List, Dict, Tuple, Optional
 from scipy.ndimage import gaussian_filter1d
+from scipy.signal import find_peaks
+
+from services.extraction import POSITION_DTYPE
+
+# Numba가 설치된 경우 슬라이딩 윈도우 스캔을 JIT 컴파일 (없으면 NumPy 구현 사용)
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
 
 # =============================================================================
@@ -118,6 +128,8 @@ def detect_stairs_first(
         >>> for p in passages:
         ...     print(f"{p['type']}: {p['z_start']:.1f}m → {p['z_end']:.1f}m")
     """
+    # 추출 단계와 같은 float32로 통일 (이미 float32 연속 배열이면 복사 없음)
+    positions = np.ascontiguousarray(positions, dtype=POSITION_DTYPE)
     n = len(positions)
     is_stair = np.zeros(n, dtype=bool)  # 수직 통로 마스크
     z = positions[:, 2]
@@ -126,84 +138,251 @@ def detect_stairs_first(
     z_diff = np.diff(z)
 
     # Step 1: 슬라이딩 윈도우로 수직 이동 구간 찾기
-    changing_z = np.zeros(n, dtype=bool)
+    changing_z = _scan_windows(z, z_diff, window_size, min_total_z_change, z_change_threshold)
+
+    # Step 2: 연속된 수직 이동 구간을 그룹화
+    # 최소 조건(Z 변화량, 포인트 수)을 만족하는 구간 [start, end) 목록
+    runs = _find_stair_runs(changing_z, z, min_total_z_change, min_stair_points)
+
+    # 구간별 XY 경로 거리를 O(1)로 구하기 위한 누적 거리 (궤적당 한 번)
+    cum_xy = _cumulative_xy_length(positions)
+
+    stair_segments = []
+    for start_idx, end_idx in runs.tolist():
+        # 구간 분석
+        segment_positions = positions[start_idx:end_idx]
+        z_start = segment_positions[0, 2]
+        z_end = segment_positions[-1, 2]
+        z_disp = abs(z_end - z_start)
+
+        # XY 이동 거리 계산 (직선 거리가 아닌 경로 거리)
+        total_xy_dist = cum_xy[end_idx - 1] - cum_xy[start_idx]
+
+        # XY/Z 비율로 계단/엘리베이터 판정
+        xy_z_ratio = total_xy_dist / z_disp if z_disp > 0 else float('inf')
+        passage_type = "ELEVATOR" if xy_z_ratio < ELEVATOR_XY_Z_RATIO else "STAIRCASE"
+
+        stair_segments.append({
+            'type': passage_type,
+            'start_idx': start_idx,
+            'end_idx': end_idx,
+            'positions': segment_positions,  # 원본 배열의 뷰 (복사 없음)
+            'z_start': float(z_start),
+            'z_end': float(z_end),
+            'z_displacement': float(z_disp),
+            'total_xy_dist': float(total_xy_dist),
+            'xy_z_ratio': float(xy_z_ratio),
+            'direction': 'UP' if z_end > z_start else 'DOWN'
+        })
+
+        # 마스크 업데이트
+        is_stair[start_idx:end_idx] = True
+
+    # Step 3: 인접한 같은 방향 구간 병합
+    stair_segments = _merge_stair_segments(stair_segments, positions, cum_xy=cum_xy)
+
+    return stair_segments, is_stair
+
+
+def _cumulative_xy_length(positions: np.ndarray) -> np.ndarray:
+    """
+    궤적 시작점부터 각 포인트까지의 누적 XY 경로 거리를 계산합니다.
+
+    구간 [start, end) 의 XY 경로 거리 = cum_xy[end - 1] - cum_xy[start]
+
+    Args:
+        positions: [N, 3] 좌표 배열
 
-    for i in range(n - window_size):
-        # 윈도우 내 총 Z 변화
-        window_z_change = z[i + window_size] - z[i]
+    Returns:
+        [N] 누적 거리 배열 (첫 원소는 0, float64로 누적)
+    """
+    xy_diffs = np.diff(positions[:, :2], axis=0)
+    step_lengths = np.sqrt(np.einsum('ij,ij->i', xy_diffs, xy_diffs))
+    return np.concatenate(([0.0], np.cumsum(step_lengths, dtype=np.float64)))
 
-        # 충분한 Z 변화가 있는지 확인
-        if abs(window_z_change) > min_total_z_change * (window_size / 20):
-            # 방향 일관성 확인 (올라가기만 또는 내려가기만)
-            window_diff = z_diff[i:i + window_size]
 
+def _scan_windows(
+    z: np.ndarray,
+    z_diff: np.ndarray,
+    window_size: int,
+    min_total_z_change: float,
+    z_change_threshold: float
+) -> np.ndarray:
+    """
+    슬라이딩 윈도우로 Z값이 일관되게 변하는 포인트를 표시합니다.
+
+    윈도우 i = [i, i + window_size] 의 총 Z 변화가 충분하고
+    같은 방향 스텝이 절반을 넘으면 윈도우 전체를 수직 이동으로 표시합니다.
+
+    Args:
+        z: [N] Z 좌표 배열
+        z_diff: [N-1] 연속 포인트 간 Z 변화량
+        window_size: 슬라이딩 윈도우 크기
+        min_total_z_change: 최소 총 Z 변화량
+        z_change_threshold: Z 변화 감지 임계값
+
+    Returns:
+        [N] 수직 이동 포인트 마스크
+    """
+    if NUMBA_AVAILABLE:
+        # 윈도우 판정과 마스크 표시를 임시 배열 없이 한 번의 컴파일된 루프로
+        return _scan_windows_numba(
+            np.ascontiguousarray(z, dtype=np.float64),
+            np.ascontiguousarray(z_diff, dtype=np.float64),
+            int(window_size), float(min_total_z_change), float(z_change_threshold)
+        )
+
+    n = len(z)
+
+    # 모든 윈도우를 한 번에 계산
+    # 윈도우 i = [i, i + window_size], i = 0 .. n - window_size - 1
+    num_windows = max(n - window_size, 0)
+
+    # 윈도우 내 총 Z 변화
+    window_z_change = z[window_size:window_size + num_windows] - z[:num_windows]
+
+    # 방향 일관성: 윈도우 내 양수/음수 변화 개수를 누적합 차이로 계산
+    # count[i] = cumsum[i + window_size] - cumsum[i]
+    up_cumsum = np.concatenate(([0], np.cumsum(z_diff > z_change_threshold / 2)))
+    down_cumsum = np.concatenate(([0], np.cumsum(z_diff < -z_change_threshold / 2)))
+    up_count = up_cumsum[window_size:window_size + num_windows] - up_cumsum[:num_windows]
+    down_count = down_cumsum[window_size:window_size + num_windows] - down_cumsum[:num_windows]
+
+    # 올라가는 경우 양수 변화가, 내려가는 경우 음수 변화가 절반 이상
+    consistent = np.where(
+        window_z_change > 0,
+        up_count > window_size * 0.5,
+        down_count > window_size * 0.5
+    )
+    # 충분한 Z 변화가 있는지 확인
+    enough_change = np.abs(window_z_change) > min_total_z_change * (window_size / 20)
+    hit_starts = np.flatnonzero(enough_change & consistent)
+
+    # 해당 윈도우들을 수직 이동으로 표시 (구간 시작 +1, 끝 다음 -1 → 누적합 > 0)
+    coverage = np.zeros(n + 1, dtype=np.int32)
+    np.add.at(coverage, hit_starts, 1)
+    np.add.at(coverage, hit_starts + window_size + 1, -1)
+    changing_z = np.cumsum(coverage[:n]) > 0
+
+    return changing_z
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, fastmath=True)
+    def _scan_windows_numba(z, z_diff, window_size, min_total_z_change, z_change_threshold):
+        """_scan_windows의 Numba 버전 (윈도우 내 방향별 스텝 수를 이동 합으로 갱신)"""
+        n = z.shape[0]
+        changing_z = np.zeros(n, dtype=np.bool_)
+        num_windows = n - window_size
+        if num_windows <= 0:
+            return changing_z
+
+        half_thr = z_change_threshold / 2
+        min_count = window_size * 0.5
+        min_change = min_total_z_change * (window_size / 20)
+
+        # 첫 윈도우의 방향별 스텝 수
+        up_count = 0
+        down_count = 0
+        for k in range(window_size):
+            if z_diff[k] > half_thr:
+                up_count += 1
+            if z_diff[k] < -half_thr:
+                down_count += 1
+
+        painted_until = 0  # 이미 표시된 구간의 끝 (exclusive)
+        for i in range(num_windows):
+            if i > 0:
+                # 윈도우를 한 칸 이동: 빠지는 스텝 제거, 들어오는 스텝 추가
+                d_out = z_diff[i - 1]
+                if d_out > half_thr:
+                    up_count -= 1
+                if d_out < -half_thr:
+                    down_count -= 1
+                d_in = z_diff[i + window_size - 1]
+                if d_in > half_thr:
+                    up_count += 1
+                if d_in < -half_thr:
+                    down_count += 1
+
+            window_z_change = z[i + window_size] - z[i]
             if window_z_change > 0:
-                # 올라가는 경우: 양수 변화가 절반 이상
-                consistent = np.sum(window_diff > z_change_threshold / 2) > window_size * 0.5
+                consistent = up_count > min_count
             else:
-                # 내려가는 경우: 음수 변화가 절반 이상
-                consistent = np.sum(window_diff < -z_change_threshold / 2) > window_size * 0.5
+                consistent = down_count > min_count
 
-            if consistent:
-                # 해당 윈도우를 수직 이동으로 표시
-                changing_z[i:i + window_size + 1] = True
+            if consistent and abs(window_z_change) > min_change:
+                # changing_z[i:i + window_size + 1] = True (겹치는 부분은 건너뜀)
+                for k in range(max(i, painted_until), i + window_size + 1):
+                    changing_z[k] = True
+                painted_until = i + window_size + 1
 
-    # Step 2: 연속된 수직 이동 구간을 그룹화
-    stair_segments = []
-    i = 0
-
-    while i < n:
-        if changing_z[i]:
-            start_idx = i
-
-            # 구간 끝 찾기
-            while i < n and changing_z[i]:
-                i += 1
-            end_idx = i
-
-            # 구간 분석
-            segment_positions = positions[start_idx:end_idx]
-            z_start = segment_positions[0, 2]
-            z_end = segment_positions[-1, 2]
-            z_disp = abs(z_end - z_start)
-
-            # 최소 조건 만족 확인
-            if z_disp >= min_total_z_change and (end_idx - start_idx) >= min_stair_points:
-                # XY 이동 거리 계산 (직선 거리가 아닌 경로 거리)
-                xy_diffs = np.diff(segment_positions[:, :2], axis=0)
-                total_xy_dist = np.sum(np.sqrt(np.sum(xy_diffs**2, axis=1)))
-
-                # XY/Z 비율로 계단/엘리베이터 판정
-                xy_z_ratio = total_xy_dist / z_disp if z_disp > 0 else float('inf')
-                passage_type = "ELEVATOR" if xy_z_ratio < ELEVATOR_XY_Z_RATIO else "STAIRCASE"
-
-                stair_segments.append({
-                    'type': passage_type,
-                    'start_idx': start_idx,
-                    'end_idx': end_idx,
-                    'positions': segment_positions.copy(),
-                    'z_start': float(z_start),
-                    'z_end': float(z_end),
-                    'z_displacement': float(z_disp),
-                    'xy_z_ratio': float(xy_z_ratio),
-                    'direction': 'UP' if z_end > z_start else 'DOWN'
-                })
-
-                # 마스크 업데이트
-                is_stair[start_idx:end_idx] = True
-        else:
-            i += 1
+        return changing_z
 
-    # Step 3: 인접한 같은 방향 구간 병합
-    stair_segments = _merge_stair_segments(stair_segments, positions)
 
-    return stair_segments, is_stair
+def _find_stair_runs(
+    changing_z: np.ndarray,
+    z: np.ndarray,
+    min_total_z_change: float,
+    min_stair_points: int
+) -> np.ndarray:
+    """
+    수직 이동 마스크에서 연속 구간을 찾고 최소 조건으로 거릅니다.
+
+    Args:
+        changing_z: [N] 수직 이동 포인트 마스크
+        z: [N] Z 좌표 배열
+        min_total_z_change: 구간 시작-끝 최소 Z 변화량
+        min_stair_points: 구간 최소 포인트 수
+
+    Returns:
+        [K, 2] 구간 (start, end) 배열 (end는 exclusive)
+    """
+    if NUMBA_AVAILABLE:
+        # 경계 탐색과 조건 검사를 임시 배열 없이 한 번의 컴파일된 루프로
+        return _find_stair_runs_numba(
+            np.ascontiguousarray(changing_z), z,
+            float(min_total_z_change), int(min_stair_points)
+        )
+
+    # 마스크의 상승/하강 경계로 구간 [start, end) 를 한 번에 찾음
+    edges = np.diff(changing_z.astype(np.int8), prepend=0, append=0)
+    run_starts = np.flatnonzero(edges == 1)
+    run_ends = np.flatnonzero(edges == -1)
+
+    run_z_disp = np.abs(z[run_ends - 1] - z[run_starts])
+    valid = (run_z_disp >= min_total_z_change) & ((run_ends - run_starts) >= min_stair_points)
+    return np.column_stack((run_starts[valid], run_ends[valid]))
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True)
+    def _find_stair_runs_numba(changing_z, z, min_total_z_change, min_stair_points):
+        """_find_stair_runs의 Numba 버전 (run_start 하나로 구간을 추적)"""
+        n = changing_z.shape[0]
+        # 구간은 서로 겹치지 않고 최소 1칸씩 떨어져 있으므로 (N + 1) // 2개면 충분
+        runs = np.empty(((n + 1) // 2, 2), dtype=np.int64)
+        count = 0
+        run_start = -1
+        for i in range(n + 1):
+            inside = i < n and changing_z[i]
+            if inside and run_start < 0:
+                run_start = i
+            elif not inside and run_start >= 0:
+                if (i - run_start >= min_stair_points
+                        and abs(z[i - 1] - z[run_start]) >= min_total_z_change):
+                    runs[count, 0] = run_start
+                    runs[count, 1] = i
+                    count += 1
+                run_start = -1
+        return runs[:count]
 
 
 def _merge_stair_segments(
     segments: List[Dict],
     positions: np.ndarray,
-    gap_threshold: int = GAP_THRESHOLD
+    gap_threshold: int = GAP_THRESHOLD,
+    cum_xy: Optional[np.ndarray] = None
 ) -> List[Dict]:
     """
     인접하고 같은 방향인 계단 구간을 병합합니다.
@@ -216,6 +395,7 @@ def _merge_stair_segments(
         segments: 계단 구간 리스트
         positions: 전체 좌표 배열
         gap_threshold: 최대 병합 간격
+        cum_xy: 누적 XY 경로 거리 (_cumulative_xy_length, 없으면 계산)
 
     Returns:
         병합된 계단 구간 리스트
@@ -223,8 +403,12 @@ def _merge_stair_segments(
     if len(segments) < 2:
         return segments
 
+    if cum_xy is None:
+        cum_xy = _cumulative_xy_length(positions)
+
     merged = []
     current = segments[0].copy()
+    current_extended = False
 
     for seg in segments[1:]:
         # 같은 방향인지 확인
@@ -235,24 +419,32 @@ def _merge_stair_segments(
         if same_direction and close_enough:
             # 병합: 현재 구간 확장
             current['end_idx'] = seg['end_idx']
-            current['positions'] = positions[current['start_idx']:current['end_idx']]
+            # XY 경로 거리는 누적 거리 차이로 O(1) 계산 (사이 간격 구간 포함)
+            current['total_xy_dist'] = float(cum_xy[current['end_idx'] - 1] - cum_xy[current['start_idx']])
             current['z_end'] = seg['z_end']
             current['z_displacement'] = abs(current['z_end'] - current['z_start'])
+            current_extended = True
 
             # XY/Z 비율 재계산
-            xy_diffs = np.diff(current['positions'][:, :2], axis=0)
-            total_xy_dist = np.sum(np.sqrt(np.sum(xy_diffs**2, axis=1)))
             z_disp = current['z_displacement']
-            current['xy_z_ratio'] = total_xy_dist / z_disp if z_disp > 0 else float('inf')
+            current['xy_z_ratio'] = current['total_xy_dist'] / z_disp if z_disp > 0 else float('inf')
             current['type'] = "ELEVATOR" if current['xy_z_ratio'] < ELEVATOR_XY_Z_RATIO else "STAIRCASE"
         else:
-            merged.append(current)
+            merged.append(_finalize_merged_segment(current, positions, current_extended))
             current = seg.copy()
+            current_extended = False
 
-    merged.append(current)
+    merged.append(_finalize_merged_segment(current, positions, current_extended))
     return merged
 
 
+def _finalize_merged_segment(segment: Dict, positions: np.ndarray, extended: bool) -> Dict:
+    """병합으로 확장된 구간의 좌표를 최종 인덱스 범위로 한 번만 갱신합니다."""
+    if extended:
+        segment['positions'] = positions[segment['start_idx']:segment['end_idx']]
+    return segment
+
+
 # =============================================================================
 # 층 분리
 # =============================================================================
@@ -286,7 +478,7 @@ def separate_floors(
 
     Args:
         positions: [N, 3] 좌표 배열
-        node_ids: 원본 노드 ID 리스트
+        node_ids: 원본 노드 ID 배열 (또는 리스트)
         height_threshold: 층 간 높이 (미터)
         min_points_per_floor: 층당 최소 포인트 수
         stair_mask: 수직 통로 제외 마스크 (True = 제외)
@@ -299,15 +491,21 @@ def separate_floors(
         >>> for level, data in floors.items():
         ...     print(f"{level}층: {data['point_count']}개 포인트, Z = {data['z_mean']:.2f}m")
     """
+    # 추출 단계와 같은 float32로 통일 (이미 float32 연속 배열이면 복사 없음)
+    positions = np.ascontiguousarray(positions, dtype=POSITION_DTYPE)
+
+    # 노드 ID를 배열로 한 번 변환해 마스크 인덱싱으로 분배
+    node_ids_arr = np.asarray(node_ids)
+
     # Step 1: 수직 통로 제외
     if stair_mask is not None:
         floor_mask = ~stair_mask
         floor_positions = positions[floor_mask]
-        floor_node_ids = [node_ids[i] for i in range(len(node_ids)) if floor_mask[i]]
+        floor_node_ids = node_ids_arr[floor_mask]
         original_indices = np.where(floor_mask)[0]
     else:
         floor_positions = positions
-        floor_node_ids = node_ids
+        floor_node_ids = node_ids_arr
         original_indices = np.arange(len(positions))
 
     if len(floor_positions) == 0:
@@ -318,26 +516,33 @@ def separate_floors(
     floor_levels = _cluster_z_values(z_values, height_threshold)
 
     # Step 3: 층별로 포인트 그룹화
+    # 레벨 기준 안정 정렬 후 레벨별 구간으로 슬라이스 (층마다 전체 마스크를 만들지 않음)
+    # 안정 정렬이므로 각 층 안의 포인트는 원래 궤적 순서를 유지
     floors = {}
-    unique_levels = np.unique(floor_levels)
+    order = np.argsort(floor_levels, kind='stable')
+    sorted_positions = floor_positions[order]
+    sorted_node_ids = floor_node_ids[order]
+    sorted_indices = original_indices[order]
 
-    # 유효한 층 클러스터를 Z값 순서로 수집
-    valid_clusters = []
-    for level in unique_levels:
-        mask = floor_levels == level
-        level_positions = floor_positions[mask]
+    # 레벨별 포인트 수 → 정렬 배열에서의 구간 [start, end)
+    level_counts = np.bincount(floor_levels)
+    level_ends = np.cumsum(level_counts)
+    level_starts = level_ends - level_counts
 
-        # 최소 포인트 수 확인
-        if len(level_positions) < min_points_per_floor:
-            continue
+    # 유효한 층 클러스터를 Z값 순서로 수집 (최소 포인트 수 미달 레벨은 슬라이스도 만들지 않음)
+    valid_clusters = []
+    valid_levels = np.flatnonzero((level_counts > 0) & (level_counts >= min_points_per_floor))
+    for level in valid_levels.tolist():
+        start, end = int(level_starts[level]), int(level_ends[level])
+        level_positions = sorted_positions[start:end]
+        level_node_ids = sorted_node_ids[start:end]
+        level_indices = sorted_indices[start:end]
 
-        level_node_ids = [floor_node_ids[i] for i in range(len(floor_node_ids)) if mask[i]]
-        level_indices = original_indices[mask]
         z_mean = np.mean(level_positions[:, 2])
 
         valid_clusters.append({
             'positions': level_positions,
-            'node_ids': level_node_ids,
+            'node_ids': level_node_ids.tolist(),
             'indices': level_indices,
             'z_mean': float(z_mean),
             'z_min': float(level_positions[:, 2].min()),
@@ -384,7 +589,13 @@ def _cluster_z_values(
     # Step 1: 히스토그램 생성
     bin_size = 0.5  # 50cm 빈
     num_bins = max(int(z_range / bin_size), 20)
-    hist, bin_edges = np.histogram(z_values, bins=num_bins)
+
+    # 균등 빈이므로 빈 인덱스를 직접 계산해 bincount로 집계 (np.histogram보다 빠름)
+    # 최댓값은 np.histogram과 같이 마지막 빈에 포함
+    bin_width = z_range / num_bins
+    bin_idx = np.minimum(((z_values - z_min) / bin_width).astype(np.int64), num_bins - 1)
+    hist = np.bincount(bin_idx, minlength=num_bins)
+    bin_edges = z_min + np.arange(num_bins + 1) * bin_width
 
     # Step 2: 히스토그램 스무딩
     smoothed_hist = gaussian_filter1d(hist.astype(float), sigma=1.5)
@@ -401,12 +612,11 @@ def _cluster_z_values(
     peaks = sorted(peaks)
 
     # Step 4: 각 Z값을 가장 가까운 피크에 할당
+    # 피크가 정렬되어 있으므로 인접 피크의 중점을 경계로 이진 탐색
+    # (중점과 같은 값은 아래쪽 피크로 - argmin과 동일한 동률 처리)
     peaks_array = np.array(peaks)
-    levels = np.zeros(len(z_values), dtype=int)
-
-    for i, z in enumerate(z_values):
-        distances = np.abs(peaks_array - z)
-        levels[i] = np.argmin(distances)
+    midpoints = (peaks_array[:-1] + peaks_array[1:]) * 0.5
+    levels = np.searchsorted(midpoints, z_values).astype(int)
 
     return levels
 
@@ -420,61 +630,31 @@ def _find_histogram_peaks(
     """
     스무딩된 히스토그램에서 피크(층 높이)를 찾습니다.
 
-    [피크 찾기 방법]
-    1. 최소 카운트 이상인 빈 찾기
-    2. 연속된 유의미한 빈들을 그룹화
-    3. 각 그룹의 가중 평균 = 층 높이
+    [피크 찾기 방법 - scipy.signal.find_peaks]
+    1. 최소 카운트 이상인 극댓값 빈 찾기
+    2. 피크 간 거리가 threshold * 0.7 미만이면 더 높은 피크만 유지
+    3. 피크 빈의 중심 Z값 = 층 높이
 
     Args:
         smoothed_hist: 스무딩된 히스토그램
-        bin_edges: 빈 경계값
+        bin_edges: 빈 경계값 (균등 간격)
         min_count: 최소 카운트
         threshold: 피크 간 최소 거리
 
     Returns:
         피크 Z값 리스트
     """
-    # 유의미한 빈 찾기
-    significant_bins = []
-    for i in range(len(smoothed_hist)):
-        if smoothed_hist[i] >= min_count:
-            significant_bins.append(i)
-
-    if len(significant_bins) == 0:
-        return []
-
-    # 연속된 빈들을 그룹화
-    regions = []
-    current_region = [significant_bins[0]]
-
-    for i in range(1, len(significant_bins)):
-        if significant_bins[i] - significant_bins[i - 1] <= 2:
-            current_region.append(significant_bins[i])
-        else:
-            regions.append(current_region)
-            current_region = [significant_bins[i]]
-    regions.append(current_region)
-
-    # 각 그룹의 가중 평균 계산
-    peaks = []
-    for region in regions:
-        region_z_values = [(bin_edges[i] + bin_edges[i + 1]) / 2 for i in region]
-        region_counts = [smoothed_hist[i] for i in region]
+    bin_width = bin_edges[1] - bin_edges[0]
+    min_distance_bins = max(1, int(threshold * 0.7 / bin_width))
 
-        if sum(region_counts) > 0:
-            peak_z = np.average(region_z_values, weights=region_counts)
+    # find_peaks는 양 끝 샘플을 피크로 보지 않으므로 0으로 한 칸씩 패딩
+    # (가장 낮은/높은 층이 첫/마지막 빈에 몰려 있어도 감지)
+    padded = np.pad(smoothed_hist, 1)
+    peak_indices, _ = find_peaks(padded, height=min_count, distance=min_distance_bins)
+    peak_indices -= 1
 
-            # 기존 피크와 충분히 떨어져 있는지 확인
-            is_new_peak = True
-            for existing_peak in peaks:
-                if abs(peak_z - existing_peak) < threshold * 0.7:
-                    is_new_peak = False
-                    break
-
-            if is_new_peak:
-                peaks.append(peak_z)
-
-    return peaks
+    bin_centers = (bin_edges[peak_indices] + bin_edges[peak_indices + 1]) * 0.5
+    return bin_centers.tolist()
 
 
 # =============================================================================
@@ -501,30 +681,34 @@ def assign_floors_to_stairs(
     Returns:
         층 정보가 추가된 계단 구간 리스트
     """
-    for segment in stair_segments:
-        z_start = segment['z_start']
-        z_end = segment['z_end']
+    if not stair_segments:
+        return stair_segments
+
+    # 모든 구간의 시작/끝 Z값을 한 번에 가장 가까운 층에 할당
+    z_starts = np.array([segment['z_start'] for segment in stair_segments])
+    z_ends = np.array([segment['z_end'] for segment in stair_segments])
+    from_floors = _find_nearest_floors(z_starts, floors_data)
+    to_floors = _find_nearest_floors(z_ends, floors_data)
 
-        segment['from_floor'] = _find_nearest_floor(z_start, floors_data)
-        segment['to_floor'] = _find_nearest_floor(z_end, floors_data)
+    for segment, from_floor, to_floor in zip(stair_segments, from_floors, to_floors):
+        segment['from_floor'] = from_floor
+        segment['to_floor'] = to_floor
 
     return stair_segments
 
 
-def _find_nearest_floor(z_value: float, floors_data: Dict[int, Dict]) -> int:
-    """Z값과 가장 가까운 층 번호를 반환합니다."""
+def _find_nearest_floors(z_values: np.ndarray, floors_data: Dict[int, Dict]) -> List[int]:
+    """각 Z값과 가장 가까운 층 번호 리스트를 반환합니다 (거리가 같으면 먼저 나온 층)."""
     if not floors_data:
-        return 0
+        return [0] * len(z_values)
 
-    best_floor = 0
-    best_dist = float('inf')
-    for floor_num, data in floors_data.items():
-        dist = abs(data['z_mean'] - z_value)
-        if dist < best_dist:
-            best_dist = dist
-            best_floor = floor_num
+    floor_numbers = np.fromiter(floors_data.keys(), dtype=int, count=len(floors_data))
+    floor_zs = np.fromiter((data['z_mean'] for data in floors_data.values()),
+                           dtype=float, count=len(floors_data))
 
-    return best_floor
+    # [K, F] 거리 행렬에서 행별 최솟값 (층 수가 적으므로 브로드캐스트로 충분)
+    nearest = np.argmin(np.abs(z_values[:, None] - floor_zs[None, :]), axis=1)
+    return floor_numbers[nearest].tolist()
 
 
 # =============================================================================
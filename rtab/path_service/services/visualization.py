@@ -7,9 +7,59 @@ import matplotlib
 matplotlib.use('Agg')
 import numpy as np
 import matplotlib.pyplot as plt
-from typing import Dict, List, Tuple
+from mpl_toolkits.mplot3d.art3d import Line3DCollection
+from typing import Dict, List, Optional, Tuple
 import os
 
+from services import PREVIEW_IMAGE_TYPES
+
+
+# Upper bound on vertices drawn in 3D views (trajectories are decimated above this)
+MAX_3D_PLOT_POINTS = 5000
+
+# Upper bound on vertices drawn in 2D line plots (stride-decimated above this)
+MAX_PLOT_POINTS = 5000
+
+# Upper bound on colormapped scatter markers (the decimated line is drawn underneath)
+MAX_SCATTER_POINTS = 2000
+
+# Previews are regenerated per job, so favour fast zlib encoding over file size
+SAVEFIG_KWARGS = dict(bbox_inches='tight', pil_kwargs={'compress_level': 1})
+
+# Rasterization cost scales with pixel count; 100 DPI is ~2.25x cheaper than 150
+PREVIEW_DPI = 100
+HIGH_PREVIEW_DPI = 150
+
+
+def _decimate(a: np.ndarray, max_points: int = MAX_PLOT_POINTS) -> np.ndarray:
+    """Stride an array down to at most ~max_points entries (a view, no copy)."""
+    return a[::max(1, len(a) // max_points)]
+
+
+def _nan_joined(arrays: List[np.ndarray]) -> np.ndarray:
+    """Concatenate arrays with a NaN row between them so one plot call draws separate lines."""
+    gap = np.full((1,) + np.shape(arrays[0])[1:], np.nan)
+    parts = []
+    for a in arrays:
+        parts.extend((a, gap))
+    return np.concatenate(parts[:-1])
+
+
+def _polyline_length(positions: np.ndarray) -> float:
+    """Total length of a polyline (squared step lengths via einsum, no squared-diff temporary)."""
+    if len(positions) < 2:
+        return 0.0
+    diffs = np.diff(np.asarray(positions), axis=0)
+    return float(np.sqrt(np.einsum('ij,ij->i', diffs, diffs)).sum())
+
+
+def _group_passages_by_type(vertical_passages: List[dict]) -> Dict[str, List[dict]]:
+    """Group passages by type so each type is drawn with a single plot call."""
+    groups: Dict[str, List[dict]] = {}
+    for passage in vertical_passages:
+        groups.setdefault(passage['type'], []).append(passage)
+    return groups
+
 
 def _split_at_gaps(positions: np.ndarray, max_gap: float = 5.0) -> List[np.ndarray]:
     """
@@ -25,59 +75,93 @@ def _split_at_gaps(positions: np.ndarray, max_gap: float = 5.0) -> List[np.ndarr
     if len(split_indices) == 0:
         return [positions]
 
-    segments = []
-    prev = 0
-    for idx in split_indices:
-        if idx - prev >= 2:
-            segments.append(positions[prev:idx])
-        prev = idx
-    if len(positions) - prev >= 2:
-        segments.append(positions[prev:])
+    return [seg for seg in np.split(positions, split_indices) if len(seg) >= 2]
+
 
-    return segments
+def _split_floors_at_gaps(smoothed_floors: Dict[int, np.ndarray]) -> Dict[int, List[np.ndarray]]:
+    """Split every floor path at gaps once, so each image reuses the same segments."""
+    return {
+        floor_level: _split_at_gaps(np.asarray(positions))
+        for floor_level, positions in smoothed_floors.items()
+    }
 
 
 def generate_preview_images(raw_positions: np.ndarray,
                             smoothed_floors: Dict[int, np.ndarray],
                             vertical_passages: List[dict],
-                            output_prefix: str) -> dict:
+                            output_prefix: str,
+                            dpi: int = PREVIEW_DPI) -> dict:
     """
     Generate comparison preview images
 
+    Images are rendered one after another in this process. Callers with a
+    process pool can instead submit render_preview_image once per type.
+
     Args:
         raw_positions: Original trajectory positions
         smoothed_floors: Processed floor paths
         vertical_passages: Detected vertical passages
         output_prefix: Output file path prefix
+        dpi: Output resolution (HIGH_PREVIEW_DPI for high-DPI previews)
 
     Returns:
         Dictionary with image paths
     """
-    paths = {}
-
-    # Generate raw trajectory image
-    raw_path = f"{output_prefix}_raw.png"
-    generate_raw_trajectory_image(raw_positions, raw_path)
-    paths['raw'] = raw_path
-
-    # Generate processed trajectory image
-    processed_path = f"{output_prefix}_processed.png"
-    generate_processed_trajectory_image(
-        smoothed_floors, vertical_passages, processed_path
-    )
-    paths['processed'] = processed_path
-
-    # Generate comparison image
-    comparison_path = f"{output_prefix}_comparison.png"
-    generate_comparison_image(
-        raw_positions, smoothed_floors, vertical_passages, comparison_path
-    )
-    paths['comparison'] = comparison_path
+    floor_segments = _split_floors_at_gaps(smoothed_floors)
+    return {
+        image_type: render_preview_image(
+            image_type, raw_positions, smoothed_floors, vertical_passages, output_prefix, dpi,
+            floor_segments=floor_segments
+        )
+        for image_type in PREVIEW_IMAGE_TYPES
+    }
+
+
+def render_preview_image(image_type: str,
+                         raw_positions: np.ndarray,
+                         smoothed_floors: Dict[int, np.ndarray],
+                         vertical_passages: List[dict],
+                         output_prefix: str,
+                         dpi: int = PREVIEW_DPI,
+                         floor_segments: Optional[Dict[int, List[np.ndarray]]] = None) -> str:
+    """
+    Render a single preview image
 
-    return paths
+    Each image uses its own figure, so the types can be rendered in separate
+    worker processes (pyplot state is not thread-safe, so not threads).
 
+    Args:
+        image_type: One of PREVIEW_IMAGE_TYPES
+        raw_positions: Original trajectory positions
+        smoothed_floors: Processed floor paths
+        vertical_passages: Detected vertical passages
+        output_prefix: Output file path prefix
+        dpi: Output resolution
+        floor_segments: Floor paths already split at gaps (computed if omitted)
 
-def generate_raw_trajectory_image(positions: np.ndarray, output_path: str):
+    Returns:
+        Path of the written image
+    """
+    output_path = f"{output_prefix}_{image_type}.png"
+
+    if image_type == 'raw':
+        generate_raw_trajectory_image(raw_positions, output_path, dpi)
+    elif image_type == 'processed':
+        generate_processed_trajectory_image(
+            smoothed_floors, vertical_passages, output_path, dpi, floor_segments
+        )
+    elif image_type == 'comparison':
+        generate_comparison_image(
+            raw_positions, smoothed_floors, vertical_passages, output_path, dpi, floor_segments
+        )
+    else:
+        raise ValueError(f"Unknown preview image type: {image_type}")
+
+    return output_path
+
+
+def generate_raw_trajectory_image(positions: np.ndarray, output_path: str,
+                                  dpi: int = PREVIEW_DPI):
     """Generate image of raw trajectory"""
     x, y, z = positions[:, 0], positions[:, 1], positions[:, 2]
 
@@ -85,9 +169,20 @@ def generate_raw_trajectory_image(positions: np.ndarray, output_path: str):
 
     # 1. 3D view
     ax1 = fig.add_subplot(221, projection='3d')
-    colors = np.linspace(0, 1, len(x))
-    ax1.scatter(x, y, z, c=colors, cmap='viridis', s=10, alpha=0.8)
-    ax1.plot(x, y, z, 'k-', linewidth=0.3, alpha=0.3)
+    # Long trajectories are decimated before plotting; start/end markers and
+    # stats below use the full arrays
+    px, py, pz = _decimate(x), _decimate(y), _decimate(z)
+    # Time-colored markers only need to show direction, so decimate them further
+    sx, sy, sz = (_decimate(v, MAX_SCATTER_POINTS) for v in (x, y, z))
+    colors = _decimate(np.linspace(0, 1, len(x)), MAX_SCATTER_POINTS)
+    # One time-colored segment collection instead of N depth-sorted markers
+    pts = _decimate(positions, MAX_3D_PLOT_POINTS)
+    segs = np.stack([pts[:-1], pts[1:]], axis=1)
+    ax1.add_collection3d(Line3DCollection(
+        segs, cmap='viridis', array=np.linspace(0, 1, len(segs)), linewidth=1.5,
+        rasterized=True
+    ))
+    ax1.auto_scale_xyz(x, y, z)
     ax1.scatter(x[0], y[0], z[0], c='lime', s=150, marker='o',
                 label='Start', edgecolors='black', linewidths=2, zorder=10)
     ax1.scatter(x[-1], y[-1], z[-1], c='red', s=150, marker='X',
@@ -100,8 +195,8 @@ def generate_raw_trajectory_image(positions: np.ndarray, output_path: str):
 
     # 2. Top view (X-Y)
     ax2 = fig.add_subplot(222)
-    ax2.scatter(x, y, c=colors, cmap='viridis', s=10, alpha=0.8)
-    ax2.plot(x, y, 'k-', linewidth=0.3, alpha=0.3)
+    ax2.scatter(sx, sy, c=colors, cmap='viridis', s=10, alpha=0.8, rasterized=True)
+    ax2.plot(px, py, 'k-', linewidth=0.3, alpha=0.3)
     ax2.scatter(x[0], y[0], c='lime', s=150, marker='o',
                 label='Start', edgecolors='black', linewidths=2, zorder=10)
     ax2.scatter(x[-1], y[-1], c='red', s=150, marker='X',
@@ -115,8 +210,8 @@ def generate_raw_trajectory_image(positions: np.ndarray, output_path: str):
 
     # 3. Side view (X-Z)
     ax3 = fig.add_subplot(223)
-    ax3.scatter(x, z, c=colors, cmap='viridis', s=10, alpha=0.8)
-    ax3.plot(x, z, 'k-', linewidth=0.3, alpha=0.3)
+    ax3.scatter(sx, sz, c=colors, cmap='viridis', s=10, alpha=0.8, rasterized=True)
+    ax3.plot(px, pz, 'k-', linewidth=0.3, alpha=0.3)
     ax3.scatter(x[0], z[0], c='lime', s=150, marker='o',
                 label='Start', edgecolors='black', linewidths=2, zorder=10)
     ax3.scatter(x[-1], z[-1], c='red', s=150, marker='X',
@@ -129,28 +224,33 @@ def generate_raw_trajectory_image(positions: np.ndarray, output_path: str):
 
     # 4. Height profile
     ax4 = fig.add_subplot(224)
-    ax4.plot(range(len(z)), z, 'b-', linewidth=1)
-    ax4.fill_between(range(len(z)), z, alpha=0.3)
+    point_index = _decimate(np.arange(len(z)))
+    ax4.plot(point_index, pz, 'b-', linewidth=1)
+    ax4.fill_between(point_index, pz, alpha=0.3)
     ax4.set_xlabel('Point Index')
     ax4.set_ylabel('Z (m)')
     ax4.set_title('Height Profile', fontsize=12, fontweight='bold')
     ax4.grid(True, alpha=0.3)
 
     # Calculate stats
-    dist = np.sqrt(np.diff(x)**2 + np.diff(y)**2 + np.diff(z)**2)
-    total_dist = np.sum(dist)
+    total_dist = _polyline_length(positions)
 
     plt.suptitle(f'Raw Camera Trajectory\nNodes: {len(positions)} | Distance: {total_dist:.1f}m',
                  fontsize=14, fontweight='bold')
     plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    fig.savefig(output_path, dpi=dpi, **SAVEFIG_KWARGS)
+    plt.close(fig)
 
 
 def generate_processed_trajectory_image(smoothed_floors: Dict[int, np.ndarray],
                                          vertical_passages: List[dict],
-                                         output_path: str):
+                                         output_path: str,
+                                         dpi: int = PREVIEW_DPI,
+                                         floor_segments: Optional[Dict[int, List[np.ndarray]]] = None):
     """Generate image of processed trajectory"""
+    if floor_segments is None:
+        floor_segments = _split_floors_at_gaps(smoothed_floors)
+
     fig = plt.figure(figsize=(16, 12))
 
     # Define colors for floors
@@ -159,23 +259,23 @@ def generate_processed_trajectory_image(smoothed_floors: Dict[int, np.ndarray],
     # 1. 3D view with floors
     ax1 = fig.add_subplot(221, projection='3d')
 
-    for i, (floor_level, positions) in enumerate(sorted(smoothed_floors.items())):
-        positions = np.array(positions)
+    for i, (floor_level, segments) in enumerate(sorted(floor_segments.items())):
         color = floor_colors[i % len(floor_colors)]
         floor_name = f"{floor_level}F" if floor_level >= 0 else f"B{abs(floor_level)}"
-        segments = _split_at_gaps(positions)
         for j, seg in enumerate(segments):
             x, y, z = seg[:, 0], seg[:, 1], seg[:, 2]
             label = floor_name if j == 0 else None
-            ax1.plot(x, y, z, '-', color=color, linewidth=2, label=label)
-            ax1.scatter(x, y, z, c=[color], s=5, alpha=0.5)
-
-    # Plot vertical passages
-    for passage in vertical_passages:
-        positions = np.array(passage['positions'])
+            # Single-color vertices as line markers (3D scatter depth-sorts every point)
+            ax1.plot(x, y, z, '-', color=color, linewidth=2, label=label,
+                     marker='.', markersize=2)
+
+    # Plot vertical passages (one NaN-separated line per passage type)
+    passage_groups = _group_passages_by_type(vertical_passages)
+    for passage_type, passages in passage_groups.items():
+        positions = _nan_joined([p['positions'] for p in passages])
         x, y, z = positions[:, 0], positions[:, 1], positions[:, 2]
-        color = 'orange' if passage['type'] == 'STAIRCASE' else 'purple'
-        linestyle = '--' if passage['type'] == 'STAIRCASE' else ':'
+        color = 'orange' if passage_type == 'STAIRCASE' else 'purple'
+        linestyle = '--' if passage_type == 'STAIRCASE' else ':'
         ax1.plot(x, y, z, linestyle, color=color, linewidth=3, alpha=0.7)
 
     ax1.set_xlabel('X (m)')
@@ -187,11 +287,9 @@ def generate_processed_trajectory_image(smoothed_floors: Dict[int, np.ndarray],
     # 2. Floor plans (top view for each floor)
     ax2 = fig.add_subplot(222)
 
-    for i, (floor_level, positions) in enumerate(sorted(smoothed_floors.items())):
-        positions = np.array(positions)
+    for i, (floor_level, segments) in enumerate(sorted(floor_segments.items())):
         color = floor_colors[i % len(floor_colors)]
         floor_name = f"{floor_level}F" if floor_level >= 0 else f"B{abs(floor_level)}"
-        segments = _split_at_gaps(positions)
         for j, seg in enumerate(segments):
             x, y = seg[:, 0], seg[:, 1]
             label = floor_name if j == 0 else None
@@ -207,13 +305,14 @@ def generate_processed_trajectory_image(smoothed_floors: Dict[int, np.ndarray],
     # 3. Vertical passages detail
     ax3 = fig.add_subplot(223)
 
-    passage_labels = []
-    for passage in vertical_passages:
-        positions = np.array(passage['positions'])
-        z = positions[:, 2]
-        color = 'orange' if passage['type'] == 'STAIRCASE' else 'purple'
-        label = f"{passage['type']}: {passage['from_floor']}F→{passage['to_floor']}F"
-        ax3.plot(range(len(z)), z, '-', color=color, linewidth=2, label=label)
+    for passage_type, passages in passage_groups.items():
+        # Each passage's height profile starts at index 0, as separate overlaid lines
+        z = _nan_joined([p['positions'][:, 2] for p in passages])
+        point_index = _nan_joined([np.arange(len(p['positions'])) for p in passages])
+        color = 'orange' if passage_type == 'STAIRCASE' else 'purple'
+        transitions = ', '.join(f"{p['from_floor']}F→{p['to_floor']}F" for p in passages)
+        label = f"{passage_type}: {transitions}"
+        ax3.plot(point_index, z, '-', color=color, linewidth=2, label=label)
 
     ax3.set_xlabel('Point Index')
     ax3.set_ylabel('Z (m)')
@@ -231,8 +330,7 @@ def generate_processed_trajectory_image(smoothed_floors: Dict[int, np.ndarray],
 
     stats_text += f"Floors detected: {len(smoothed_floors)}\n"
     for floor_level, positions in sorted(smoothed_floors.items()):
-        positions = np.array(positions)
-        dist = np.sum(np.sqrt(np.sum(np.diff(positions, axis=0)**2, axis=1)))
+        dist = _polyline_length(positions)
         total_distance += dist
         floor_name = f"{floor_level}F" if floor_level >= 0 else f"B{abs(floor_level)}"
         stats_text += f"  {floor_name}: {len(positions)} pts, {dist:.1f}m\n"
@@ -251,23 +349,29 @@ def generate_processed_trajectory_image(smoothed_floors: Dict[int, np.ndarray],
 
     plt.suptitle('Processed Trajectory Analysis', fontsize=14, fontweight='bold')
     plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    fig.savefig(output_path, dpi=dpi, **SAVEFIG_KWARGS)
+    plt.close(fig)
 
 
 def generate_comparison_image(raw_positions: np.ndarray,
                                smoothed_floors: Dict[int, np.ndarray],
                                vertical_passages: List[dict],
-                               output_path: str):
+                               output_path: str,
+                               dpi: int = PREVIEW_DPI,
+                               floor_segments: Optional[Dict[int, List[np.ndarray]]] = None):
     """Generate side-by-side comparison image"""
+    if floor_segments is None:
+        floor_segments = _split_floors_at_gaps(smoothed_floors)
+
     fig = plt.figure(figsize=(16, 8))
 
     # Raw trajectory (left)
     ax1 = fig.add_subplot(121)
     x, y = raw_positions[:, 0], raw_positions[:, 1]
-    colors = np.linspace(0, 1, len(x))
-    ax1.scatter(x, y, c=colors, cmap='viridis', s=5, alpha=0.5)
-    ax1.plot(x, y, 'k-', linewidth=0.3, alpha=0.3)
+    colors = _decimate(np.linspace(0, 1, len(x)), MAX_SCATTER_POINTS)
+    ax1.scatter(_decimate(x, MAX_SCATTER_POINTS), _decimate(y, MAX_SCATTER_POINTS), c=colors,
+                cmap='viridis', s=5, alpha=0.5, rasterized=True)
+    ax1.plot(_decimate(x), _decimate(y), 'k-', linewidth=0.3, alpha=0.3)
     ax1.set_xlabel('X (m)')
     ax1.set_ylabel('Y (m)')
     ax1.set_title('Before Processing (Raw)', fontsize=12, fontweight='bold')
@@ -278,11 +382,9 @@ def generate_comparison_image(raw_positions: np.ndarray,
     ax2 = fig.add_subplot(122)
     floor_colors = plt.cm.Set1(np.linspace(0, 1, max(len(smoothed_floors), 3)))
 
-    for i, (floor_level, positions) in enumerate(sorted(smoothed_floors.items())):
-        positions = np.array(positions)
+    for i, (floor_level, segments) in enumerate(sorted(floor_segments.items())):
         color = floor_colors[i % len(floor_colors)]
         floor_name = f"{floor_level}F" if floor_level >= 0 else f"B{abs(floor_level)}"
-        segments = _split_at_gaps(positions)
         for j, seg in enumerate(segments):
             x, y = seg[:, 0], seg[:, 1]
             label = floor_name if j == 0 else None
@@ -297,5 +399,5 @@ def generate_comparison_image(raw_positions: np.ndarray,
 
     plt.suptitle('Path Processing Comparison', fontsize=14, fontweight='bold')
     plt.tight_layout(rect=[0, 0, 1, 0.95])
-    plt.savefig(output_path, dpi=150, bbox_inches='tight')
-    plt.close()
+    fig.savefig(output_path, dpi=dpi, **SAVEFIG_KWARGS)
+    plt.close(fig)
@@ -1,40 +1,65 @@
 #!/usr/bin/env python3
 """
 Test script for processing school.db and generating preview images
+
+Usage:
+    python test_school.py            # process + render preview images
+    python test_school.py --no-viz   # process only (skips matplotlib entirely)
 """
 
 import sys
 import os
+import argparse
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the path_service directory to the path
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from services.extraction import extract_trajectory_from_db, get_trajectory_stats
-from services.deduplication import deduplicate_path, merge_overlapping_segments
+from services.deduplication import deduplicate_floors, merge_overlapping_segments
 from services.path_flattening import snap_to_lines
 from services.vertical_detector import (
     detect_stairs_first,
     separate_floors,
     assign_floors_to_stairs
 )
-from services.visualization import generate_preview_images
-
 import numpy as np
 
-def main():
-    db_path = "../db/school.db"
-    output_dir = "./output"
+CACHE_DIR = "./.cache"
 
-    os.makedirs(output_dir, exist_ok=True)
 
-    print("=" * 60)
-    print("School.db Path Processing Test")
-    print("=" * 60)
+def load_trajectory_cached(db_path, cache_dir=CACHE_DIR):
+    """
+    Extract (positions, node_ids) from the DB, reusing a .npz cache from a previous run.
 
+    The cache key is the DB's absolute path plus its mtime and size, so rewriting
+    the DB invalidates the cache automatically.
+    """
+    st = os.stat(db_path)
+    path_hash = hashlib.sha1(os.path.abspath(db_path).encode()).hexdigest()[:16]
+    cache_path = os.path.join(cache_dir, f"{path_hash}_{st.st_mtime_ns}_{st.st_size}.npz")
+
+    if os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            return cached['positions'], cached['node_ids']
+
+    positions, node_ids = extract_trajectory_from_db(db_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez_compressed(cache_path, positions=positions, node_ids=node_ids)
+    return positions, node_ids
+
+
+def process(db_path):
+    """
+    Run steps 1-5 (extraction through line snapping) and return the results.
+
+    Returns None if the trajectory could not be extracted.
+    """
     # Step 1: Extract trajectory
     print("\n[1/6] Extracting trajectory from database...")
     try:
-        positions, node_ids = extract_trajectory_from_db(db_path)
+        positions, node_ids = load_trajectory_cached(db_path)
         stats = get_trajectory_stats(positions)
         print(f"  - Total nodes: {stats['total_nodes']}")
         print(f"  - X range: {stats['x_range'][0]:.3f} ~ {stats['x_range'][1]:.3f} m")
@@ -45,20 +70,27 @@ def main():
         print(f"  ERROR: {e}")
         import traceback
         traceback.print_exc()
-        return
+        return None
 
     # Step 2: Detect stairs FIRST (before floor separation)
     print("\n[2/6] Detecting stairs/elevators...")
     try:
         stair_segments, stair_mask = detect_stairs_first(positions)
-        stair_points = np.sum(stair_mask)
+        stair_points = int(np.count_nonzero(stair_mask))
         print(f"  - Detected {len(stair_segments)} vertical passage(s)")
         print(f"  - Stair points: {stair_points} ({100*stair_points/len(positions):.1f}%)")
-        for i, seg in enumerate(stair_segments):
-            z_change = seg['z_end'] - seg['z_start']
+        # 구간 경계/Z값을 [K, 2] 배열로 모아 점 수와 Z 변화량을 한 번에 계산
+        seg_bounds = np.array([(seg['start_idx'], seg['end_idx']) for seg in stair_segments],
+                              dtype=np.int64).reshape(-1, 2)
+        seg_z = np.array([(seg['z_start'], seg['z_end']) for seg in stair_segments],
+                         dtype=np.float64).reshape(-1, 2)
+        point_counts = (seg_bounds[:, 1] - seg_bounds[:, 0]).tolist()
+        z_changes = (seg_z[:, 1] - seg_z[:, 0]).tolist()
+        for i, (seg, (z_start, z_end), z_change, count) in enumerate(
+                zip(stair_segments, seg_z.tolist(), z_changes, point_counts)):
             direction = "UP" if z_change > 0 else "DOWN"
-            print(f"    - {seg['type']} #{i+1}: Z {seg['z_start']:.1f}m -> {seg['z_end']:.1f}m "
-                  f"({direction} {abs(z_change):.1f}m, {seg['end_idx']-seg['start_idx']} pts)")
+            print(f"    - {seg['type']} #{i+1}: Z {z_start:.1f}m -> {z_end:.1f}m "
+                  f"({direction} {abs(z_change):.1f}m, {count} pts)")
     except Exception as e:
         print(f"  ERROR: {e}")
         import traceback
@@ -83,7 +115,7 @@ def main():
         floor_mask = ~stair_mask
         floors_data = {0: {
             'positions': positions[floor_mask],
-            'node_ids': [node_ids[i] for i in range(len(node_ids)) if floor_mask[i]]
+            'node_ids': node_ids[floor_mask]
         }}
 
     # Step 3.5: Assign floor numbers to stairs
@@ -97,33 +129,55 @@ def main():
 
     # Step 4: Deduplicate paths (two-stage: merge overlapping, then deduplicate)
     print("\n[4/6] Removing duplicate path segments...")
-    deduplicated_floors = {}
+    # Floors are independent: one thread per floor (KD-tree queries and jitted kernels release the GIL)
+    floor_levels = list(floors_data.keys())
+    executor = ThreadPoolExecutor(max_workers=max(1, len(floor_levels)))
+
+    # Stage 1: Merge overlapping back-and-forth segments (one task per floor)
+    merged_floors = dict(zip(floor_levels, executor.map(
+        lambda level: merge_overlapping_segments(floors_data[level]['positions'], overlap_threshold=1.0),
+        floor_levels
+    )))
+    # Stage 2: Deduplicate all floors in one KD-tree pass (larger threshold for floor paths)
+    deduplicated_floors = deduplicate_floors(merged_floors, distance_threshold=0.5)
     for floor_level, floor_data in floors_data.items():
         original_count = len(floor_data['positions'])
-        # Stage 1: Merge overlapping back-and-forth segments
-        merged = merge_overlapping_segments(floor_data['positions'], overlap_threshold=1.0)
-        # Stage 2: Deduplicate with larger threshold for floor paths
-        deduplicated = deduplicate_path(merged, distance_threshold=0.5)
-        deduplicated_floors[floor_level] = deduplicated
+        merged = merged_floors[floor_level]
+        deduplicated = deduplicated_floors[floor_level]
         print(f"  - Floor {floor_level}: {original_count} -> {len(merged)} -> {len(deduplicated)} points "
               f"({100 * len(deduplicated) / original_count:.1f}% kept)")
 
     # Step 5: RDP + 직선 스냅 (스무딩 + 직선화를 한 번에)
     print("\n[5/6] Snapping paths to straight lines (RDP + line snap)...")
-    straightened_floors = {}
-    for floor_level, floor_positions in deduplicated_floors.items():
-        snapped = snap_to_lines(floor_positions, epsilon=0.5, point_spacing=0.5)
-        straightened_floors[floor_level] = snapped
-        print(f"  - Floor {floor_level}: {len(floor_positions)} -> {len(snapped)} points")
+    straightened_floors = dict(zip(floor_levels, executor.map(
+        lambda level: snap_to_lines(deduplicated_floors[level], epsilon=0.5, point_spacing=0.5),
+        floor_levels
+    )))
+    executor.shutdown()
+    for floor_level, snapped in straightened_floors.items():
+        print(f"  - Floor {floor_level}: {len(deduplicated_floors[floor_level])} -> {len(snapped)} points")
+
+    return {
+        'positions': positions,
+        'stats': stats,
+        'stair_segments': stair_segments,
+        'straightened_floors': straightened_floors,
+    }
+
+
+def visualize(result, output_dir):
+    """Step 6: render preview images for a process() result. Returns False on failure."""
+    # Imported here so --no-viz runs never load matplotlib
+    from services.visualization import generate_preview_images
 
-    # Step 6: Generate preview images
     print("\n[6/6] Generating preview images...")
+    os.makedirs(output_dir, exist_ok=True)
     output_prefix = os.path.join(output_dir, "school")
     try:
         paths = generate_preview_images(
-            positions,
-            straightened_floors,
-            stair_segments,
+            result['positions'],
+            result['straightened_floors'],
+            result['stair_segments'],
             output_prefix
         )
         print("  Generated images:")
@@ -133,25 +187,64 @@ def main():
         print(f"  ERROR: {e}")
         import traceback
         traceback.print_exc()
-        return
+        return False
+    return True
+
+
+def print_summary(result, output_dir=None):
+    positions = result['positions']
+    stats = result['stats']
+    stair_segments = result['stair_segments']
+    straightened_floors = result['straightened_floors']
 
-    # Summary
     print("\n" + "=" * 60)
     print("Processing Complete!")
     print("=" * 60)
 
-    total_processed_points = sum(len(p) for p in straightened_floors.values())
-    total_processed_distance = 0
-    for floor_positions in straightened_floors.values():
-        floor_positions = np.array(floor_positions)
-        dist = np.sqrt(np.sum(np.diff(floor_positions, axis=0)**2, axis=1))
-        total_processed_distance += np.sum(dist)
+    # All floors in one buffer; steps that cross from one floor into the next are masked out
+    floor_arrays = [np.asarray(p) for p in straightened_floors.values() if len(p) > 0]
+    floor_lengths = [len(p) for p in floor_arrays]
+    total_processed_points = sum(floor_lengths)
+    total_processed_distance = 0.0
+    if total_processed_points > 1:
+        all_points = np.concatenate(floor_arrays)
+        diffs = np.diff(all_points, axis=0)
+        within_floor = np.ones(len(diffs), dtype=bool)
+        within_floor[np.cumsum(floor_lengths)[:-1] - 1] = False
+        step_lengths = np.sqrt(np.einsum('ij,ij->i', diffs, diffs))
+        total_processed_distance = float(step_lengths[within_floor].sum())
 
     print(f"\nOriginal: {len(positions)} points, {stats['total_distance']:.2f}m")
     print(f"Processed (floors only): {total_processed_points} points, {total_processed_distance:.2f}m")
     print(f"Floors: {len(straightened_floors)}")
     print(f"Vertical passages (stairs/elevators): {len(stair_segments)}")
-    print(f"\nOutput files in: {os.path.abspath(output_dir)}")
+    if output_dir is not None:
+        print(f"\nOutput files in: {os.path.abspath(output_dir)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--db", default="../db/school.db", help="RTAB-Map DB path")
+    parser.add_argument("--output", default="./output", help="preview image directory")
+    parser.add_argument("--no-viz", dest="visualize", action="store_false",
+                        help="skip step 6 (preview image rendering)")
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("School.db Path Processing Test")
+    print("=" * 60)
+
+    result = process(args.db)
+    if result is None:
+        return
+
+    if args.visualize:
+        if not visualize(result, args.output):
+            return
+        print_summary(result, args.output)
+    else:
+        print("\n[6/6] Skipping preview images (--no-viz)")
+        print_summary(result)
 
 
 if __name__ == "__main__":
@@ -1,17 +1,53 @@
+import numpy as np
 import open3d as o3d
+import open3d.core as o3c
 
-pc1 = o3d.io.read_point_cloud("db/scan1_cloud.ply")
-pc2 = o3d.io.read_point_cloud("db/scan2_cloud.ply")
+# CUDA 빌드 + GPU가 있으면 GPU에서 ICP (대응점 KNN이 포인트별로 독립적), 없으면 CPU
+device = o3c.Device("CUDA:0") if o3c.cuda.is_available() else o3c.Device("CPU:0")
 
-# ICP로 정합
-threshold = 0.5
-reg = o3d.pipelines.registration.registration_icp(
-    pc2, pc1, threshold,
-    estimation_method=o3d.pipelines.registration.TransformationEstimationPointToPoint()
+pc1 = o3d.t.io.read_point_cloud("db/scan1_cloud.ply").to(device)
+pc2 = o3d.t.io.read_point_cloud("db/scan2_cloud.ply").to(device)
+
+# 거친 해상도 → 세밀한 해상도 순서의 멀티 스케일 ICP
+# (거친 단계에서 크게 맞추고 세밀한 단계는 적은 반복으로 다듬음)
+voxel_sizes = [0.1, 0.05, 0.025]
+max_iterations = [50, 30, 14]
+max_correspondence_distances = [0.3, 0.15, 0.075]
+
+# 가장 세밀한 스케일로 한 번 다운샘플링 (각 스케일은 multi_scale_icp가 여기서 다시 만듦)
+pc1_ds = pc1.voxel_down_sample(voxel_sizes[-1])
+pc2_ds = pc2.voxel_down_sample(voxel_sizes[-1])
+
+# Point-to-Plane은 타깃 normal이 필요하지만 Point-to-Point보다 훨씬 빨리 수렴
+# (거친 스케일의 normal은 다운샘플링 시 평균으로 유지됨)
+pc1_ds.estimate_normals(max_nn=30, radius=voxel_sizes[-1] * 4)
+
+# ICP로 정합 (텐서 API)
+reg = o3d.t.pipelines.registration.multi_scale_icp(
+    pc2_ds, pc1_ds,
+    voxel_sizes=o3c.Tensor(voxel_sizes),
+    criteria_list=[
+        o3d.t.pipelines.registration.ICPConvergenceCriteria(
+            relative_fitness=1e-6, relative_rmse=1e-6, max_iteration=iterations
+        )
+        for iterations in max_iterations
+    ],
+    max_correspondence_distances=o3c.Tensor(max_correspondence_distances),
+    init_source_to_target=np.eye(4),
+    estimation_method=o3d.t.pipelines.registration.TransformationEstimationPointToPlane()
 )
 
-# 변환 적용 후 합치기
+# 변환은 원본 해상도 클라우드에 적용
 pc2.transform(reg.transformation)
-merged = pc1 + pc2
+del pc1_ds, pc2_ds
+
+# 두 클라우드에 공통으로 있는 속성만 한 번씩 이어 붙여 합치기
+# (pc1 + pc2 후 레거시 변환처럼 전체 복사본을 여러 개 만들지 않음)
+merged = o3d.t.geometry.PointCloud(device)
+for key in ("positions", "colors", "normals"):
+    if key in pc1.point and key in pc2.point:
+        merged.point[key] = o3c.concatenate([pc1.point[key], pc2.point[key]], axis=0)
+del pc1, pc2
 
-o3d.io.write_point_cloud("merged_cloud.ply", merged)
+# 텐서 클라우드를 바이너리 PLY로 바로 저장 (레거시 변환 복사 없음)
+o3d.t.io.write_point_cloud("merged_cloud.ply", merged.cpu(), write_ascii=False)